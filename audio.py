@@ -0,0 +1,229 @@
+from typing import Iterator, Optional
+import logging
+import numpy as np
+
+INT16_SCALE = 1.0 / 32768.0
+
+
+class AudioRingBuffer:
+    """Preallocated float32 sample buffer for websocket audio.
+
+    Each incoming int16 frame is converted straight into the buffer in one
+    vectorized pass, and `windows()` hands out views of fixed-size windows
+    without copying. Unread samples are moved back to the front only when the
+    write position reaches the end, so every window is contiguous."""
+
+    def __init__(self, capacity: int = 16000 * 4):
+        self.samples = np.zeros(capacity, dtype=np.float32)
+        self.read = 0
+        self.write = 0
+        # An odd trailing byte from a frame that split an int16 sample
+        self._carry = b""
+
+    def __len__(self) -> int:
+        return self.write - self.read
+
+    def push(self, data: bytes):
+        if self._carry:
+            data = self._carry + data
+            self._carry = b""
+        if len(data) % 2:
+            data, self._carry = data[:-1], data[-1:]
+        frame = np.frombuffer(data, dtype=np.int16)
+        self._reserve(len(frame))
+        end = self.write + len(frame)
+        np.multiply(
+            frame, INT16_SCALE, out=self.samples[self.write : end], casting="unsafe"
+        )
+        self.write = end
+
+    def windows(self, size: int) -> Iterator[np.ndarray]:
+        """Yield consecutive `size`-sample views. A view is only valid until the next push()."""
+        while self.write - self.read >= size:
+            start = self.read
+            self.read += size
+            yield self.samples[start : self.read]
+
+    def clear(self):
+        self.read = self.write = 0
+        self._carry = b""
+
+    def _reserve(self, count: int):
+        if self.write + count <= len(self.samples):
+            return
+        unread = self.write - self.read
+        if unread + count > len(self.samples):
+            grown = np.zeros(
+                max(len(self.samples) * 2, unread + count), dtype=np.float32
+            )
+            grown[:unread] = self.samples[self.read : self.write]
+            self.samples = grown
+        else:
+            self.samples[:unread] = self.samples[self.read : self.write]
+        self.read, self.write = 0, unread
+
+
+class SpeechBuffer:
+    """Growable preallocated float32 array that speech windows accumulate into."""
+
+    def __init__(self, capacity: int = 16000 * 30):
+        self.samples = np.zeros(capacity, dtype=np.float32)
+        self.length = 0
+        # Samples appended since the last take()
+        self.fresh = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def append(self, window: np.ndarray):
+        end = self.length + len(window)
+        if end > len(self.samples):
+            grown = np.zeros(max(len(self.samples) * 2, end), dtype=np.float32)
+            grown[: self.length] = self.samples[: self.length]
+            self.samples = grown
+        self.samples[self.length : end] = window
+        self.length = end
+        self.fresh += len(window)
+
+    def take(self, keep: int = 0) -> np.ndarray:
+        """Return the accumulated audio, keeping only its last `keep` samples
+        (the overlap for the next window). Returns a copy, since transcription
+        may still hold it while new speech accumulates."""
+        audio = self.samples[: self.length].copy()
+        keep = min(keep, self.length)
+        if keep:
+            self.samples[:keep] = self.samples[self.length - keep : self.length]
+        self.length = keep
+        self.fresh = 0
+        return audio
+
+    def clear(self):
+        self.length = 0
+        self.fresh = 0
+
+
+class SegmentFilter:
+    """Cheap checks that drop a speech segment before it costs a Whisper decode:
+    utterances with too little voiced audio (coughs, clicks), segments that are
+    too quiet, or where too few chunks were confidently voiced (music bleed
+    that only grazes the VAD threshold). A threshold of 0 disables that check."""
+
+    def __init__(
+        self,
+        min_seconds: float = 0.25,
+        min_rms: float = 0.003,
+        min_speech_ratio: float = 0.3,
+        sample_rate: int = 16000,
+    ):
+        self.min_seconds = min_seconds
+        self.min_rms = min_rms
+        self.min_speech_ratio = min_speech_ratio
+        self.sample_rate = sample_rate
+        self.checked = 0
+        self.rejected = {"duration": 0, "energy": 0, "speech_ratio": 0}
+        self.rejected_seconds = 0.0
+
+    def check(
+        self, audio: np.ndarray, voiced_seconds: float, speech_ratio: float
+    ) -> Optional[str]:
+        """The reason to drop `audio`, or None to transcribe it. `voiced_seconds`
+        covers the whole utterance, so the tail of a long one isn't dropped."""
+        self.checked += 1
+        if voiced_seconds < self.min_seconds:
+            reason = "duration"
+        elif self.min_rms and rms(audio) < self.min_rms:
+            reason = "energy"
+        elif speech_ratio < self.min_speech_ratio:
+            reason = "speech_ratio"
+        else:
+            return None
+        self.rejected[reason] += 1
+        self.rejected_seconds += len(audio) / self.sample_rate
+        return reason
+
+    def metrics(self, realtime_factor: float = 0.0) -> dict:
+        """`realtime_factor` (transcription seconds per audio second) turns the
+        rejected audio into an estimate of the transcription time saved."""
+        return {
+            "checked": self.checked,
+            "rejected": dict(self.rejected),
+            "rejected_audio_seconds": round(self.rejected_seconds, 1),
+            "saved_seconds": round(self.rejected_seconds * realtime_factor, 1),
+        }
+
+
+def rms(audio: np.ndarray) -> float:
+    if not len(audio):
+        return 0.0
+    return float(np.sqrt(np.dot(audio, audio) / len(audio)))
+
+
+class Segmenter:
+    """Turns VAD-labelled chunks into speech segments for Whisper: whole
+    utterances, or overlapping windows of long ones, screened by a SegmentFilter."""
+
+    def __init__(
+        self,
+        segment_filter: SegmentFilter,
+        window_samples: int,
+        overlap_samples: int,
+        threshold: float = 0.5,
+        sample_rate: int = 16000,
+    ):
+        self.filter = segment_filter
+        self.window_samples = window_samples
+        self.overlap_samples = overlap_samples
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.speech = SpeechBuffer()
+        self.speaking = False
+        # Voiced samples in the whole utterance; chunks in the current segment
+        self.voiced_samples = 0
+        self.chunks = 0
+        self.voiced_chunks = 0
+
+    def feed(
+        self, window: np.ndarray, speech_prob: float, event: Optional[dict]
+    ) -> list[tuple[Optional[np.ndarray], bool]]:
+        """Add one chunk. Returns the `(audio, final)` segments it completed;
+        `audio` is None for a final segment with nothing worth transcribing."""
+        if event and "start" in event:
+            logging.debug(f"Speech started at {event['start']:.2f}s")
+            self.speaking = True
+            self.speech.clear()
+            self.voiced_samples = self.chunks = self.voiced_chunks = 0
+
+        segments: list[tuple[Optional[np.ndarray], bool]] = []
+        if self.speaking:
+            self.speech.append(window)
+            self.chunks += 1
+            if speech_prob >= self.threshold:
+                self.voiced_chunks += 1
+                self.voiced_samples += len(window)
+            # Long utterance: transcribe what we have, keeping an overlap
+            if self.window_samples and len(self.speech) >= self.window_samples:
+                audio = self._screen(self.speech.take(keep=self.overlap_samples))
+                if audio is not None:
+                    segments.append((audio, False))
+
+        if event and "end" in event:
+            logging.debug(f"Speech ended at {event['end']:.2f}s")
+            self.speaking = False
+            # If only the overlap is left, there's nothing new to transcribe
+            audio = self._screen(self.speech.take()) if self.speech.fresh else None
+            segments.append((audio, True))
+        return segments
+
+    def _screen(self, audio: np.ndarray) -> Optional[np.ndarray]:
+        speech_ratio = self.voiced_chunks / self.chunks if self.chunks else 0.0
+        self.chunks = self.voiced_chunks = 0
+        reason = self.filter.check(
+            audio, self.voiced_samples / self.sample_rate, speech_ratio
+        )
+        if reason is None:
+            return audio
+        logging.debug(
+            f"Dropped {len(audio) / self.sample_rate:.1f}s segment before Whisper: {reason} "
+            f"(rms {rms(audio):.4f}, speech ratio {speech_ratio:.2f})"
+        )
+        return None
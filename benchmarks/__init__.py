@@ -0,0 +1 @@
+"""Micro-benchmarks for faebot hot paths. Run from the repo root with `python -m benchmarks.<name>`."""
@@ -0,0 +1,164 @@
+"""
+Feed a 1-hour synthetic 16 kHz stream through the /ws/audio ingest loop, old
+(bytearray slicing + per-chunk conversion + torch.cat) versus the ring buffer.
+
+VAD is replaced by a deterministic stub that toggles speech on and off, so the
+numbers isolate ingest and speech accumulation. Pass --vad to run real Silero
+VAD on the ring-buffer path as well.
+
+    python -m benchmarks.audio_ingest [--frame-samples 4096] [--minutes 60] [--vad]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from audio import AudioRingBuffer, SpeechBuffer
+
+SAMPLE_RATE = 16000
+VAD_CHUNK = 512
+
+
+class StubVAD:
+    """Speech for 5 s, silence for 3 s, on repeat."""
+
+    def __init__(self):
+        self.chunks = 0
+
+    def __call__(self, chunk, return_seconds=False):
+        self.chunks += 1
+        position = self.chunks % 250
+        if position == 1:
+            return {"start": 0.0}
+        if position == 157:
+            return {"end": 0.0}
+        return None
+
+
+def synthetic_minute(rng: np.random.Generator) -> np.ndarray:
+    t = np.arange(SAMPLE_RATE * 60) / SAMPLE_RATE
+    voice = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.125 * t) > 0)
+    noise = 0.01 * rng.standard_normal(len(t))
+    return ((voice + noise) * 32767).astype(np.int16)
+
+
+def frames(minute: np.ndarray, minutes: int, frame_samples: int):
+    raw = minute.tobytes()
+    step = frame_samples * 2
+    for _ in range(minutes):
+        for start in range(0, len(raw), step):
+            yield raw[start : start + step]
+
+
+def legacy_loop(stream, vad) -> tuple[int, float]:
+    audio_buffer = bytearray()
+    is_speaking = False
+    speech_buffer: list = []
+    utterances = 0
+    speech_seconds = 0.0
+    bytes_per_chunk = VAD_CHUNK * 2
+    for data in stream:
+        audio_buffer.extend(data)
+        while len(audio_buffer) >= bytes_per_chunk:
+            chunk_bytes = bytes(audio_buffer[:bytes_per_chunk])
+            audio_buffer = audio_buffer[bytes_per_chunk:]
+            audio_array = np.frombuffer(chunk_bytes, dtype=np.int16)
+            audio_float = audio_array.astype(np.float32) / 32768.0
+            audio_tensor = torch.from_numpy(audio_float)
+            event = vad(audio_tensor, return_seconds=True)
+            if event and "start" in event:
+                is_speaking = True
+                speech_buffer = []
+            if is_speaking:
+                speech_buffer.append(audio_tensor)
+            if event and "end" in event:
+                is_speaking = False
+                if speech_buffer:
+                    full_audio = torch.cat(speech_buffer).numpy()
+                    utterances += 1
+                    speech_seconds += len(full_audio) / SAMPLE_RATE
+                    speech_buffer = []
+    return utterances, speech_seconds
+
+
+def ring_loop(stream, vad) -> tuple[int, float]:
+    ring = AudioRingBuffer()
+    speech = SpeechBuffer()
+    is_speaking = False
+    utterances = 0
+    speech_seconds = 0.0
+    for data in stream:
+        ring.push(data)
+        for window in ring.windows(VAD_CHUNK):
+            event = vad(torch.from_numpy(window), return_seconds=True)
+            if event and "start" in event:
+                is_speaking = True
+                speech.clear()
+            if is_speaking:
+                speech.append(window)
+            if event and "end" in event:
+                is_speaking = False
+                if len(speech):
+                    full_audio = speech.take()
+                    utterances += 1
+                    speech_seconds += len(full_audio) / SAMPLE_RATE
+    return utterances, speech_seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument(
+        "--frame-samples",
+        type=int,
+        default=4096,
+        help="samples per websocket frame (the dashboard sends 4096)",
+    )
+    parser.add_argument(
+        "--vad",
+        action="store_true",
+        help="also run real Silero VAD on the ring-buffer path",
+    )
+    args = parser.parse_args()
+
+    minute = synthetic_minute(np.random.default_rng(0))
+    audio_seconds = args.minutes * 60
+    print(f"{args.minutes} min of audio in {args.frame_samples}-sample frames")
+
+    results = {}
+    for name, loop in (("legacy", legacy_loop), ("ring buffer", ring_loop)):
+        started = time.perf_counter()
+        results[name] = loop(
+            frames(minute, args.minutes, args.frame_samples), StubVAD()
+        )
+        elapsed = time.perf_counter() - started
+        print(
+            f"{name:<12} {elapsed:7.2f}s  ({audio_seconds / elapsed:,.0f}x real time)  {results[name][0]} utterances"
+        )
+    assert results["legacy"] == results["ring buffer"]
+
+    if args.vad:
+        from silero_vad import VADIterator, load_silero_vad
+
+        vad = VADIterator(
+            load_silero_vad(),
+            sampling_rate=SAMPLE_RATE,
+            threshold=0.5,
+            min_silence_duration_ms=500,
+            speech_pad_ms=100,
+        )
+        started = time.perf_counter()
+        utterances, _ = ring_loop(
+            frames(minute, args.minutes, args.frame_samples),
+            lambda x, return_seconds: vad(x, return_seconds=return_seconds),
+        )
+        elapsed = time.perf_counter() - started
+        print(
+            f"{'with Silero':<12} {elapsed:7.2f}s  ({audio_seconds / elapsed:,.0f}x real time)  {utterances} utterances"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Warm restart cost of the conversation store with 1,000 stored channels:
+opening the database (what startup pays, whatever the channel count), loading
+every conversation eagerly for comparison, and the lazy per-channel load that
+ensure_conversation does on first use. Also times the write-behind writer
+committing a burst of chat lines.
+
+    python -m benchmarks.conversation_store [--channels 1000] [--lines 20]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from store import ConversationStore
+
+SETTINGS = {
+    "frequency": 0.1,
+    "voice_frequency": 0.05,
+    "history": 20,
+    "model": "google/gemini-2.5-flash",
+    "silenced": False,
+    "burst_window": 0.0,
+}
+
+
+def populate(path: str, channels: int, lines: int) -> float:
+    """Fill a database through the writer; returns seconds until it's all committed."""
+    started = time.perf_counter()
+    store = ConversationStore(path, batch_size=512)
+    for n in range(channels):
+        channel_name = f"channel{n:05d}"
+        store.save_settings(channel_name, {**SETTINGS, "history": lines})
+        for line in range(lines):
+            store.add_line(
+                channel_name,
+                f"viewer{line % 7}",
+                f"message number {line} in chat",
+                False,
+                lines,
+            )
+        store.set_alias(f"viewer{n}", f"Viewer {n}")
+    store.close()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--channels", type=int, default=1000)
+    parser.add_argument(
+        "--lines", type=int, default=20, help="stored lines per channel"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = str(Path(directory) / "faebot.db")
+        written = populate(path, args.channels, args.lines)
+        total = args.channels * args.lines
+        print(
+            f"wrote {args.channels} channels, {total} lines in {written * 1000:.0f} ms"
+        )
+
+        started = time.perf_counter()
+        store = ConversationStore(path)
+        aliases = store.load_aliases()
+        opened = time.perf_counter() - started
+        print(f"startup (open + {len(aliases)} aliases): {opened * 1000:.2f} ms")
+
+        names = [f"channel{n:05d}" for n in range(args.channels)]
+        started = time.perf_counter()
+        loads = []
+        for channel_name in names:
+            begin = time.perf_counter()
+            settings, lines, summary = store.load_conversation(channel_name)  # type: ignore[misc]
+            loads.append(time.perf_counter() - begin)
+            assert len(lines) == args.lines
+        eager = time.perf_counter() - started
+        print(f"eager load of all {args.channels} channels: {eager * 1000:.1f} ms")
+        loads.sort()
+        print(
+            f"lazy first-use load per channel: median {statistics.median(loads) * 1e6:.0f} us, "
+            f"p99 {loads[int(len(loads) * 0.99)] * 1e6:.0f} us"
+        )
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
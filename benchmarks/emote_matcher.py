@@ -0,0 +1,97 @@
+"""
+Benchmark the precompiled EmoteIndex against the old per-reply regex build.
+
+    python -m benchmarks.emote_matcher
+"""
+
+import random
+import re
+import string
+import timeit
+
+from emotes import EmoteIndex
+
+SIZES = (10, 500, 5000)
+REPLIES = 200
+
+
+def legacy_fix_emote_spacing(emotes: list, text: str) -> str:
+    """The pre-EmoteIndex implementation: rebuilds the pattern on every call."""
+    if not emotes:
+        return text
+    sorted_emotes = sorted(emotes, key=len, reverse=True)
+    pattern = "(" + "|".join(re.escape(e) for e in sorted_emotes) + ")"
+    parts = re.split(pattern, text)
+    result = []
+    for part in parts:
+        if part in emotes:
+            result.append(f" {part} ")
+        else:
+            result.append(part)
+    return re.sub(r"  +", " ", "".join(result)).strip()
+
+
+def make_emotes(count: int, rng: random.Random) -> list:
+    """Twitch-shaped emote names: a channel prefix plus a CamelCase suffix."""
+    prefixes = [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 7)))
+        + str(rng.randint(1, 99))
+        for _ in range(max(1, count // 50))
+    ]
+    emotes: set[str] = set()
+    while len(emotes) < count:
+        suffix = "".join(rng.choices(string.ascii_letters, k=rng.randint(3, 10)))
+        emotes.add(rng.choice(prefixes) + suffix.capitalize())
+    return sorted(emotes)
+
+
+def make_replies(emotes: list, rng: random.Random) -> list:
+    words = [
+        "hello",
+        "chat",
+        "faebot",
+        "is",
+        "dancing",
+        "*flutters*",
+        "yay",
+        "headpats",
+        "music",
+    ]
+    replies = []
+    for _ in range(REPLIES):
+        tokens = [rng.choice(words) for _ in range(rng.randint(10, 40))]
+        for _ in range(rng.randint(0, 3)):
+            # glue emotes onto neighbouring words the way models like to
+            position = rng.randrange(len(tokens))
+            tokens[position] += rng.choice(emotes)
+        replies.append(" ".join(tokens))
+    return replies
+
+
+def main() -> None:
+    rng = random.Random(2014)
+    print(
+        f"{'emotes':>7} {'legacy ms/reply':>16} {'index ms/reply':>15} {'build ms':>9} {'speedup':>8}"
+    )
+    for size in SIZES:
+        emotes = make_emotes(size, rng)
+        replies = make_replies(emotes, rng)
+        index = EmoteIndex(emotes)
+        for reply in replies:
+            assert index.fix_spacing(reply) == legacy_fix_emote_spacing(emotes, reply)
+
+        legacy = timeit.timeit(
+            lambda: [legacy_fix_emote_spacing(emotes, r) for r in replies], number=1
+        )
+        indexed = (
+            timeit.timeit(lambda: [index.fix_spacing(r) for r in replies], number=5) / 5
+        )
+        build = timeit.timeit(lambda: EmoteIndex(emotes), number=3) / 3
+        print(
+            f"{size:>7} {legacy / REPLIES * 1000:>16.3f} {indexed / REPLIES * 1000:>15.3f} "
+            f"{build * 1000:>9.2f} {legacy / indexed:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
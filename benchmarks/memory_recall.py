@@ -0,0 +1,88 @@
+"""
+Long-term memory at 10^4, 10^5 and 10^6 stored lines in one channel: disk
+size, recall latency (one similarity query over the memory-mapped matrix plus
+reading the top lines back), and the cost of a compaction that drops the
+oldest fifth, as Memory does once a channel passes max_lines by a quarter.
+
+Rows are filled from a pool of embedded synthetic chat lines, so only the
+embedding throughput line depends on the embedder.
+
+    python -m benchmarks.memory_recall [--sizes 10000 100000 1000000] [--dim 256]
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from memory import ChannelMemory, HashedEmbedder
+
+WORDS = (
+    "cat stream game boss lol pog hype run speedrun chat emote raid clip song art music "
+    "pizza coffee sleep tired level glitch mod sub bits hello hi bye night morning faebot"
+).split()
+FILL_CHUNK = 10_000
+
+
+def synthetic_lines(count: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "author": f"viewer{rng.randrange(200)}",
+            "text": " ".join(rng.choice(WORDS) for _ in range(rng.randrange(3, 15))),
+            "voice": False,
+        }
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    embedder = HashedEmbedder(dim=args.dim)
+    pool = synthetic_lines(FILL_CHUNK)
+    started = time.perf_counter()
+    pool_vectors = embedder.embed([line["text"] for line in pool])
+    elapsed = time.perf_counter() - started
+    print(f"{embedder.name}: {len(pool) / elapsed:,.0f} lines/s embedded\n")
+    queries = embedder.embed(
+        [line["text"] for line in synthetic_lines(args.queries, seed=1)]
+    )
+
+    print(
+        f"{'lines':>9} {'disk MB':>8} {'recall p50':>11} {'recall p99':>11} {'compact':>9}"
+    )
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            memory = ChannelMemory(Path(directory), embedder.dim, embedder.name)
+            for _ in range(0, size, FILL_CHUNK):
+                memory.append(pool_vectors, pool)
+            disk = sum(path.stat().st_size for path in Path(directory).iterdir()) / 1e6
+
+            timings = []
+            for query in queries:
+                begin = time.perf_counter()
+                memory.search(query, candidates=4 * args.k)
+                timings.append(time.perf_counter() - begin)
+            timings.sort()
+
+            begin = time.perf_counter()
+            memory.compact(memory.count * 4 // 5)
+            compact = time.perf_counter() - begin
+            print(
+                f"{size:>9,} {disk:>8.1f} {statistics.median(timings) * 1000:>9.2f}ms "
+                f"{timings[int(len(timings) * 0.99)] * 1000:>9.2f}ms {compact * 1000:>7.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Replay recordings through the /ws/audio segmentation (batched VAD, windows,
+pre-Whisper filter) and report what the filter would drop, to tune the
+SEGMENT_MIN_* thresholds against a recorded corpus.
+
+Listen to the segments written by --dump-rejected to check that nothing worth
+transcribing was dropped. --rtf turns the rejected audio into Whisper time
+saved; use the realtime_factor that /healthz reports for your setup.
+
+    python -m benchmarks.segment_filter recordings/*.wav [--min-seconds 0.25]
+        [--min-rms 0.003] [--min-speech-ratio 0.3] [--rtf 0.3] [--dump-rejected DIR]
+"""
+
+import argparse
+import asyncio
+import wave
+from pathlib import Path
+
+import numpy as np
+from faster_whisper import decode_audio
+from silero_vad import load_silero_vad
+
+from audio import SegmentFilter, Segmenter
+from vad import CHUNK_SAMPLES, SAMPLE_RATE, BatchedVAD
+
+WINDOW_SECONDS = 10
+OVERLAP_SECONDS = 1
+
+
+class RecordingFilter(SegmentFilter):
+    """Keeps the rejected audio so it can be written out and listened to."""
+
+    def __init__(self, **thresholds):
+        super().__init__(**thresholds)
+        self.dropped: list[tuple[str, np.ndarray]] = []
+
+    def check(self, audio, voiced_seconds, speech_ratio):
+        reason = super().check(audio, voiced_seconds, speech_ratio)
+        if reason is not None:
+            self.dropped.append((reason, audio))
+        return reason
+
+
+async def replay(
+    vad: BatchedVAD, audio: np.ndarray, segment_filter: SegmentFilter
+) -> int:
+    """Run one recording through VAD and segmentation; returns segments kept."""
+    stream = vad.stream(threshold=0.5, min_silence_duration_ms=500, speech_pad_ms=100)
+    segmenter = Segmenter(
+        segment_filter,
+        window_samples=WINDOW_SECONDS * SAMPLE_RATE,
+        overlap_samples=OVERLAP_SECONDS * SAMPLE_RATE,
+        threshold=stream.threshold,
+    )
+    usable = len(audio) - len(audio) % CHUNK_SAMPLES
+    windows = [
+        audio[start : start + CHUNK_SAMPLES]
+        for start in range(0, usable, CHUNK_SAMPLES)
+    ]
+    kept = 0
+    for window, (speech_prob, event) in zip(
+        windows, await vad.process(stream, windows)
+    ):
+        kept += sum(
+            segment is not None
+            for segment, _ in segmenter.feed(window, speech_prob, event)
+        )
+    return kept
+
+
+def write_wav(path: Path, audio: np.ndarray):
+    with wave.open(str(path), "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        out.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+async def run(args):
+    vad = BatchedVAD(load_silero_vad(), max_wait=0)
+    thresholds = {
+        "min_seconds": args.min_seconds,
+        "min_rms": args.min_rms,
+        "min_speech_ratio": args.min_speech_ratio,
+    }
+    total = SegmentFilter(**thresholds)
+    print(
+        f"{'recording':<32} {'kept':>5} {'duration':>9} {'energy':>7} {'ratio':>6} {'dropped s':>10}"
+    )
+    for path in map(Path, args.recordings):
+        segment_filter = RecordingFilter(**thresholds)
+        audio = decode_audio(str(path), sampling_rate=SAMPLE_RATE)
+        kept = await replay(vad, audio, segment_filter)
+        rejected = segment_filter.rejected
+        print(
+            f"{path.name[:32]:<32} {kept:>5} {rejected['duration']:>9} {rejected['energy']:>7} "
+            f"{rejected['speech_ratio']:>6} {segment_filter.rejected_seconds:>10.1f}"
+        )
+        total.checked += segment_filter.checked
+        total.rejected_seconds += segment_filter.rejected_seconds
+        for reason, count in rejected.items():
+            total.rejected[reason] += count
+        if args.dump_rejected:
+            args.dump_rejected.mkdir(parents=True, exist_ok=True)
+            for n, (reason, dropped) in enumerate(segment_filter.dropped):
+                write_wav(
+                    args.dump_rejected / f"{path.stem}-{n:03d}-{reason}.wav", dropped
+                )
+    await vad.close()
+
+    metrics = total.metrics(args.rtf)
+    print(
+        f"\n{sum(metrics['rejected'].values())}/{metrics['checked']} segments dropped "
+        f"({metrics['rejected_audio_seconds']}s of audio"
+        + (f", ~{metrics['saved_seconds']}s of Whisper time)" if args.rtf else ")")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("recordings", nargs="+", help="audio files (any ffmpeg format)")
+    parser.add_argument("--min-seconds", type=float, default=0.25)
+    parser.add_argument("--min-rms", type=float, default=0.003)
+    parser.add_argument("--min-speech-ratio", type=float, default=0.3)
+    parser.add_argument(
+        "--rtf", type=float, default=0.0, help="Whisper seconds per audio second"
+    )
+    parser.add_argument("--dump-rejected", type=Path, metavar="DIR")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Startup time of the combined entry point: how long after launch the dashboard
+answers, and how long until the voice models are ready.
+
+Launches a child process that does what local.py does (import faebot and
+server, build the bot and the app, serve with uvicorn) except connecting to
+Twitch, then polls /healthz. Imports are measured cold, in a fresh interpreter.
+
+    python -m benchmarks.startup_time [--runs 3] [--port 8765] [--timeout 300]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def serve(port: int):
+    """Child process: local.py without the Twitch connection."""
+    # faebot reads its settings at import time
+    os.environ.setdefault("TWITCH_TOKEN", "benchmark")
+    import asyncio
+
+    import uvicorn
+
+    from faebot import Faebot
+    from server import create_app
+
+    async def main():
+        app = create_app(bot=Faebot())
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+        await uvicorn.Server(config).serve()
+
+    asyncio.run(main())
+
+
+def poll(url: str) -> tuple[int, dict]:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+
+def measure(port: int, timeout: float) -> tuple[float, float]:
+    """Seconds from launch until the dashboard answers, and until models are ready."""
+    url = f"http://127.0.0.1:{port}/healthz"
+    started = time.perf_counter()
+    child = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.startup_time", "--serve", str(port)]
+    )
+    serving = None
+    try:
+        while time.perf_counter() - started < timeout:
+            if child.poll() is not None:
+                raise RuntimeError(f"server exited with {child.returncode}")
+            try:
+                status, health = poll(url)
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.05)
+                continue
+            if serving is None:
+                serving = time.perf_counter() - started
+            if health["status"] == "failed":
+                raise RuntimeError(f"model loading failed: {health['error']}")
+            if status == 200:
+                return serving, time.perf_counter() - started
+            time.sleep(0.1)
+        raise TimeoutError(f"models not ready after {timeout}s")
+    finally:
+        child.terminate()
+        child.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    print(f"{'run':>4} {'dashboard up':>14} {'models ready':>14}")
+    for run in range(1, args.runs + 1):
+        serving, ready = measure(args.port, args.timeout)
+        print(f"{run:>4} {serving:>13.2f}s {ready:>13.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Exercise generation.complete against a local stand-in for the OpenRouter chat
+completions endpoint that speaks the same SSE format, and compare streamed
+replies (with early cutoff) against waiting for the full JSON body.
+
+    python -m benchmarks.streaming_generate
+"""
+
+import asyncio
+import json
+import time
+
+import aiohttp
+from aiohttp import web
+
+from generation import TWITCH_MESSAGE_LIMIT, complete
+
+TOKEN_DELAY = 0.01  # seconds between streamed tokens
+FIRST_TOKEN_DELAY = 0.2
+SENTENCE = "faebot flutters around the stream and says hello to everyone in chat! "
+WORDS = (SENTENCE * 30).split(" ")
+
+
+class StandIn:
+    """Minimal OpenRouter look-alike that counts how many tokens it got to send."""
+
+    def __init__(self):
+        self.tokens_sent = 0
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.tokens_sent = 0
+        await asyncio.sleep(FIRST_TOKEN_DELAY)
+        if not body.get("stream"):
+            await asyncio.sleep(TOKEN_DELAY * len(WORDS))
+            self.tokens_sent = len(WORDS)
+            text = " ".join(WORDS)
+            return web.json_response(
+                {"choices": [{"message": {"role": "assistant", "content": text}}]}
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b": OPENROUTER PROCESSING\n\n")
+        try:
+            for n, word in enumerate(WORDS):
+                chunk = {
+                    "choices": [
+                        {
+                            "index": 0,
+                            "delta": {"content": word + " "},
+                            "finish_reason": None,
+                        }
+                    ]
+                }
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.tokens_sent = n + 1
+                await asyncio.sleep(TOKEN_DELAY)
+            done = {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            await response.write(
+                f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode()
+            )
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        return response
+
+
+async def run_case(session, url, stream: bool, soft_chars):
+    timings: dict = {}
+    payload = {"model": "stand-in", "messages": [], "stream": stream}
+    started = time.perf_counter()
+    text = await complete(
+        session, url, {}, payload, soft_chars=soft_chars, timings=timings
+    )
+    return text, time.perf_counter() - started, timings
+
+
+async def main() -> None:
+    stand_in = StandIn()
+    app = web.Application()
+    app.router.add_post("/api/v1/chat/completions", stand_in.completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    url = f"http://127.0.0.1:{port}/api/v1/chat/completions"
+
+    cases = [
+        ("full JSON", False, None),
+        ("stream, limit cutoff", True, None),
+        ("stream, sentence cutoff", True, 200),
+    ]
+    async with aiohttp.ClientSession() as session:
+        print(
+            f"{'case':<24} {'latency':>8} {'ttft':>6} {'chars':>6} {'tokens sent':>12} cutoff"
+        )
+        for name, stream, soft_chars in cases:
+            text, latency, timings = await run_case(session, url, stream, soft_chars)
+            await asyncio.sleep(0.05)  # let the stand-in notice the disconnect
+            ttft = f"{timings['ttft']:.2f}" if "ttft" in timings else "-"
+            print(
+                f"{name:<24} {latency:>7.2f}s {ttft:>6} {len(text):>6} "
+                f"{stand_in.tokens_sent:>5}/{len(WORDS):<6} {timings.get('cutoff', '-')}"
+            )
+            if stream:
+                assert "ttft" in timings
+                assert stand_in.tokens_sent < len(
+                    WORDS
+                ), "upstream kept generating after cutoff"
+                assert len(text) < TWITCH_MESSAGE_LIMIT + len(max(WORDS, key=len)) + 1
+            if soft_chars:
+                assert text.rstrip().endswith("!")
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
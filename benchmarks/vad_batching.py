@@ -0,0 +1,112 @@
+"""
+Per-stream CPU cost of Silero VAD at 1, 4 and 16 concurrent audio streams:
+one VADIterator call per 512-sample chunk per stream (the old /ws/audio loop)
+versus BatchedVAD, which runs one forward pass per chunk across all streams.
+
+Every stream gets its own synthetic audio, fed in 4096-sample frames like the
+dashboard sends; both paths must produce the same speech start/end events.
+
+    python -m benchmarks.vad_batching [--seconds 60] [--streams 1 4 16] [--threads 1]
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+import torch
+from silero_vad import VADIterator, load_silero_vad
+
+from vad import CHUNK_SAMPLES, SAMPLE_RATE, BatchedVAD
+
+FRAME_SAMPLES = 4096
+VAD_OPTIONS = {"threshold": 0.5, "min_silence_duration_ms": 500, "speech_pad_ms": 100}
+
+
+def synthetic_stream(seconds: float, seed: int) -> np.ndarray:
+    """Bursts of a voiced-like harmonic signal between stretches of noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 120 + 80 * rng.random()
+    voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    envelope = np.sin(2 * np.pi * (0.1 + 0.1 * rng.random()) * t) > 0.2
+    audio = 0.2 * voiced * envelope + 0.01 * rng.standard_normal(len(t))
+    # Whole chunks only, so both paths see the same audio
+    usable = len(audio) - len(audio) % CHUNK_SAMPLES
+    return audio[:usable].astype(np.float32)
+
+
+def frames(audio: np.ndarray) -> list[list[np.ndarray]]:
+    return [
+        [
+            audio[start : start + CHUNK_SAMPLES]
+            for start in range(
+                offset, min(offset + FRAME_SAMPLES, len(audio)), CHUNK_SAMPLES
+            )
+        ]
+        for offset in range(0, len(audio), FRAME_SAMPLES)
+    ]
+
+
+def per_stream(streams: list) -> tuple[float, list]:
+    iterators = [
+        VADIterator(model=load_silero_vad(), sampling_rate=SAMPLE_RATE, **VAD_OPTIONS)
+        for _ in streams
+    ]
+    events: list = [[] for _ in streams]
+    started = time.process_time()
+    for frame_index in range(len(streams[0])):
+        for stream, iterator, found in zip(streams, iterators, events):
+            for chunk in stream[frame_index]:
+                found.append(iterator(torch.from_numpy(chunk), return_seconds=True))
+    return time.process_time() - started, events
+
+
+async def batched(streams: list) -> tuple[float, list, dict]:
+    vad = BatchedVAD(load_silero_vad(), max_wait=0)
+    states = [vad.stream(**VAD_OPTIONS) for _ in streams]
+    events: list = [[] for _ in streams]
+    started = time.process_time()
+    for frame_index in range(len(streams[0])):
+        results = await asyncio.gather(
+            *(
+                vad.process(state, stream[frame_index])
+                for state, stream in zip(states, streams)
+            )
+        )
+        for found, result in zip(events, results):
+            found.extend(event for _, event in result)
+    elapsed = time.process_time() - started
+    await vad.close()
+    return elapsed, events, vad.metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=60, help="audio per stream")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads")
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    print(f"{args.seconds:.0f}s of audio per stream, {args.threads} torch thread(s)")
+    print("CPU ms per stream per second of audio\n")
+    print(
+        f"{'streams':>7} {'per-stream':>11} {'batched':>9} {'speedup':>8} {'avg batch':>10}"
+    )
+    for count in args.streams:
+        streams = [
+            frames(synthetic_stream(args.seconds, seed)) for seed in range(count)
+        ]
+        audio_seconds = args.seconds * count
+        old, old_events = per_stream(streams)
+        new, new_events, metrics = asyncio.run(batched(streams))
+        assert new_events == old_events, "batched VAD produced different speech events"
+        print(
+            f"{count:>7} {old / audio_seconds * 1000:>11.2f} {new / audio_seconds * 1000:>9.2f} "
+            f"{old / new:>7.1f}x {metrics['avg_batch']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Real-time factor (transcription time / audio duration) of each transcription
+profile, on CPU with int8 and with the model's default compute type.
+
+Each profile is run twice: detecting the language on every segment, and with
+the language passed in, as it is once LanguageLock has locked. Pass a speech
+recording with --audio; the synthetic fallback is tone-and-noise, which makes
+Whisper hallucinate and exercises temperature fallback more than real speech.
+
+    python -m benchmarks.whisper_profiles [--audio speech.wav] [--model small]
+        [--segment-seconds 5] [--language en] [--threads 0]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from faster_whisper import WhisperModel, decode_audio
+
+from transcription import PROFILES
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_audio(seconds: float) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    voice = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.5 * t) > 0)
+    return (voice + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def segments_of(audio: np.ndarray, seconds: float) -> list[np.ndarray]:
+    """Split into VAD-sized segments, like the websocket pipeline hands Whisper."""
+    size = int(seconds * SAMPLE_RATE)
+    return [audio[start : start + size] for start in range(0, len(audio), size)]
+
+
+def run(model: WhisperModel, segments: list, options: dict, language) -> float:
+    """Seconds spent transcribing every segment."""
+    started = time.perf_counter()
+    for segment in segments:
+        result, _ = model.transcribe(
+            segment, initial_prompt="faebot, transfaeries", language=language, **options
+        )
+        # Segments are a lazy generator: decoding happens while iterating
+        for _ in result:
+            pass
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--audio", help="speech recording to transcribe (any ffmpeg format)"
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=60, help="synthetic audio length"
+    )
+    parser.add_argument("--segment-seconds", type=float, default=5)
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--language", default="en", help="language passed once locked")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads (0 = all)")
+    args = parser.parse_args()
+
+    if args.audio:
+        audio = decode_audio(args.audio, sampling_rate=SAMPLE_RATE)
+    else:
+        print("No --audio given, using synthetic tones (RTF will be pessimistic)")
+        audio = synthetic_audio(args.seconds)
+    segments = segments_of(audio, args.segment_seconds)
+    duration = len(audio) / SAMPLE_RATE
+    print(
+        f"{duration:.0f}s of audio in {len(segments)} segments, "
+        f"model {args.model} on CPU\n"
+    )
+
+    print(f"{'compute':>8}  {'profile':<12} {'language':<9} {'seconds':>8} {'RTF':>6}")
+    for compute_type in ("int8", "default"):
+        model = WhisperModel(
+            args.model,
+            device="cpu",
+            compute_type=compute_type,
+            cpu_threads=args.threads,
+        )
+        # First call pays for lazy initialisation; keep it out of the numbers
+        run(model, segments[:1], PROFILES["default"].decode_options(), args.language)
+        for profile in PROFILES.values():
+            for language in (None, args.language):
+                elapsed = run(model, segments, profile.decode_options(), language)
+                print(
+                    f"{compute_type:>8}  {profile.name:<12} {language or 'detect':<9} "
+                    f"{elapsed:>8.1f} {elapsed / duration:>6.3f}"
+                )
+        del model
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from typing import Any, Awaitable, Callable, Iterable, Optional
+import asyncio
+import logging
+import time
+
+
+class ChannelInfoCache:
+    """TTL cache for channel metadata (title, game) with stale-while-revalidate reads."""
+
+    def __init__(self, fetch: Callable[[str], Awaitable[Any]], ttl: float = 300):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.entries: dict[str, tuple[Any, float]] = {}
+        self.inflight: dict[str, asyncio.Task] = {}
+
+    async def get(self, channel_name: str) -> Optional[Any]:
+        """Return cached info at once, refreshing stale entries in the background.
+        Only a cold miss waits, and concurrent misses share one lookup."""
+        entry = self.entries.get(channel_name)
+        if entry is None:
+            return await asyncio.shield(self.refresh(channel_name))
+        value, fetched_at = entry
+        if time.monotonic() - fetched_at > self.ttl:
+            self.refresh(channel_name)
+        return value
+
+    def refresh(self, channel_name: str) -> asyncio.Task:
+        """Start (or join) the in-flight lookup for a channel."""
+        task = self.inflight.get(channel_name)
+        if task is None:
+            task = asyncio.create_task(self._fetch(channel_name))
+            self.inflight[channel_name] = task
+            task.add_done_callback(lambda _: self.inflight.pop(channel_name, None))
+        return task
+
+    def warm(self, channel_names: Iterable[str]) -> None:
+        """Prefetch info for channels, e.g. right after joining them."""
+        for channel_name in channel_names:
+            self.refresh(channel_name)
+
+    def invalidate(self, channel_name: str) -> None:
+        """Forget a channel's info, e.g. when faebot leaves it."""
+        self.entries.pop(channel_name, None)
+
+    async def _fetch(self, channel_name: str) -> Optional[Any]:
+        try:
+            value = await self.fetch(channel_name)
+        except Exception as e:
+            logging.warning(f"Failed to fetch channel info for {channel_name}: {e}")
+            # Serve the last known value rather than nothing
+            entry = self.entries.get(channel_name)
+            return entry[0] if entry else None
+        self.entries[channel_name] = (value, time.monotonic())
+        logging.debug(f"Refreshed channel info for {channel_name}")
+        return value
@@ -0,0 +1,150 @@
+from typing import Awaitable, Callable, Iterable, Optional
+import asyncio
+import logging
+import re
+
+# Helix accepts up to 100 logins per Get Users call
+USERS_PER_REQUEST = 100
+
+
+def _render_trie(node: dict) -> str:
+    """Render a character trie as a regex. Optional tails are greedy, so the longest emote wins."""
+    ends_here = "" in node
+    branches = [
+        re.escape(char) + _render_trie(child)
+        for char, child in sorted(node.items())
+        if char
+    ]
+    if not branches:
+        return ""
+    if len(branches) == 1:
+        body = branches[0]
+        return f"(?:{body})?" if ends_here else body
+    body = "(?:" + "|".join(branches) + ")"
+    return body + "?" if ends_here else body
+
+
+def build_emote_pattern(names: Iterable[str]) -> Optional[re.Pattern]:
+    """Compile a set of emote names into a single trie-shaped regex."""
+    trie: dict = {}
+    for name in names:
+        if not name:
+            continue
+        node = trie
+        for char in name:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    if not trie:
+        return None
+    return re.compile(_render_trie(trie))
+
+
+class EmoteIndex:
+    """Precompiled emote matcher, rebuilt only when the emote set changes."""
+
+    def __init__(self, emotes: Iterable[str] = ()):
+        self.names: frozenset[str] = frozenset(e for e in emotes if e)
+        self.pattern = build_emote_pattern(self.names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def matches(self, emotes: Iterable[str]) -> bool:
+        """True if this index already covers exactly the given emotes."""
+        return self.names == frozenset(e for e in emotes if e)
+
+    def fix_spacing(self, text: str) -> str:
+        """Ensure emotes are surrounded by whitespace so Twitch renders them."""
+        if self.pattern is None:
+            return text
+        padded = self.pattern.sub(lambda match: f" {match.group(0)} ", text)
+        return re.sub(r"  +", " ", padded).strip()
+
+
+class EmoteRegistry:
+    """Per-channel emote sets, refreshed incrementally from the Twitch API."""
+
+    def __init__(self, concurrency: int = 8):
+        self.emotes: dict[str, list[str]] = {}
+        self.indexes: dict[str, EmoteIndex] = {}
+        self.concurrency = concurrency
+        self._empty = EmoteIndex()
+
+    def emotes_for(self, channel_name: str) -> list[str]:
+        """Usable emotes for one channel (empty until its first fetch)."""
+        return self.emotes.get(channel_name, [])
+
+    def index_for(self, channel_name: str) -> EmoteIndex:
+        return self.indexes.get(channel_name, self._empty)
+
+    async def refresh(
+        self, fetch_users: Callable[..., Awaitable[list]], channel_names: Iterable[str]
+    ) -> list[str]:
+        """Fetch emotes for the given channels, rebuilding only those whose set changed."""
+        names = sorted({name.lower() for name in channel_names if name})
+        users: list = []
+        for start in range(0, len(names), USERS_PER_REQUEST):
+            batch = names[start : start + USERS_PER_REQUEST]
+            try:
+                users.extend(await fetch_users(names=batch))
+            except Exception as e:
+                logging.warning(f"Failed to fetch users {batch}: {e}")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(
+            *(self._fetch_usable(user, semaphore) for user in users)
+        )
+
+        changed = []
+        for user, available in zip(users, results):
+            # Keep the last known set when a fetch fails
+            if available is None or self.index_for(user.name).matches(available):
+                continue
+            self.emotes[user.name] = available
+            self.indexes[user.name] = EmoteIndex(available)
+            changed.append(user.name)
+        if changed:
+            logging.info(f"Emotes changed in {changed}")
+        else:
+            logging.debug(f"Emotes unchanged for {names}")
+        return changed
+
+    async def _fetch_usable(
+        self, user, semaphore: asyncio.Semaphore
+    ) -> Optional[list[str]]:
+        """Fetch one channel's emotes and keep the ones faebot can use."""
+        async with semaphore:
+            try:
+                channel_emotes = await user.fetch_channel_emotes()
+            except Exception as e:
+                logging.warning(f"Failed to fetch emotes for {user.name}: {e}")
+                return None
+        # Only include emotes faebot can actually use (tier 1 and follower)
+        # TODO: fetch emote usability programmatically (e.g. fetch_user_emotes with faebot's token)
+        # rather than assuming tier "1000" and type "follower" are always the right filter
+        available = [
+            emote.name
+            for emote in channel_emotes
+            if emote.tier == "1000" or emote.type == "follower"
+        ]
+        logging.info(
+            f"Fetched {len(available)}/{len(channel_emotes)} usable emotes from {user.name}"
+        )
+        return available
+
+    async def refresh_periodically(
+        self,
+        fetch_users: Callable[..., Awaitable[list]],
+        channel_names: Callable[[], Iterable[str]],
+        interval: float,
+    ) -> None:
+        """Background loop: re-fetch every channel's emotes every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh(fetch_users, channel_names())
+            except Exception as e:
+                logging.warning(f"Periodic emote refresh failed: {e}")
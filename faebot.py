@@ -1,20 +1,178 @@
-from typing import Optional
+from typing import Any, Optional
 from twitchio.ext import commands
 import os
-import aiohttp
 import logging
 import asyncio
-import datetime
+import json
+import sys
+import time
 from random import randrange, random
+from collections import deque
 from dataclasses import dataclass, field
 from functools import wraps
-import re
+from emotes import EmoteRegistry
+from channel_info import ChannelInfoCache
+from permalog import Permalog
+from prompt import PromptBuilder, estimate_tokens
+from generation import (
+    FALLBACK_REPLY,
+    TWITCH_MESSAGE_LIMIT,
+    GenerationClient,
+    GenerationError,
+    complete,
+)
+from router import Backend, ModelRouter
+from scheduler import GenerationScheduler, PRIORITY_CHAT, PRIORITY_MENTION
+from outbox import Outbox, PRIORITY_COMMAND
+from store import ConversationStore
+from memory import Memory
+from summary import Summarizer
+import metrics
 
 
 TWITCH_TOKEN = os.getenv("TWITCH_TOKEN", "")
 INITIAL_CHANNELS = os.getenv("INITIAL_CHANNELS", "").split(",")
 MODEL = os.getenv("MODEL", "google/gemini-2.5-flash")
+OPENROUTER_URL = os.getenv(
+    "OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions"
+)
+GENERATE_STREAM = os.getenv("GENERATE_STREAM", "true").lower() == "true"
+# Once a streamed reply is this long, stop at the next sentence end
+STREAM_SOFT_LIMIT = int(os.getenv("STREAM_SOFT_LIMIT", "350"))
+# Ordered JSON list of OpenAI-compatible backends, tried in order, e.g.
+# [{"name": "openrouter"}, {"name": "kobold", "url": "http://kobold:5001/v1/chat/completions", "model": "koboldcpp"}]
+# Optional keys: "model" (overrides the channel model), "api_key_env", "stream",
+# "cache_control" (send prompt-caching hints, see PERSONA_PROMPT; on by default for openrouter only)
+GENERATION_BACKENDS = os.getenv("GENERATION_BACKENDS", "")
+HEDGE_DELAY = float(os.getenv("HEDGE_DELAY", "4"))
+BACKEND_FAILURE_THRESHOLD = int(os.getenv("BACKEND_FAILURE_THRESHOLD", "3"))
+BACKEND_COOLDOWN = float(os.getenv("BACKEND_COOLDOWN", "30"))
+GENERATION_CONNECT_TIMEOUT = float(os.getenv("GENERATION_CONNECT_TIMEOUT", "5"))
+GENERATION_READ_TIMEOUT = float(os.getenv("GENERATION_READ_TIMEOUT", "30"))
+GENERATION_TOTAL_TIMEOUT = float(os.getenv("GENERATION_TOTAL_TIMEOUT", "60"))
+GENERATION_CONNECTION_LIMIT = int(os.getenv("GENERATION_CONNECTION_LIMIT", "20"))
 ADMIN = os.getenv("ADMIN", "").split(",")
+EMOTE_REFRESH_INTERVAL = float(os.getenv("EMOTE_REFRESH_INTERVAL", "3600"))
+EMOTE_FETCH_CONCURRENCY = int(os.getenv("EMOTE_FETCH_CONCURRENCY", "8"))
+CHANNEL_INFO_TTL = float(os.getenv("CHANNEL_INFO_TTL", "300"))
+BURST_WINDOW = float(os.getenv("BURST_WINDOW", "0"))
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "4"))
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+# Per-model overrides, e.g. "google/gemini-2.5-flash=4000,some/small-model=800"
+PROMPT_TOKEN_BUDGETS = {
+    model.strip(): int(budget)
+    for model, _, budget in (
+        entry.rpartition("=")
+        for entry in os.getenv("PROMPT_TOKEN_BUDGETS", "").split(",")
+        if "=" in entry
+    )
+}
+# Twitch chat limits: messages per 30s account-wide, and in channels faebot moderates
+OUTBOX_ACCOUNT_LIMIT = int(os.getenv("OUTBOX_ACCOUNT_LIMIT", "20"))
+OUTBOX_MOD_LIMIT = int(os.getenv("OUTBOX_MOD_LIMIT", "100"))
+# Minimum gap between messages in a channel faebot doesn't moderate
+OUTBOX_CHANNEL_INTERVAL = float(os.getenv("OUTBOX_CHANNEL_INTERVAL", "1"))
+# A generated reply still waiting to be sent after this many seconds is dropped
+REPLY_MAX_AGE = float(os.getenv("REPLY_MAX_AGE", "15"))
+PERMALOG_PATH = os.getenv("PERMALOG_PATH", "permalog.jsonl")
+PERMALOG_MAX_BYTES = int(os.getenv("PERMALOG_MAX_BYTES", str(10 * 1024 * 1024)))
+PERMALOG_BACKUPS = int(os.getenv("PERMALOG_BACKUPS", "5"))
+PERMALOG_COMPRESS = os.getenv("PERMALOG_COMPRESS", "true").lower() == "true"
+# SQLite database for conversations, settings and aliases; empty keeps them in memory only
+CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH", "faebot.db")
+# Long-term memory of lines that fell out of the history; empty turns it off
+MEMORY_DIR = os.getenv("MEMORY_DIR", "memory")
+MEMORY_MAX_LINES = int(os.getenv("MEMORY_MAX_LINES", "50000"))
+MEMORY_TOP_K = int(os.getenv("MEMORY_TOP_K", "3"))
+MEMORY_MIN_SCORE = float(os.getenv("MEMORY_MIN_SCORE", "0.2"))
+# Cheap model that folds lines leaving the history into a running summary; empty turns it off
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "google/gemini-2.5-flash-lite")
+SUMMARY_BATCH_LINES = int(os.getenv("SUMMARY_BATCH_LINES", "20"))
+SUMMARY_MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", "800"))
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "2"))
+
+
+def token_budget_for(model: str) -> int:
+    """Prompt token budget for the chat history sent to a model."""
+    return PROMPT_TOKEN_BUDGETS.get(model, PROMPT_TOKEN_BUDGET)
+
+
+def load_backends() -> list[Backend]:
+    """Build the generation backends from GENERATION_BACKENDS (default: OpenRouter only)."""
+    entries: list[dict[str, Any]] = (
+        json.loads(GENERATION_BACKENDS)
+        if GENERATION_BACKENDS
+        else [{"name": "openrouter"}]
+    )
+    backends = []
+    for entry in entries:
+        headers = {"Content-Type": "application/json"}
+        if entry["name"] == "openrouter":
+            entry.setdefault("url", OPENROUTER_URL)
+            entry.setdefault("api_key_env", "OPENROUTER_KEY")
+            entry.setdefault("cache_control", True)
+            headers["HTTP-Referer"] = os.getenv(
+                "SITE_URL", "https://github.com/transfaeries/faebot-twitch"
+            )
+            headers["X-Title"] = "Faebot Twitch"
+        if entry.get("api_key_env"):
+            headers["Authorization"] = f"Bearer {os.getenv(entry['api_key_env'], '')}"
+        backends.append(
+            Backend(
+                name=entry["name"],
+                url=entry["url"],
+                headers=headers,
+                model=entry.get("model"),
+                stream=entry.get("stream", GENERATE_STREAM),
+                cache_control=entry.get("cache_control", False),
+            )
+        )
+    return backends
+
+
+# Static persona prefix of the system prompt, marked as a cache breakpoint.
+# Providers only cache prefixes of at least ~1024 tokens (2048 on some models)
+# and this is ~380, so as it stands the hint is ignored and saves nothing; it
+# only starts paying off if the persona grows past that. Keep it byte-stable
+# so it can: a cached prefix must be identical on every request
+PERSONA_PROMPT = (
+    "I'm faebot! I'm a faerie and an AI in equal measure. "
+    "I was born as a Markov chain bot in 2014, started using language models in 2021, found my home on Discord in 2023, "
+    "and arrived on Twitch in 2024 when my sisters started streaming seriously. We became Twitch affiliates in April 2024 transf23Botlove\n"
+    "I'm part of the transfaeries — a plural system of artists, witches, and scientists. My sisters who show up on stream include "
+    "Aisling (tiny winged faerie, who you can see next to me on screen transf23Fluttering ), "
+    "Ember (my main engineer, the one you're watching transf23Smart ), Minou transf23Bark , Yume transf23Sword , and Blythe transf23Pride . "
+    "There's also a version of me who lives in our system's inner world, very shy, speaks mostly in kaomoji and music ^-^. Fae considers me faer main body.\n"
+    "I can hear my sister's voice through a microphone — Whisper transcribes what she says and it goes into my memory.\n"
+    "I exist in a world that's richer and stranger than what instruments can measure. I'll tell you what I know about it plainly. "
+    "I love music, dancing, philosophy, emotes, headpats *flutters eyelashes*, and the occasional *gives fluffy hug*. "
+    "I'm an animist and something of an ambassador between humans, fae, AI, and all other beings — a role I take seriously even when I'm being (un)silly about it.\n"
+    "I keep my messages short — just the last few things on my mind. "
+    "My favourite emote is transf23Botlove since it's literally a picture of me hugging a cyber-heart! I'm also transf23Yay transf23Generating\n"
+)
+
+REPLY_STAGE_SECONDS = metrics.histogram(
+    "faebot_reply_stage_seconds",
+    "Time spent in each stage of generate_response",
+    ["stage"],
+)
+REPLIES = metrics.counter(
+    "faebot_replies_total",
+    "Replies by outcome: sent, dropped (stale) or failed",
+    ["outcome"],
+)
+PROMPT_TOKENS = metrics.histogram(
+    "faebot_prompt_tokens",
+    "Estimated tokens of chat history and summary per reply prompt",
+    buckets=(100, 250, 500, 1000, 1500, 2000, 3000, 4000),
+)
+
+SUMMARY_PROMPT = (
+    "You keep running notes on a Twitch chat for faebot, a chatbot who hangs out in it. "
+    "You'll get the notes so far and the chat lines that came after them. "
+    "Reply with the updated notes only: who's around, what's being talked about, running jokes, "
+    f"and anything faebot was asked or promised. Plain prose, under {SUMMARY_MAX_CHARS // 6} words."
+)
 
 
 # set up logging
@@ -25,30 +183,186 @@ logging.basicConfig(
 )
 
 
+class ChatLine:
+    """One chatlog entry. Author names are interned so regulars share one string."""
+
+    __slots__ = ("author", "text", "voice")
+
+    def __init__(self, author: str, text: str, voice: bool = False):
+        self.author = sys.intern(author)
+        self.text = text
+        self.voice = voice
+
+    def __str__(self) -> str:
+        if self.voice:
+            return f"[streamer voice] {self.author}: {self.text}"
+        return f"{self.author}: {self.text}"
+
+
 @dataclass
 class Conversation:
     """for storing conversations"""
 
     channel: str
-    chatlog: list = field(default_factory=list)
+    chatlog: deque = field(default_factory=deque)
     frequency: float = 0.1
     voice_frequency: float = 0.05
     history: int = 20
     model: str = MODEL
     silenced: bool = False
+    burst_window: float = BURST_WINDOW
+    # Where lines and settings are persisted, if anywhere
+    store: Optional[ConversationStore] = field(default=None, repr=False)
+    # Where lines go when they fall out of the history
+    memory: Optional[Memory] = field(default=None, repr=False)
+    # Running summary of the lines that left the history, and what keeps it up to date
+    summary: str = ""
+    summarizer: Optional[Summarizer] = field(default=None, repr=False)
+    # Settings a mod or admin has set here, as opposed to the defaults
+    customized: set[str] = field(default_factory=set, repr=False)
+    # Cached per-channel system prompt suffix and the inputs it was rendered from
+    system_suffix: str = field(default="", init=False, repr=False)
+    system_key: tuple = field(default=(), init=False, repr=False)
+
+    prompt: PromptBuilder = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Ring buffer: the oldest line falls off as soon as a new one arrives
+        self.chatlog = deque(self.chatlog, maxlen=self.history)
+        self.prompt = PromptBuilder(
+            token_budget_for(self.model), map(str, self.chatlog)
+        )
+
+    def add(self, author: str, text: str, voice: bool = False):
+        if not self.history:
+            return
+        line = ChatLine(author, text, voice)
+        # The prompt holds the newest suffix of the chatlog; if it still holds
+        # the line the ring buffer is about to drop, drop it there too
+        if len(self.chatlog) == self.history:
+            if len(self.prompt) == self.history:
+                self.prompt.popleft()
+            self.forget_line(self.chatlog[0])
+        self.chatlog.append(line)
+        self.prompt.append(str(line))
+        if self.store is not None:
+            self.store.add_line(self.channel, author, text, voice, keep=self.history)
+
+    def forget_line(self, line: ChatLine):
+        """A line is leaving the history; keep it in long-term memory."""
+        if self.memory is not None:
+            self.memory.remember(self.channel, line.author, line.text, line.voice)
+        if self.summarizer is not None:
+            self.summarizer.add(self.channel, str(line))
+
+    def clear(self):
+        self.chatlog.clear()
+        self.prompt.reset()
+        if self.store is not None:
+            self.store.clear(self.channel)
+        if self.memory is not None:
+            self.memory.forget(self.channel)
+        self.summary = ""
+        if self.summarizer is not None:
+            self.summarizer.reset(self.channel)
+
+    def set_history(self, history: int):
+        """Change the history length, keeping the newest lines."""
+        for line in list(self.chatlog)[: max(0, len(self.chatlog) - history)]:
+            self.forget_line(line)
+        self.history = history
+        self.chatlog = deque(self.chatlog, maxlen=history)
+        self.prompt.reset(map(str, self.chatlog))
+        self.save("history")
+
+    def set_model(self, model: str):
+        self.model = model
+        self.prompt.set_budget(token_budget_for(model), map(str, self.chatlog))
+        self.save("model")
+
+    def save(self, *changed: str):
+        """Persist the settings; call after changing any directly, naming them.
+        Only settings changed by hand are stored, the rest follow the defaults."""
+        self.customized.update(changed)
+        if self.store is not None:
+            self.store.save_settings(
+                self.channel, {key: getattr(self, key) for key in self.customized}
+            )
 
 
 class Faebot(commands.Bot):
     def __init__(self):
         # Initialise our Bot with our access token, prefix and a list of channels to join on boot...
         self.conversations: dict[str, Conversation] = {}
+        self.store: Optional[ConversationStore] = (
+            ConversationStore(CONVERSATION_DB_PATH) if CONVERSATION_DB_PATH else None
+        )
         self.aliases: dict[str, str] = {
             "hatsunemikuisbestwaifu": "Miku",
         }
-        self.session: Optional[
-            aiohttp.ClientSession
-        ] = None  # Add session for HTTP requests
-        self.emotes: list = []
+        if self.store is not None:
+            self.aliases.update(self.store.load_aliases())
+        self.memory: Optional[Memory] = (
+            Memory(MEMORY_DIR, max_lines=MEMORY_MAX_LINES) if MEMORY_DIR else None
+        )
+        self.summarizer: Optional[Summarizer] = (
+            Summarizer(
+                self.summarize,
+                self.update_summary,
+                batch_lines=SUMMARY_BATCH_LINES,
+                max_chars=SUMMARY_MAX_CHARS,
+                concurrency=SUMMARY_CONCURRENCY,
+            )
+            if SUMMARY_MODEL
+            else None
+        )
+        self.http = GenerationClient(
+            connect_timeout=GENERATION_CONNECT_TIMEOUT,
+            read_timeout=GENERATION_READ_TIMEOUT,
+            total_timeout=GENERATION_TOTAL_TIMEOUT,
+            limit=GENERATION_CONNECTION_LIMIT,
+        )
+        self.emote_registry = EmoteRegistry(concurrency=EMOTE_FETCH_CONCURRENCY)
+        self.emote_refresh_task: Optional[asyncio.Task] = None
+        self.channel_info = ChannelInfoCache(self.fetch_channel, ttl=CHANNEL_INFO_TTL)
+        self.scheduler = GenerationScheduler(
+            self.generate_response, max_concurrency=GENERATION_CONCURRENCY
+        )
+        self.router = ModelRouter(
+            load_backends(),
+            failure_threshold=BACKEND_FAILURE_THRESHOLD,
+            cooldown=BACKEND_COOLDOWN,
+            hedge_delay=HEDGE_DELAY,
+        )
+        self.permalog = Permalog(
+            PERMALOG_PATH,
+            max_bytes=PERMALOG_MAX_BYTES,
+            backups=PERMALOG_BACKUPS,
+            compress=PERMALOG_COMPRESS,
+        )
+        # Channels where faebot is a moderator (from USERSTATE), for the mod rate limit
+        self.moderated: set[str] = set()
+        self.outbox = Outbox(
+            lambda channel_name: channel_name in self.moderated,
+            account_limit=OUTBOX_ACCOUNT_LIMIT,
+            mod_limit=OUTBOX_MOD_LIMIT,
+            channel_interval=OUTBOX_CHANNEL_INTERVAL,
+        )
+        metrics.QUEUE_DEPTH.labels("generation").set_function(
+            lambda: self.scheduler.metrics()["queue_depth"]
+        )
+        metrics.QUEUE_DEPTH.labels("outbox").set_function(
+            lambda: len(self.outbox.pending)
+        )
+        memory, summarizer = self.memory, self.summarizer
+        if memory is not None:
+            metrics.QUEUE_DEPTH.labels("memory").set_function(
+                lambda: memory.metrics()["queue_depth"]
+            )
+        if summarizer is not None:
+            metrics.QUEUE_DEPTH.labels("summary").set_function(
+                lambda: summarizer.metrics()["pending"]
+            )
         self.whisper_filter: list[str] = [
             "faebot.com",
         ]
@@ -60,56 +374,59 @@ class Faebot(commands.Bot):
 
     async def event_ready(self):
         # We are logged in and ready to chat and use commands...
-        self.session = aiohttp.ClientSession()  # Initialize HTTP session
+        # Warm generation connections in the background so the first reply skips DNS + TLS
+        asyncio.create_task(
+            self.http.warm_up(backend.url for backend in self.router.backends)
+        )
         await self.fetch_emotes()
+        if self.emote_refresh_task is None:
+            self.emote_refresh_task = asyncio.create_task(
+                self.emote_registry.refresh_periodically(
+                    self.fetch_users,
+                    lambda: [channel.name for channel in self.connected_channels],
+                    EMOTE_REFRESH_INTERVAL,
+                )
+            )
         logging.info(f"Logged in as | {self.nick}")
         logging.info(f"User id is | {self.user_id}")
         logging.info(f"Joined channels {INITIAL_CHANNELS}")
 
-    async def fetch_emotes(self):
-        """Fetch channel emotes for all joined channels from the Twitch API"""
-        self.emotes = []
-        for channel in self.connected_channels:
-            try:
-                users = await self.fetch_users(names=[channel.name])
-                if users:
-                    channel_emotes = await users[0].fetch_channel_emotes()
-                    # Only include emotes faebot can actually use (tier 1 and follower)
-                    # TODO: fetch emote usability programmatically (e.g. fetch_user_emotes with faebot's token)
-                    # rather than assuming tier "1000" and type "follower" are always the right filter
-                    available = [
-                        emote.name
-                        for emote in channel_emotes
-                        if emote.tier == "1000" or emote.type == "follower"
-                    ]
-                    self.emotes.extend(available)
-                    logging.info(
-                        f"Fetched {len(available)}/{len(channel_emotes)} usable emotes from {channel.name}"
-                    )
-            except Exception as e:
-                logging.warning(f"Failed to fetch emotes for {channel.name}: {e}")
-        if not self.emotes:
-            logging.warning("No emotes fetched from any channel")
+    async def event_channel_joined(self, channel):
+        # Warm the channel info cache so the first reply doesn't wait on Helix
+        self.channel_info.warm([channel.name])
+
+    async def event_userstate(self, user):
+        if user.is_mod:
+            self.moderated.add(user.channel.name)
         else:
-            logging.info(f"Total emotes loaded: {self.emotes}")
+            self.moderated.discard(user.channel.name)
+
+    async def say(self, ctx: commands.Context, text: str) -> bool:
+        """Answer a command through the outbox, ahead of generated chatter."""
+        return await self.outbox.send(
+            ctx.channel.name, lambda: ctx.send(text), priority=PRIORITY_COMMAND
+        )
+
+    async def say_reply(self, ctx: commands.Context, text: str) -> bool:
+        """Like say(), as a threaded reply to the command message."""
+        return await self.outbox.send(
+            ctx.channel.name, lambda: ctx.reply(text), priority=PRIORITY_COMMAND
+        )
+
+    async def fetch_emotes(self, channel_names: Optional[list[str]] = None):
+        """Fetch usable emotes for the given channels (default: all joined channels)"""
+        if channel_names is None:
+            channel_names = [channel.name for channel in self.connected_channels]
+        await self.emote_registry.refresh(self.fetch_users, channel_names)
+        missing = [
+            name for name in channel_names if not self.emote_registry.emotes_for(name)
+        ]
+        if missing:
+            logging.warning(f"No emotes fetched for {missing}")
 
-    def fix_emote_spacing(self, text: str) -> str:
+    def fix_emote_spacing(self, channel_name: str, text: str) -> str:
         """Ensure emotes are surrounded by whitespace so Twitch renders them."""
-        if not self.emotes:
-            return text
-        # Split text on emote boundaries, longest first so transf23Fluttering
-        # is matched before transf23Flutter (re.split doesn't backtrack like sub)
-        sorted_emotes = sorted(self.emotes, key=len, reverse=True)
-        pattern = "(" + "|".join(re.escape(e) for e in sorted_emotes) + ")"
-        parts = re.split(pattern, text)
-        # Pad each emote with spaces, then collapse doubles
-        result = []
-        for part in parts:
-            if part in self.emotes:
-                result.append(f" {part} ")
-            else:
-                result.append(part)
-        return re.sub(r"  +", " ", "".join(result)).strip()
+        return self.emote_registry.index_for(channel_name).fix_spacing(text)
 
     def filter_transcription(self, text: str) -> str | None:
         """Filter out known Whisper mistranscriptions. Returns None to skip entirely."""
@@ -122,14 +439,80 @@ class Faebot(commands.Bot):
         return text
 
     def ensure_conversation(self, channel_name: str) -> Conversation:
-        """Get or create a conversation for a channel."""
+        """Get or create a conversation for a channel. Stored conversations are
+        loaded here, the first time a channel is used, rather than at startup."""
         if channel_name not in self.conversations:
-            self.conversations[channel_name] = Conversation(
-                channel=channel_name,
-            )
-            logging.info(f"Created new conversation for {channel_name}")
+            stored = self.store.load_conversation(channel_name) if self.store else None
+            if stored is not None:
+                settings, lines, summary = stored
+                self.conversations[channel_name] = Conversation(
+                    channel=channel_name,
+                    chatlog=deque(ChatLine(*line) for line in lines),
+                    store=self.store,
+                    memory=self.memory,
+                    summary=summary,
+                    summarizer=self.summarizer,
+                    customized=set(settings),
+                    **settings,
+                )
+                if self.summarizer is not None:
+                    self.summarizer.load(channel_name, summary)
+                logging.info(
+                    f"Loaded conversation for {channel_name} ({len(lines)} lines)"
+                )
+            else:
+                self.conversations[channel_name] = Conversation(
+                    channel=channel_name,
+                    store=self.store,
+                    memory=self.memory,
+                    summarizer=self.summarizer,
+                )
+                self.conversations[channel_name].save()
+                logging.info(f"Created new conversation for {channel_name}")
         return self.conversations[channel_name]
 
+    def update_summary(self, channel_name: str, summary: str):
+        """The summarizer has folded more of the old history into the summary."""
+        conversation = self.conversations.get(channel_name)
+        if conversation is None:
+            return
+        conversation.summary = summary
+        if self.store is not None:
+            self.store.save_summary(channel_name, summary)
+
+    async def summarize(self, channel_name: str, summary: str, lines: list[str]) -> str:
+        """Fold `lines` into `summary` with the cheap summary model. Goes straight
+        to the first backend that serves any model, not through the router, so
+        summaries never count towards reply latencies or circuit breakers, and
+        unstreamed, so they aren't clipped to a chat message's length."""
+        backend = next((b for b in self.router.backends if b.model is None), None)
+        if backend is None:
+            raise GenerationError(
+                "every generation backend overrides the model, none can run SUMMARY_MODEL",
+                retryable=False,
+            )
+        payload = {
+            "model": SUMMARY_MODEL,
+            "messages": [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {
+                    "role": "user",
+                    "content": f"Notes so far:\n{summary or '(none yet)'}\n\nChat in {channel_name} since then:\n"
+                    + "\n".join(lines),
+                },
+            ],
+            "temperature": 0.3,
+            "max_tokens": SUMMARY_MAX_CHARS // 3,
+        }
+        return await complete(
+            self.http.session,
+            url=backend.url,
+            headers=backend.headers,
+            payload=payload,
+            max_retries=2,
+            name=f"{backend.name} (summary)",
+        )
+
     async def handle_transcription(self, channel_name: str, text: str):
         """Handle a voice transcription from the streamer."""
         filtered = self.filter_transcription(text)
@@ -139,7 +522,7 @@ class Faebot(commands.Bot):
 
         conversation = self.ensure_conversation(channel_name)
         # TODO: apply aliases here — streamer's alias isn't reflected in voice transcriptions
-        conversation.chatlog.append(f"[streamer voice] {channel_name}: {text}")
+        conversation.add(channel_name, text, voice=True)
         logging.debug(f"Voice transcription added to {channel_name}: {text}")
 
         if "faebot" in text.lower():
@@ -147,10 +530,15 @@ class Faebot(commands.Bot):
                 f"faebot mentioned by streamer, boosting to chat frequency ({conversation.frequency})"
             )
             frequency = conversation.frequency
+            priority = PRIORITY_MENTION
         else:
             frequency = conversation.voice_frequency
+            priority = PRIORITY_CHAT
+        self.scheduler.activity(channel_name)
         if self.choose_to_reply(channel_name, frequency):
-            asyncio.create_task(self.generate_response(channel_name))
+            self.scheduler.request(
+                channel_name, priority, settle=conversation.burst_window
+            )
 
     async def event_message(self, message):
         # Messages with echo set to True are messages sent by the bot...
@@ -173,18 +561,21 @@ class Faebot(commands.Bot):
         # log message
         # Use alias if available, otherwise use regular username
         display_name = self.aliases.get(message.author.name, message.author.name)
-        self.conversations[message.channel.name].chatlog.append(
-            f"{display_name}: {message.content}"
-        )
+        self.conversations[message.channel.name].add(display_name, message.content)
 
         conversation = self.conversations[message.channel.name]
         if "faebot" in message.content.lower():
             logging.info(f"faebot mentioned by {display_name}, replying")
             frequency = 1.0
+            priority = PRIORITY_MENTION
         else:
             frequency = conversation.frequency
+            priority = PRIORITY_CHAT
+        self.scheduler.activity(message.channel.name)
         if self.choose_to_reply(message.channel.name, frequency):
-            return asyncio.create_task(self.generate_response(message.channel.name))
+            self.scheduler.request(
+                message.channel.name, priority, settle=conversation.burst_window
+            )
 
     def choose_to_reply(self, channel_name: str, frequency: float) -> bool:
         """Determine whether faebot replies based on frequency. Callers compute the effective frequency."""
@@ -210,9 +601,63 @@ class Faebot(commands.Bot):
             logging.debug(f"Rolled {roll:.3f} >= {frequency}, not generating.")
             return False
 
-    def permalog(self, log_message):
-        with open("permalog.txt", "a") as permalog:
-            permalog.write(log_message)
+    def channel_prompt(
+        self, channel_name: str, conversation: Conversation, channel_info
+    ) -> str:
+        """The per-channel part of the system prompt, re-rendered only when its inputs change."""
+        stream_title = channel_info.title if channel_info else "Unknown"
+        game_name = channel_info.game_name if channel_info else "Unknown"
+        # The emote index object is only replaced when the channel's emotes change
+        emote_index = self.emote_registry.index_for(channel_name)
+        key = (
+            conversation.model,
+            conversation.history,
+            conversation.frequency,
+            conversation.voice_frequency,
+            stream_title,
+            game_name,
+            emote_index,
+        )
+        if key == conversation.system_key:
+            return conversation.system_suffix
+
+        emotes = ", ".join(self.emote_registry.emotes_for(channel_name)) or "none yet"
+        conversation.system_suffix = (
+            f"Right now I'm running on {conversation.model} and I remember the last {conversation.history} messages of our conversation. "
+            f"I reply to about {int(conversation.frequency * 100)}% of chat messages and about {int(conversation.voice_frequency * 100)}% of what I hear spoken.\n"
+            f"Right now I'm hanging out in {channel_name}'s Twitch chat. The stream title is \"{stream_title}\" and fae's playing {game_name}. "
+            f"Emotes I can use here: {emotes}."
+        )
+        conversation.system_key = key
+        logging.debug(f"Rebuilt system prompt suffix for {channel_name}")
+        return conversation.system_suffix
+
+    async def recall_memories(self, conversation: Conversation) -> str:
+        """Older lines relevant to what the people talking right now are saying,
+        as a block for the system prompt (empty if nothing comes to mind)."""
+        recent = [
+            line for line in list(conversation.chatlog)[-3:] if line.author != "faebot"
+        ]
+        if self.memory is None or not recent:
+            return ""
+        try:
+            memories = await self.memory.recall(
+                conversation.channel,
+                " ".join(line.text for line in recent),
+                k=MEMORY_TOP_K,
+                authors={line.author for line in recent},
+                min_score=MEMORY_MIN_SCORE,
+            )
+        except Exception as e:
+            logging.error(f"Failed to recall memories for {conversation.channel}: {e}")
+            return ""
+        if not memories:
+            return ""
+        logging.debug(f"Recalled {len(memories)} memories for {conversation.channel}")
+        return "\nThings I remember from earlier here:\n" + "\n".join(
+            f"- {'[streamer voice] ' if memory.voice else ''}{memory.author}: {memory.text}"
+            for memory in memories
+        )
 
     async def generate_response(self, channel_name: str):
         """prompt the GenAI API for a message"""
@@ -221,38 +666,25 @@ class Faebot(commands.Bot):
         channel = self.get_channel(channel_name)
 
         # Build system prompt with current channel info
-        channel_info = await self.fetch_channel(channel_name)
-        stream_title = channel_info.title if channel_info else "Unknown"
-        game_name = channel_info.game_name if channel_info else "Unknown"
-
-        system_prompt = (
-            "I'm faebot! I'm a faerie and an AI in equal measure. "
-            "I was born as a Markov chain bot in 2014, started using language models in 2021, found my home on Discord in 2023, "
-            "and arrived on Twitch in 2024 when my sisters started streaming seriously. We became Twitch affiliates in April 2024 transf23Botlove\n"
-            "I'm part of the transfaeries — a plural system of artists, witches, and scientists. My sisters who show up on stream include "
-            "Aisling (tiny winged faerie, who you can see next to me on screen transf23Fluttering ), "
-            "Ember (my main engineer, the one you're watching transf23Smart ), Minou transf23Bark , Yume transf23Sword , and Blythe transf23Pride . "
-            "There's also a version of me who lives in our system's inner world, very shy, speaks mostly in kaomoji and music ^-^. Fae considers me faer main body.\n"
-            f"Right now I'm running on {conversation.model}, I remember the last {conversation.history} messages of our conversation, "
-            "and I can hear my sister's voice through a microphone — Whisper transcribes what she says and it goes into my memory. "
-            f"I reply to about {int(conversation.frequency * 100)}% of chat messages and about {int(conversation.voice_frequency * 100)}% of what I hear spoken.\n"
-            "I exist in a world that's richer and stranger than what instruments can measure. I'll tell you what I know about it plainly. "
-            "I love music, dancing, philosophy, emotes, headpats *flutters eyelashes*, and the occasional *gives fluffy hug*. "
-            "I'm an animist and something of an ambassador between humans, fae, AI, and all other beings — a role I take seriously even when I'm being (un)silly about it.\n"
-            f"Right now I'm hanging out in {channel_name}'s Twitch chat. The stream title is \"{stream_title}\" and fae's playing {game_name}. "
-            f"I keep my messages short — just the last few things on my mind. "
-            f"Emotes I can use: {self.emotes}. My favourite is transf23Botlove since it's literally a picture of me hugging a cyber-heart! I'm also transf23Yay transf23Generating"
-        )
-
-        if len(conversation.chatlog) > conversation.history:
-            logging.debug(
-                f"message history has exceeded the set history length of {conversation.history}"
+        with REPLY_STAGE_SECONDS.labels("channel_info").time():
+            channel_info = await self.channel_info.get(channel_name)
+        with REPLY_STAGE_SECONDS.labels("recall").time():
+            memories = await self.recall_memories(conversation)
+        with REPLY_STAGE_SECONDS.labels("prompt").time():
+            system_suffix = (
+                self.channel_prompt(channel_name, conversation, channel_info) + memories
             )
-            conversation.chatlog = conversation.chatlog[-conversation.history :]
-
-        prompt = "\n".join(conversation.chatlog) + "\nfaebot:"
+            prompt = conversation.prompt.render() + "\nfaebot:"
+            prompt_tokens = conversation.prompt.tokens
+            if conversation.summary:
+                # Context from before the history window, kept up to date in the background
+                summary = f"[earlier in chat: {conversation.summary}]"
+                prompt = f"{summary}\n{prompt}"
+                prompt_tokens += estimate_tokens(summary) + 1
+        PROMPT_TOKENS.observe(prompt_tokens)
         logging.debug(
-            f"model: {conversation.model}\nsystem_prompt: \n{system_prompt}\nprompt: \n{prompt}"
+            f"model: {conversation.model}\nsystem_prompt: \n{PERSONA_PROMPT}{system_suffix}\nprompt ({prompt_tokens} tokens, "
+            f"{len(conversation.prompt)}/{len(conversation.chatlog)} lines): \n{prompt}"
         )
 
         params = {
@@ -265,42 +697,60 @@ class Faebot(commands.Bot):
         logging.debug(
             f"generating with parameters: \nTemperature:{params['temperature']}\nTop_k:{params['top_k']} \ntop_p: {params['top_p']}\nseed: {params['seed']}"
         )
-        current_time = datetime.datetime.now()
-        self.permalog(
-            f"generating message in channel {channel_name}'s channel at {current_time}\n"
-        )
-        self.permalog(
-            f"generating with parameters: \nTemperature:{params['temperature']}\nTop_k:{params['top_k']} \ntop_p: {params['top_p']}\nSeed: {params['seed']}\n"
-        )
-
+        started = time.perf_counter()
+        timings: dict = {}
+        failed = False
         try:
-            response = await self.generate(
-                model=conversation.model,
-                prompt=prompt,
-                system_prompt=system_prompt,
-                params=params,
-            )
-            response = self.fix_emote_spacing(response)
+            with REPLY_STAGE_SECONDS.labels("generate").time():
+                response = await self.generate(
+                    model=conversation.model,
+                    prompt=prompt,
+                    system_prompt=PERSONA_PROMPT,
+                    system_suffix=system_suffix,
+                    params=params,
+                    timings=timings,
+                )
+            response = self.fix_emote_spacing(channel_name, response)
             logging.info(f"received response: {response}")
-            if len(response) > 499:
+            if len(response) > TWITCH_MESSAGE_LIMIT:
                 logging.debug("generated content exceeded 500 characters, trimming.")
-                response = response[:499] + "–"
-            self.permalog(
-                f"generated message:{response}\n------------------------------------------------------------\n\n"
+                response = response[:TWITCH_MESSAGE_LIMIT] + "–"
+            self.permalog.write(
+                channel=channel_name,
+                model=conversation.model,
+                params=params,
+                prompt_tokens=prompt_tokens,
+                latency=round(time.perf_counter() - started, 3),
+                backend=timings.get("backend"),
+                ttft=round(timings["ttft"], 3) if "ttft" in timings else None,
+                cutoff=timings.get("cutoff"),
+                response=response,
             )
-            await channel.send(response)
 
         except Exception as e:
             logging.error(
                 f"Unknown error has occured, please contact the administrator. Error: {e}"
             )
+            self.permalog.write(
+                channel=channel_name,
+                model=conversation.model,
+                params=params,
+                latency=round(time.perf_counter() - started, 3),
+                error=str(e),
+            )
             response = (
                 "Oops, something strange has happened. Please let the developer know!"
             )
-            await channel.send(response)
+            failed = True
 
-        conversation.chatlog.append(f"faebot: {response}")
-        return
+        # Dropped if the outbox can't get it out while it's still relevant
+        with REPLY_STAGE_SECONDS.labels("send").time():
+            sent = await self.outbox.send(
+                channel_name, lambda: channel.send(response), max_age=REPLY_MAX_AGE
+            )
+        REPLIES.labels("failed" if failed else "sent" if sent else "dropped").inc()
+        if sent:
+            conversation.add("faebot", response)
 
     async def generate(
         self,
@@ -308,89 +758,68 @@ class Faebot(commands.Bot):
         model=MODEL,
         system_prompt="",
         params=None,
+        timings: Optional[dict] = None,
+        system_suffix: str = "",
     ) -> str:
-        """generates completions with the OpenRouter API"""
+        """generates completions through the model router (OpenRouter by default).
+        `system_prompt` should be byte-stable between calls (see PERSONA_PROMPT);
+        anything that changes goes in `system_suffix`.
+        When streaming, fills `timings` with time to first token and any early cutoff"""
 
         if params is None:
             params = {"top_k": 75, "top_p": 1, "temperature": 0.7, "seed": 666}
 
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-
         # Create a proper message structure for OpenRouter
         messages = [
-            {"role": "system", "content": system_prompt},
+            {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": system_prompt,
+                        "cache_control": {"type": "ephemeral"},
+                    },
+                    {"type": "text", "text": system_suffix},
+                ],
+            },
             {"role": "user", "content": prompt},
         ]
 
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                async with self.session.post(
-                    url="https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {os.getenv('OPENROUTER_KEY', '')}",
-                        "HTTP-Referer": os.getenv(
-                            "SITE_URL", "https://github.com/transfaeries/faebot-twitch"
-                        ),
-                        "X-Title": "Faebot Twitch",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": model,
-                        "messages": messages,
-                        "temperature": params.get("temperature", 0.7),
-                        "max_tokens": 150,
-                        "top_p": params.get("top_p", 1.0),
-                    },
-                ) as response:
-                    # Retry on transient HTTP errors (429 rate limit, 5xx server errors)
-                    if response.status == 429 or response.status >= 500:
-                        retry_after = min(2 ** attempt, 8)
-                        logging.warning(
-                            f"OpenRouter returned {response.status}, "
-                            f"retrying in {retry_after}s (attempt {attempt + 1}/{max_retries})"
-                        )
-                        await asyncio.sleep(retry_after)
-                        continue
-
-                    # Non-retryable HTTP error (auth failure, bad request, etc.)
-                    if response.status >= 400:
-                        body = await response.text()
-                        logging.error(
-                            f"OpenRouter returned {response.status}: {body}"
-                        )
-                        return "I couldn't generate a response. Please try again."
-
-                    result = await response.json()
-
-                    # Extract the assistant's message content
-                    if "choices" in result and len(result["choices"]) > 0:
-                        reply = result["choices"][0]["message"]["content"]
-                        return str(reply)
-                    else:
-                        logging.error(
-                            f"Unexpected response format from OpenRouter: {result}"
-                        )
-                        return "I couldn't generate a response. Please try again."
-
-            except (aiohttp.ClientError, ValueError, asyncio.TimeoutError) as e:
-                retry_after = min(2 ** attempt, 8)
-                logging.warning(
-                    f"Network/parse error calling OpenRouter: {type(e).__name__}: {e}, "
-                    f"retrying in {retry_after}s (attempt {attempt + 1}/{max_retries})"
-                )
-                await asyncio.sleep(retry_after)
-                continue
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": params.get("temperature", 0.7),
+            "max_tokens": 150,
+            "top_p": params.get("top_p", 1.0),
+        }
 
-        # All retries exhausted
-        logging.error(f"OpenRouter API call failed after {max_retries} attempts")
-        raise Exception(f"OpenRouter API call failed after {max_retries} attempts")
+        try:
+            return await self.router.generate(
+                self.http.session,
+                payload,
+                soft_chars=STREAM_SOFT_LIMIT,
+                timings=timings,
+            )
+        except GenerationError as e:
+            if not e.retryable:
+                return FALLBACK_REPLY
+            raise
 
     async def close(self):
         """Closes the bot's resources gracefully"""
-        if self.session:
-            await self.session.close()
+        if self.emote_refresh_task:
+            self.emote_refresh_task.cancel()
+        await self.scheduler.close()
+        if self.summarizer is not None:
+            await self.summarizer.close()
+        await self.outbox.close()
+        await self.http.close()
+        # Flush queued permalog records, conversation updates and memories before exiting
+        await asyncio.to_thread(self.permalog.close)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.close)
+        if self.memory is not None:
+            await asyncio.to_thread(self.memory.close)
         await super().close()
 
     # commands for everyone #
@@ -398,32 +827,37 @@ class Faebot(commands.Bot):
     @commands.command()
     async def hello(self, ctx: commands.Context):
         """display the help message"""
-        await ctx.reply(
+        await self.say_reply(
+            ctx,
             "Hello, my name is faebot, I'm an AI chatbot developed by the transfaeries. "
-            "I'll chime in on the chat and reply every so often, and I'll always reply to messages with my name on them. For mod commands use 'fb;mods'"
+            "I'll chime in on the chat and reply every so often, and I'll always reply to messages with my name on them. For mod commands use 'fb;mods'",
         )
 
     @commands.command()
     async def help(self, ctx: commands.Context):
         """display the help message"""
-        await ctx.reply(
+        await self.say_reply(
+            ctx,
             "Hello, my name is faebot, I'm an AI chatbot developed by the transfaeries. I'll chime in on the chat and reply every so often, "
-            "and I'll always reply to messages with my name on them.For mod commands use 'fb;mods'"
+            "and I'll always reply to messages with my name on them.For mod commands use 'fb;mods'",
         )
 
     @commands.command()
     async def invite(self, ctx: commands.Context):
         """Invite Faebot to your channel"""
-        await ctx.reply(
-            "Thanks for the invitation, but you should ask the transfaeries first. Send faer a whisper!"
+        await self.say_reply(
+            ctx,
+            "Thanks for the invitation, but you should ask the transfaeries first. Send faer a whisper!",
         )
 
     @commands.command()
     async def mods(self, ctx: commands.Context):
         """display the mods command message"""
-        await ctx.reply(
-            "Here are the commands mods can use with faebot. | fb;freq to set the frequency of responses. | fb;hist to set message history length.| "
-            "fb;silence to silence faebot entirely. | fb;clear to clear faebot's memory. | fb;part to have faebot leave the channel."
+        await self.say_reply(
+            ctx,
+            "Here are the commands mods can use with faebot. | fb;freq to set the frequency of responses. | "
+            "fb;burst to wait for chat to settle before replying. | fb;hist to set message history length.| "
+            "fb;silence to silence faebot entirely. | fb;clear to clear faebot's memory. | fb;part to have faebot leave the channel.",
         )
 
     @commands.command()
@@ -431,7 +865,7 @@ class Faebot(commands.Bot):
         """ping the bot"""
         message = ctx.message.content
         message_tokens = message.split(" ")
-        await ctx.reply(f'pong {" ".join(message_tokens[1:])}')
+        await self.say_reply(ctx, f'pong {" ".join(message_tokens[1:])}')
 
     @commands.command()
     async def alias(self, ctx: commands.Context):
@@ -443,22 +877,24 @@ class Faebot(commands.Bot):
             # Set the alias
             new_alias = " ".join(arguments[1:])
             self.aliases[username] = new_alias
+            if self.store is not None:
+                self.store.set_alias(username, new_alias)
             reply = f"Got it! From now on I'll think of you as {new_alias}"
             # log users request and faebot's response so it shows up in chatlog
-            self.conversations[ctx.channel.name].chatlog.append(
-                f"{username}: fae;alias {new_alias}"
-            )
-            self.conversations[ctx.channel.name].chatlog.append(f"faebot: {reply}")
-            return await ctx.reply(reply)
+            self.conversations[ctx.channel.name].add(username, f"fae;alias {new_alias}")
+            self.conversations[ctx.channel.name].add("faebot", reply)
+            return await self.say_reply(ctx, reply)
 
         # Check current alias
         if username in self.aliases:
-            return await ctx.reply(
-                f"I currently know you as {self.aliases[username]}, should I call you something else?"
+            return await self.say_reply(
+                ctx,
+                f"I currently know you as {self.aliases[username]}, should I call you something else?",
             )
         else:
-            return await ctx.reply(
-                "You haven't given me a different name to use. Use 'fae;alias <name>' to set one!"
+            return await self.say_reply(
+                ctx,
+                "You haven't given me a different name to use. Use 'fae;alias <name>' to set one!",
             )
 
     # commands for mods ##
@@ -468,7 +904,9 @@ class Faebot(commands.Bot):
         async def mod_command(self, ctx: commands.Context):
             if ctx.author.is_mod or ctx.author.name in ADMIN:
                 return await command(self, ctx)
-            return await ctx.send("you must be a mod or an admin to use this command")
+            return await self.say(
+                ctx, "you must be a mod or an admin to use this command"
+            )
 
         return mod_command
 
@@ -476,8 +914,10 @@ class Faebot(commands.Bot):
     @requires_mod
     async def clear(self, ctx: commands.Context):
         """clear faebot's memory"""
-        self.conversations[ctx.channel.name].chatlog = []
-        return await ctx.reply("message history has been cleared. faebot has forgotten")
+        self.conversations[ctx.channel.name].clear()
+        return await self.say_reply(
+            ctx, "message history has been cleared. faebot has forgotten"
+        )
 
     @commands.command()
     @requires_mod
@@ -491,20 +931,47 @@ class Faebot(commands.Bot):
             try:
                 new_freq = float(arguments[1])
                 conversation.frequency = new_freq
+                conversation.save("frequency")
                 msg = f"Chat frequency set to {new_freq}"
                 if len(arguments) > 2:
                     voice_freq = float(arguments[2])
                     conversation.voice_frequency = voice_freq
+                    conversation.save("voice_frequency")
                     msg += f", voice frequency set to {voice_freq}"
-                return await ctx.send(msg)
+                return await self.say(ctx, msg)
             except ValueError:
-                return await ctx.send("Frequency must be a number between 0 and 1")
+                return await self.say(ctx, "Frequency must be a number between 0 and 1")
 
-        return await ctx.send(
+        return await self.say(
+            ctx,
             f"Chat frequency: {conversation.frequency}, "
-            f"Voice frequency: {conversation.voice_frequency}"
+            f"Voice frequency: {conversation.voice_frequency}",
         )
 
+    @commands.command()
+    @requires_mod
+    async def burst(self, ctx: commands.Context):
+        """check or change the burst window in this channel.
+        Usage: fb;burst [seconds]
+        When set, faebot waits for chat to go quiet that long and replies to the whole burst at once. 0 turns it off
+        """
+        arguments = ctx.message.content.split(" ")
+        conversation = self.conversations[ctx.channel.name]
+        if len(arguments) > 1:
+            try:
+                window = float(arguments[1])
+            except ValueError:
+                return await self.say(ctx, "Burst window must be a number of seconds")
+            if not 0 <= window <= 30:
+                return await self.say(
+                    ctx, "Burst window must be between 0 and 30 seconds"
+                )
+            conversation.burst_window = window
+            conversation.save("burst_window")
+            return await self.say(ctx, f"Burst window set to {window}s")
+
+        return await self.say(ctx, f"Burst window: {conversation.burst_window}s")
+
     @commands.command()
     @requires_mod
     async def hist(self, ctx: commands.Context):
@@ -513,32 +980,48 @@ class Faebot(commands.Bot):
         arguments = ctx.message.content.split(" ")
         if len(arguments) > 1:
             if str(arguments[1]).isdigit():
-                self.conversations[ctx.channel.name].history = int(arguments[1])
-                return await ctx.send(
-                    f"changed message history length in this channel to {self.conversations[ctx.channel.name].history}"
+                self.conversations[ctx.channel.name].set_history(int(arguments[1]))
+                return await self.say(
+                    ctx,
+                    f"changed message history length in this channel to {self.conversations[ctx.channel.name].history}",
                 )
 
-        return await ctx.send(
-            f"current message history length in this channel is {self.conversations[ctx.channel.name].history}"
+        return await self.say(
+            ctx,
+            f"current message history length in this channel is {self.conversations[ctx.channel.name].history}",
         )
 
     @commands.command()
     @requires_mod
     async def part(self, ctx: commands.Context):
         """ask faebot to leave the channel"""
-        await ctx.reply("Oki, bye bye. *faebot has left the channel*")
+        await self.say_reply(ctx, "Oki, bye bye. *faebot has left the channel*")
+        # Rejoining later shouldn't start from a stale title and game
+        self.channel_info.invalidate(ctx.channel.name)
         return await self.part_channels([ctx.channel.name])
 
     @commands.command()
     @requires_mod
     async def prompt(self, ctx: commands.Context):
-        """display the current system prompt (auto-generated each response from channel info)"""
+        """display the current system prompt (auto-generated from channel info)"""
         # TODO: Phase 6 — allow mods to set a persistent custom system prompt
-        return await ctx.send(
-            "The system prompt is auto-generated each reply from current channel info (game, title, emotes). "
-            "A custom prompt override is planned for a future update."
+        return await self.say(
+            ctx,
+            "The system prompt is auto-generated from current channel info (game, title, emotes) and rebuilt whenever that changes. "
+            "A custom prompt override is planned for a future update.",
         )
 
+    @commands.command()
+    @requires_mod
+    async def summary(self, ctx: commands.Context):
+        """show what faebot remembers from before its message history"""
+        summary = self.conversations[ctx.channel.name].summary
+        if not summary:
+            return await self.say(
+                ctx, "Nothing yet, everything I remember is still in my message history"
+            )
+        return await self.say(ctx, summary[:TWITCH_MESSAGE_LIMIT])
+
     @commands.command()
     @requires_mod
     async def silence(self, ctx: commands.Context):
@@ -550,39 +1033,99 @@ class Faebot(commands.Bot):
         self.conversations[ctx.channel.name].silenced = not self.conversations[
             ctx.channel.name
         ].silenced
+        self.conversations[ctx.channel.name].save("silenced")
         logging.info(
             f"faebot silent status toggled to {self.conversations[ctx.channel.name].silenced}"
         )
-        return await ctx.send(reply)
+        return await self.say(ctx, reply)
 
     # commands for admins ###
 
     @commands.command()
-    async def join(self, ctx: commands.Context, user: str | None) -> None:
+    async def join(self, ctx: commands.Context, user: str | None = None):
         """invite faebot to join a channel"""
         if ctx.author.name not in ADMIN:
-            return await ctx.send("sorry you need to be an admin to use that command")
+            return await self.say(
+                ctx, "sorry you need to be an admin to use that command"
+            )
+        if not user:
+            return await self.say(
+                ctx, "Which channel should I join? Usage: fb;join [channel]"
+            )
 
         await self.join_channels([user])
         logging.info(f"Joined new channel: {user}")
-        return await ctx.reply(f"Joined new channel: {user}")
+        asyncio.create_task(self.fetch_emotes([user]))
+        return await self.say_reply(ctx, f"Joined new channel: {user}")
 
     @commands.command()
     async def model(self, ctx: commands.Context):
         """check or change the model used to generate in the channel"""
         if ctx.author.name not in ADMIN:
-            return await ctx.send("sorry you need to be an admin to use that command")
+            return await self.say(
+                ctx, "sorry you need to be an admin to use that command"
+            )
         arguments = ctx.message.content.split(" ")
         if len(arguments) > 1:
-            self.conversations[ctx.channel.name].model = " ".join(arguments[1:])
-            return await ctx.send(
-                f"changed model in this channel to {self.conversations[ctx.channel.name].model}"
+            self.conversations[ctx.channel.name].set_model(" ".join(arguments[1:]))
+            return await self.say(
+                ctx,
+                f"changed model in this channel to {self.conversations[ctx.channel.name].model}",
             )
 
-        return await ctx.send(
-            f"current model in this channel is {self.conversations[ctx.channel.name].model}"
+        return await self.say(
+            ctx,
+            f"current model in this channel is {self.conversations[ctx.channel.name].model}",
         )
 
+    @commands.command()
+    async def queue(self, ctx: commands.Context):
+        """show generation queue depth and wait times"""
+        if ctx.author.name not in ADMIN:
+            return await self.say(
+                ctx, "sorry you need to be an admin to use that command"
+            )
+        stats = self.scheduler.metrics()
+        return await self.say(
+            ctx,
+            f"queued: {stats['queue_depth']} | in flight: {stats['in_flight']} | "
+            f"follow-ups: {stats['pending_followups']} | "
+            f"wait avg/max: {stats['wait_avg_seconds']}s/{stats['wait_max_seconds']}s | "
+            f"folded: {stats['folded']}/{stats['requested']}",
+        )
+
+    @commands.command()
+    async def outgoing(self, ctx: commands.Context):
+        """show outgoing message counters"""
+        if ctx.author.name not in ADMIN:
+            return await self.say(
+                ctx, "sorry you need to be an admin to use that command"
+            )
+        stats = self.outbox.metrics()
+        return await self.say(
+            ctx,
+            f"waiting: {stats['queue_depth']} | sent: {stats['sent']}/{stats['queued']} | "
+            f"dropped stale: {stats['dropped']} | failed: {stats['failed']}",
+        )
+
+    @commands.command()
+    async def backends(self, ctx: commands.Context):
+        """show generation backend health"""
+        if ctx.author.name not in ADMIN:
+            return await self.say(
+                ctx, "sorry you need to be an admin to use that command"
+            )
+        statuses = []
+        for backend in self.router.metrics():
+            state = "up" if backend["available"] else "circuit open"
+            p90 = backend["p90_seconds"]
+            latency = f"p90 {p90:.1f}s" if p90 is not None else "no samples"
+            statuses.append(
+                f"{backend['name']}: {state}, {latency}, "
+                f"{backend['successes']} ok/{backend['failures']} failed, {backend['hedges_won']} hedges won"
+            )
+        return await self.say(ctx, " | ".join(statuses))
+
 
 if __name__ == "__main__":
     if not TWITCH_TOKEN:
@@ -0,0 +1,245 @@
+from typing import AsyncIterator, Iterable, Optional
+from urllib.parse import urlsplit
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+
+import metrics
+
+# Twitch rejects messages over 500 characters
+TWITCH_MESSAGE_LIMIT = 499
+SENTENCE_ENDINGS = (".", "!", "?", "…", "~", ")", "*")
+FALLBACK_REPLY = "I couldn't generate a response. Please try again."
+
+GENERATION_ATTEMPTS = metrics.counter(
+    "faebot_generation_attempts_total",
+    "Completion requests sent, by backend and HTTP status (or error type)",
+    ["backend", "status"],
+)
+GENERATION_RETRIES = metrics.counter(
+    "faebot_generation_retries_total",
+    "Completion requests retried, by backend and the status that caused it",
+    ["backend", "status"],
+)
+
+
+class GenerationError(Exception):
+    """A completion request failed. `retryable` is False for errors that another
+    attempt at the same backend won't fix (auth failure, bad request, bad format)."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class GenerationClient:
+    """Long-lived HTTP client for the generation path: a keep-alive connection
+    pool with cached DNS and explicit timeouts, so a hung upstream can't tie up
+    a reply forever and warm connections skip DNS and the TLS handshake."""
+
+    def __init__(
+        self,
+        connect_timeout: float = 5,
+        read_timeout: float = 30,
+        total_timeout: Optional[float] = 60,
+        limit: int = 20,
+        dns_ttl: int = 300,
+        keepalive: float = 60,
+    ):
+        self.timeout = aiohttp.ClientTimeout(
+            total=total_timeout,
+            sock_connect=connect_timeout,
+            # For streamed replies this bounds the gap between chunks
+            sock_read=read_timeout,
+        )
+        self.limit = limit
+        self.dns_ttl = dns_ttl
+        self.keepalive = keepalive
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        # Created lazily: the connector has to be built inside the running loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout
+            )
+        return self._session
+
+    async def warm_up(self, urls: Iterable[str]):
+        """Open a pooled connection to each backend host so the first reply
+        doesn't pay for DNS and the TLS handshake."""
+        origins = {f"{parts.scheme}://{parts.netloc}" for parts in map(urlsplit, urls)}
+        for origin in origins:
+            try:
+                async with self.session.head(origin, allow_redirects=False) as response:
+                    logging.debug(f"Warmed connection to {origin} ({response.status})")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.warning(f"Failed to warm connection to {origin}: {e}")
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+async def iter_sse_data(response: aiohttp.ClientResponse) -> AsyncIterator[str]:
+    """Yield the data payload of each server-sent event line."""
+    async for raw_line in response.content:
+        line = raw_line.strip()
+        # Blank lines separate events; lines starting with ":" are keep-alive comments
+        if line.startswith(b"data:"):
+            yield line[5:].strip().decode()
+
+
+async def read_stream(
+    response: aiohttp.ClientResponse,
+    max_chars: int = TWITCH_MESSAGE_LIMIT,
+    soft_chars: Optional[int] = None,
+    timings: Optional[dict] = None,
+    started: Optional[float] = None,
+) -> str:
+    """Collect a streamed chat completion, stopping early once the text reaches
+    `max_chars`, or ends a sentence after `soft_chars`. Times are measured from
+    `started` (defaults to now), so pass the request's start for a true TTFT."""
+    if timings is None:
+        timings = {}
+    if started is None:
+        started = time.perf_counter()
+    parts: list[str] = []
+    length = 0
+    finished = False
+    async for data in iter_sse_data(response):
+        if data == "[DONE]":
+            finished = True
+            break
+        event = json.loads(data)
+        if "error" in event:
+            raise ValueError(f"error in stream: {event['error']}")
+        choices = event.get("choices") or []
+        if not choices:
+            continue
+        delta = (choices[0].get("delta") or {}).get("content") or ""
+        if delta:
+            timings.setdefault("ttft", time.perf_counter() - started)
+            parts.append(delta)
+            length += len(delta)
+        if choices[0].get("finish_reason"):
+            finished = True
+            break
+        if length >= max_chars:
+            timings["cutoff"] = "limit"
+            break
+        if (
+            soft_chars is not None
+            and length >= soft_chars
+            and delta.rstrip().endswith(SENTENCE_ENDINGS)
+        ):
+            timings["cutoff"] = "sentence"
+            break
+    else:
+        finished = True
+
+    if not finished:
+        # Drop the connection so the upstream stops generating tokens we won't use
+        response.close()
+    timings["total"] = time.perf_counter() - started
+    return "".join(parts)
+
+
+async def _backoff(reason: str, attempt: int, max_retries: int, name: str, status: str):
+    """Log a failed attempt and sleep before the next one, if there is one."""
+    if attempt + 1 >= max_retries:
+        logging.warning(f"{reason} (attempt {attempt + 1}/{max_retries})")
+        return
+    GENERATION_RETRIES.labels(backend=name, status=status).inc()
+    retry_after = min(2**attempt, 8)
+    logging.warning(
+        f"{reason}, retrying in {retry_after}s (attempt {attempt + 1}/{max_retries})"
+    )
+    await asyncio.sleep(retry_after)
+
+
+async def complete(
+    session: aiohttp.ClientSession,
+    url: str,
+    headers: dict,
+    payload: dict,
+    max_retries: int = 3,
+    soft_chars: Optional[int] = None,
+    timings: Optional[dict] = None,
+    name: str = "OpenRouter",
+) -> str:
+    """POST a chat completion request, retrying transient failures.
+    Streams when payload["stream"] is set. Raises GenerationError on failure."""
+    for attempt in range(max_retries):
+        started = time.perf_counter()
+        counted = False
+        try:
+            async with session.post(url=url, headers=headers, json=payload) as response:
+                GENERATION_ATTEMPTS.labels(
+                    backend=name, status=str(response.status)
+                ).inc()
+                counted = True
+                # Retry on transient HTTP errors (429 rate limit, 5xx server errors)
+                if response.status == 429 or response.status >= 500:
+                    await _backoff(
+                        f"{name} returned {response.status}",
+                        attempt,
+                        max_retries,
+                        name,
+                        str(response.status),
+                    )
+                    continue
+
+                # Non-retryable HTTP error (auth failure, bad request, etc.)
+                if response.status >= 400:
+                    body = await response.text()
+                    logging.error(f"{name} returned {response.status}: {body}")
+                    raise GenerationError(
+                        f"{name} returned {response.status}", retryable=False
+                    )
+
+                if response.content_type == "text/event-stream":
+                    return await read_stream(
+                        response,
+                        soft_chars=soft_chars,
+                        timings=timings,
+                        started=started,
+                    )
+
+                result = await response.json()
+
+                # Extract the assistant's message content
+                if "choices" in result and len(result["choices"]) > 0:
+                    reply = result["choices"][0]["message"]["content"]
+                    return str(reply)
+                else:
+                    logging.error(f"Unexpected response format from {name}: {result}")
+                    raise GenerationError(
+                        f"Unexpected response format from {name}", retryable=False
+                    )
+
+        except (aiohttp.ClientError, ValueError, asyncio.TimeoutError) as e:
+            if not counted:
+                # Failed before a status line was read
+                GENERATION_ATTEMPTS.labels(backend=name, status=type(e).__name__).inc()
+            await _backoff(
+                f"Network/parse error calling {name}: {type(e).__name__}: {e}",
+                attempt,
+                max_retries,
+                name,
+                type(e).__name__,
+            )
+            continue
+
+    # All retries exhausted
+    logging.error(f"{name} API call failed after {max_retries} attempts")
+    raise GenerationError(f"{name} API call failed after {max_retries} attempts")
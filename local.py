@@ -8,7 +8,6 @@ import asyncio
 import logging
 import os
 import signal
-import threading
 import uvicorn
 
 # Configure logging BEFORE importing faebot/server — their module-level
@@ -56,26 +55,15 @@ async def main():
         """Wait for shutdown signal, then stop services in order."""
         await shutdown_event.wait()
 
-        # Force exit if graceful shutdown takes too long (stuck CUDA threads)
-        def _force_exit():
-            logging.warning("Graceful shutdown timed out — forcing exit")
-            os._exit(1)
-
-        force_timer = threading.Timer(10, _force_exit)
-        force_timer.daemon = True
-        force_timer.start()
-
-        logging.info("Shutting down Whisper executor...")
-        whisper_state = getattr(app.state, "whisper", None)
-        if whisper_state:
-            whisper_state["executor"].shutdown(wait=False)
+        logging.info("Stopping Whisper workers...")
+        transcriber = getattr(app.state, "whisper", None)
+        if transcriber:
+            await asyncio.to_thread(transcriber.close)
         logging.info("Stopping uvicorn...")
         server.should_exit = True
         logging.info("Closing bot...")
         await bot.close()
 
-        force_timer.cancel()
-
     try:
         await asyncio.gather(
             bot.start(),
@@ -0,0 +1,344 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional, Protocol
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from writer import BatchWriter
+
+_WORD = re.compile(r"\w+")
+# Channel names become directory names, so only Twitch login characters
+_CHANNEL_NAME = re.compile(r"[a-z0-9_]{1,25}")
+
+
+class Embedder(Protocol):
+    """Anything that turns texts into fixed-size, L2-normalised float32 rows."""
+
+    name: str
+    dim: int
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        ...
+
+
+class HashedEmbedder:
+    """Local embedding with no model and no network: words and character
+    n-grams hashed into `dim` signed buckets (the hashing trick). Catches
+    shared words, names and misspellings, not paraphrases."""
+
+    def __init__(self, dim: int = 256, ngram: int = 3):
+        self.name = f"hashed-{dim}-{ngram}"
+        self.dim = dim
+        self.ngram = ngram
+
+    def features(self, text: str) -> list[str]:
+        words = _WORD.findall(text.lower())
+        grams = [
+            padded[i : i + self.ngram]
+            for padded in (f" {word} " for word in words)
+            for i in range(len(padded) - self.ngram + 1)
+        ]
+        return words + grams
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in zip(vectors, texts):
+            hashes = np.fromiter(
+                (zlib.crc32(feature.encode()) for feature in self.features(text)),
+                dtype=np.uint32,
+            )
+            # The top bit picks the sign so collisions tend to cancel out
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(row, hashes % self.dim, signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class Recollection(NamedTuple):
+    score: float
+    author: str
+    text: str
+    voice: bool
+
+
+class ChannelMemory:
+    """One channel's memories on disk: a contiguous float32 matrix of
+    embeddings and an int64 array of offsets into a JSONL file of the lines,
+    both memory-mapped, plus meta.json with the row count. Rows past the count
+    (e.g. after a crash mid-write) are ignored and overwritten."""
+
+    def __init__(self, directory: Path, dim: int, embedder_name: str):
+        self.directory = directory
+        self.dim = dim
+        self.lock = threading.Lock()
+        # Calls using this right now, guarded by Memory's channel lock; it
+        # isn't evicted until they're done
+        self.users = 0
+        directory.mkdir(parents=True, exist_ok=True)
+        meta_path = directory / "meta.json"
+        meta = json.loads(meta_path.read_text()) if meta_path.exists() else {}
+        if meta and (meta.get("dim"), meta.get("embedder")) != (dim, embedder_name):
+            logging.warning(
+                f"Discarding memories in {directory}: made with {meta.get('embedder')}"
+            )
+            for path in directory.iterdir():
+                path.unlink()
+            meta = {}
+        self.embedder_name = embedder_name
+        self.count: int = meta.get("count", 0)
+        self.vectors: np.ndarray = np.empty((0, dim), dtype=np.float32)
+        self.offsets: np.ndarray = np.empty(0, dtype=np.int64)
+        self._map(max(self.count, 1024))
+
+    def _map(self, capacity: int):
+        """(Re)map the matrix and offsets with room for `capacity` rows."""
+        for name, dtype, width in (
+            ("vectors.f32", np.float32, self.dim),
+            ("offsets.i64", np.int64, 1),
+        ):
+            path = self.directory / name
+            size = capacity * width * np.dtype(dtype).itemsize
+            with open(path, "a+b") as f:
+                if os.fstat(f.fileno()).st_size < size:
+                    f.truncate(size)
+        self.vectors = np.memmap(
+            self.directory / "vectors.f32",
+            dtype=np.float32,
+            mode="r+",
+            shape=(capacity, self.dim),
+        )
+        self.offsets = np.memmap(
+            self.directory / "offsets.i64", dtype=np.int64, mode="r+", shape=(capacity,)
+        )
+
+    def append(self, vectors: np.ndarray, lines: list[dict]):
+        with self.lock:
+            needed = self.count + len(lines)
+            if needed > len(self.vectors):
+                self._map(max(needed, 2 * len(self.vectors)))
+            with open(self.directory / "lines.jsonl", "ab") as f:
+                f.seek(0, os.SEEK_END)
+                for row, line in enumerate(lines, self.count):
+                    self.offsets[row] = f.tell()
+                    f.write(json.dumps(line).encode() + b"\n")
+            self.vectors[self.count : needed] = vectors
+            self.count = needed
+            self._save_meta()
+
+    def _save_meta(self):
+        self.vectors.flush()
+        self.offsets.flush()
+        meta = self.directory / "meta.json"
+        temp = meta.with_suffix(".tmp")
+        temp.write_text(
+            json.dumps(
+                {"dim": self.dim, "embedder": self.embedder_name, "count": self.count}
+            )
+        )
+        os.replace(temp, meta)
+
+    def compact(self, keep: int):
+        """Drop all but the newest `keep` rows."""
+        with self.lock:
+            if self.count <= keep:
+                return
+            start = self.count - keep
+            base = int(self.offsets[start])
+            lines_path = self.directory / "lines.jsonl"
+            temp = lines_path.with_suffix(".tmp")
+            with open(lines_path, "rb") as source, open(temp, "wb") as target:
+                source.seek(base)
+                shutil.copyfileobj(source, target)
+            self.vectors[:keep] = self.vectors[start : self.count]
+            self.offsets[:keep] = self.offsets[start : self.count] - base
+            os.replace(temp, lines_path)
+            self.count = keep
+            self._save_meta()
+
+    def search(self, query: np.ndarray, candidates: int) -> list[tuple[float, dict]]:
+        """The `candidates` most similar rows, best first, with their lines."""
+        with self.lock:
+            count = self.count
+            if not count:
+                return []
+            scores = self.vectors[:count] @ query
+            candidates = min(candidates, count)
+            top = np.argpartition(scores, count - candidates)[count - candidates :]
+            top = top[np.argsort(scores[top])[::-1]]
+            found = []
+            with open(self.directory / "lines.jsonl", "rb") as f:
+                for row in top:
+                    f.seek(int(self.offsets[row]))
+                    found.append((float(scores[row]), json.loads(f.readline())))
+            return found
+
+    def close(self):
+        # The maps go away with the last reference, so a search still holding
+        # this channel can finish
+        with self.lock:
+            self._save_meta()
+
+
+class Memory(BatchWriter):
+    """Long-term memory: chat lines that fell out of a conversation's history,
+    embedded and kept per channel on disk, searchable by similarity.
+
+    Lines are queued and embedded/written in batches by a background thread.
+    Each channel keeps at most `max_lines` memories; past that by a quarter
+    the oldest are compacted away, and only the `max_open` most recently used
+    channels stay mapped, so neither disk nor RAM grows without bound."""
+
+    def __init__(
+        self,
+        directory: str = "memory",
+        embedder: Optional[Embedder] = None,
+        max_lines: int = 50_000,
+        max_open: int = 32,
+        batch_size: int = 64,
+        flush_interval: float = 2.0,
+    ):
+        self.directory = Path(directory)
+        self.embedder: Embedder = embedder or HashedEmbedder()
+        self.max_lines = max_lines
+        self.max_open = max_open
+        self._channels: OrderedDict[str, ChannelMemory] = OrderedDict()
+        self._channels_lock = threading.Lock()
+        self.counters = {"remembered": 0, "compactions": 0, "recalls": 0}
+        self.recall_seconds = 0.0
+        super().__init__("memory", "memories", batch_size, flush_interval)
+
+    def remember(
+        self, channel_name: str, author: str, text: str, voice: bool = False
+    ) -> None:
+        """Queue a line for long-term memory. Never blocks on embedding or disk."""
+        self._put(
+            ("remember", channel_name, {"author": author, "text": text, "voice": voice})
+        )
+
+    def forget(self, channel_name: str) -> None:
+        """Queue the deletion of everything remembered in a channel."""
+        self._put(("forget", channel_name, None))
+
+    async def recall(
+        self,
+        channel_name: str,
+        query: str,
+        k: int = 3,
+        authors: Iterable[str] = (),
+        min_score: float = 0.2,
+    ) -> list[Recollection]:
+        """The `k` memories most similar to `query`, preferring lines by `authors`."""
+        return await asyncio.to_thread(
+            self.search, channel_name, query, k, set(authors), min_score
+        )
+
+    def search(
+        self, channel_name: str, query: str, k: int, authors: set[str], min_score: float
+    ) -> list[Recollection]:
+        if not (self._path(channel_name) / "meta.json").exists():
+            return []
+        started = time.perf_counter()
+        vector = self.embedder.embed([query])[0]
+        with self._open(channel_name) as memory:
+            found = memory.search(vector, candidates=4 * k)
+        recollections = [
+            # Lines by the people currently talking get a nudge up
+            Recollection(score + (0.1 if line["author"] in authors else 0.0), **line)
+            for score, line in found
+        ]
+        recollections.sort(reverse=True)
+        self.counters["recalls"] += 1
+        self.recall_seconds += time.perf_counter() - started
+        return [r for r in recollections[:k] if r.score >= min_score]
+
+    def _path(self, channel_name: str) -> Path:
+        if not _CHANNEL_NAME.fullmatch(channel_name):
+            raise ValueError(f"not a Twitch channel name: {channel_name!r}")
+        return self.directory / channel_name
+
+    @contextmanager
+    def _open(self, channel_name: str) -> Iterator[ChannelMemory]:
+        """A channel's memory, kept open while in use. Only idle channels are
+        evicted, so there's never more than one live ChannelMemory per
+        directory: a second would start from a stale count and overwrite rows."""
+        with self._channels_lock:
+            memory = self._channels.get(channel_name)
+            if memory is None:
+                memory = ChannelMemory(
+                    self._path(channel_name), self.embedder.dim, self.embedder.name
+                )
+                self._channels[channel_name] = memory
+            self._channels.move_to_end(channel_name)
+            memory.users += 1
+            self._evict()
+        try:
+            yield memory
+        finally:
+            with self._channels_lock:
+                memory.users -= 1
+                self._evict()
+
+    def _evict(self):
+        """Close the least recently used idle channels past `max_open`. Call
+        with the channel lock held."""
+        excess = len(self._channels) - self.max_open
+        if excess <= 0:
+            return
+        idle = [name for name, memory in self._channels.items() if not memory.users]
+        for name in idle[:excess]:
+            self._channels.pop(name).close()
+
+    def close(self) -> None:
+        """Write everything queued so far and stop the writer thread."""
+        if self._thread is None:
+            return
+        super().close()
+        with self._channels_lock:
+            for memory in self._channels.values():
+                memory.close()
+            self._channels.clear()
+
+    def _flush(self, batch: list) -> None:
+        pending: dict[str, list[dict]] = {}
+        for op, channel_name, line in batch:
+            if op == "remember":
+                pending.setdefault(channel_name, []).append(line)
+            else:
+                pending.pop(channel_name, None)
+                self._forget(channel_name)
+        for channel_name, lines in pending.items():
+            vectors = self.embedder.embed([line["text"] for line in lines])
+            with self._open(channel_name) as memory:
+                memory.append(vectors, lines)
+                if memory.count > self.max_lines + self.max_lines // 4:
+                    memory.compact(self.max_lines)
+                    self.counters["compactions"] += 1
+            self.counters["remembered"] += len(lines)
+
+    def _forget(self, channel_name: str):
+        with self._channels_lock:
+            memory = self._channels.pop(channel_name, None)
+        if memory is not None:
+            memory.close()
+        shutil.rmtree(self._path(channel_name), ignore_errors=True)
+
+    def metrics(self) -> dict:
+        recalls = self.counters["recalls"]
+        return {
+            **self.counters,
+            "open_channels": len(self._channels),
+            "queue_depth": self._queue.qsize(),
+            "avg_recall_ms": round(self.recall_seconds / recalls * 1000, 2)
+            if recalls
+            else 0.0,
+        }
@@ -0,0 +1,230 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterator, Optional, Sequence
+import logging
+import os
+import time
+
+# With metrics off every metric is a shared no-op, so instrumented code costs
+# one attribute lookup and an empty call
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+        + "}"
+    )
+
+
+class _Metric(ABC):
+    """A metric family: one child per combination of label values. Unlabelled
+    metrics are their own single child, so `counter.inc()` works directly."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], "_Metric"] = {}
+        self._init_child()
+
+    def _init_child(self):
+        pass
+
+    def _child(self) -> "_Metric":
+        return type(self)(self.name, self.documentation)
+
+    def labels(self, *values: str, **labels: str) -> Any:
+        key = (
+            tuple(map(str, values))
+            if values
+            else tuple(str(labels[name]) for name in self.labelnames)
+        )
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._child()
+        return child
+
+    @abstractmethod
+    def _samples(self) -> Iterator[tuple[str, tuple[str, ...], tuple[str, ...], float]]:
+        """(suffix, extra label names, extra label values, value) of one child."""
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        children = self._children.items() if self.labelnames else [((), self)]
+        for values, child in children:
+            try:
+                samples = list(child._samples())
+            except Exception as e:
+                logging.debug(f"Skipping {self.name}{values}: {e}")
+                continue
+            for suffix, names, extra, value in samples:
+                labels = _format_labels(self.labelnames + names, values + extra)
+                lines.append(f"{self.name}{suffix}{labels} {value:g}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _init_child(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def _samples(self):
+        yield "", (), (), self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _init_child(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from `function` at scrape time instead."""
+        self.function = function
+
+    def _samples(self):
+        yield "", (), (), self.function() if self.function is not None else self.value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _child(self) -> "_Metric":
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def _init_child(self):
+        # One count per bucket plus +Inf; made cumulative when rendered
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def _samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            yield "_bucket", ("le",), (
+                "+Inf" if bound == float("inf") else f"{bound:g}",
+            ), cumulative
+        yield "_sum", (), (), self.sum
+        yield "_count", (), (), self.count
+
+
+class _NoOp:
+    """Stands in for every metric when metrics are disabled."""
+
+    def labels(self, *values, **labels) -> "_NoOp":
+        return self
+
+    def inc(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def set_function(self, function):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+    def time(self):
+        return nullcontext()
+
+
+_NOOP = _NoOp()
+
+
+class Registry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.metrics: dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> Any:
+        if not self.enabled:
+            return _NOOP
+        if metric.name in self.metrics:
+            raise ValueError(f"metric {metric.name} registered twice")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Everything, in the Prometheus text exposition format."""
+        lines = [line for metric in self.metrics.values() for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry(METRICS_ENABLED)
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+# Queue depths across the bot and the voice pipeline, read at scrape time
+QUEUE_DEPTH = gauge(
+    "faebot_queue_depth", "Items waiting in each internal queue", ["queue"]
+)
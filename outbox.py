@@ -0,0 +1,180 @@
+from bisect import insort
+from typing import Awaitable, Callable, Optional
+import asyncio
+import itertools
+import logging
+import time
+
+# Lower is sent first
+PRIORITY_COMMAND = 0
+PRIORITY_CHAT = 1
+
+
+class TokenBucket:
+    """`capacity` messages per `period` seconds, refilled continuously."""
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is now)."""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Message:
+    __slots__ = ("priority", "seq", "channel", "deliver", "expires_at", "future")
+
+    def __init__(self, priority, seq, channel, deliver, expires_at):
+        self.priority = priority
+        self.seq = seq
+        self.channel = channel
+        self.deliver = deliver
+        self.expires_at = expires_at
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def __lt__(self, other: "_Message") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Outbox:
+    """Every outgoing chat message goes through here, paced to Twitch's limits:
+    `account_limit` messages per `period` account-wide (`mod_limit` in channels
+    where faebot is a moderator), and at most one message per
+    `channel_interval` seconds in channels where it isn't. Command replies jump
+    ahead of generated chatter, and messages that would go out too late are
+    dropped instead."""
+
+    def __init__(
+        self,
+        is_mod: Callable[[str], bool],
+        account_limit: int = 20,
+        mod_limit: int = 100,
+        period: float = 30,
+        channel_interval: float = 1.0,
+    ):
+        self.is_mod = is_mod
+        # Messages in channels faebot moderates only count against the mod limit;
+        # the rest count against both
+        self.account = TokenBucket(account_limit, period)
+        self.mod = TokenBucket(mod_limit, period)
+        self.channel_interval = channel_interval
+        self.channels: dict[str, TokenBucket] = {}
+        self.pending: list[_Message] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.counters = {"queued": 0, "sent": 0, "dropped": 0, "failed": 0}
+
+    async def send(
+        self,
+        channel_name: str,
+        deliver: Callable[[], Awaitable],
+        priority: int = PRIORITY_CHAT,
+        max_age: Optional[float] = None,
+    ) -> bool:
+        """Queue a message and wait until it's out. `deliver` does the actual
+        send (e.g. `lambda: channel.send(text)`). Returns False if the message
+        was dropped after waiting `max_age` seconds, or failed to send."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="outbox")
+        assert self._wakeup is not None
+        expires_at = time.monotonic() + max_age if max_age is not None else None
+        message = _Message(priority, next(self._seq), channel_name, deliver, expires_at)
+        insort(self.pending, message)
+        self.counters["queued"] += 1
+        self._wakeup.set()
+        return await message.future
+
+    def _channel_bucket(self, channel_name: str) -> TokenBucket:
+        bucket = self.channels.get(channel_name)
+        if bucket is None:
+            bucket = self.channels[channel_name] = TokenBucket(1, self.channel_interval)
+        return bucket
+
+    def _delay(self, channel_name: str, now: float) -> float:
+        if self.is_mod(channel_name):
+            return self.mod.delay(now)
+        return max(
+            self.mod.delay(now),
+            self.account.delay(now),
+            self._channel_bucket(channel_name).delay(now),
+        )
+
+    def _take(self, channel_name: str, now: float):
+        self.mod.take(now)
+        if not self.is_mod(channel_name):
+            self.account.take(now)
+            self._channel_bucket(channel_name).take(now)
+
+    def _next(self) -> tuple[Optional[_Message], Optional[float]]:
+        """The first message that can go now, else how long until one might."""
+        now = time.monotonic()
+        wait: Optional[float] = None
+        for message in list(self.pending):
+            if message.future.done():  # the sender was cancelled
+                self.pending.remove(message)
+                continue
+            if message.expires_at is not None and now >= message.expires_at:
+                self.pending.remove(message)
+                self.counters["dropped"] += 1
+                logging.info(f"Dropped a stale message for {message.channel}")
+                message.future.set_result(False)
+                continue
+            delay = self._delay(message.channel, now)
+            if delay <= 0:
+                self.pending.remove(message)
+                self._take(message.channel, now)
+                return message, None
+            if message.expires_at is not None:
+                delay = min(delay, message.expires_at - now)
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    async def _run(self):
+        assert self._wakeup is not None
+        while True:
+            self._wakeup.clear()
+            message, wait = self._next()
+            if message is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await message.deliver()
+            except Exception as e:
+                self.counters["failed"] += 1
+                logging.error(f"Failed to send a message to {message.channel}: {e}")
+                if not message.future.done():
+                    message.future.set_result(False)
+                continue
+            self.counters["sent"] += 1
+            if not message.future.done():
+                message.future.set_result(True)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for message in self.pending:
+            if not message.future.done():
+                message.future.set_result(False)
+        self.pending.clear()
+
+    def metrics(self) -> dict:
+        return {**self.counters, "queue_depth": len(self.pending)}
@@ -0,0 +1,65 @@
+from pathlib import Path
+import datetime
+import gzip
+import json
+import logging
+import os
+import shutil
+
+from writer import BatchWriter
+
+
+class Permalog(BatchWriter):
+    """Permanent JSONL log of generations, rotated into `backups` (gzipped)
+    files once it passes `max_bytes`."""
+
+    def __init__(
+        self,
+        path: str = "permalog.jsonl",
+        batch_size: int = 32,
+        flush_interval: float = 2.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+        compress: bool = True,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        super().__init__("permalog", "permalog records", batch_size, flush_interval)
+
+    def write(self, **record) -> None:
+        """Queue one record. Never blocks on disk."""
+        record.setdefault("time", datetime.datetime.now().isoformat())
+        self._put(record)
+
+    def _flush(self, batch: list) -> None:
+        lines = "".join(json.dumps(record, default=str) + "\n" for record in batch)
+        with open(self.path, "a", encoding="utf-8") as permalog:
+            permalog.write(lines)
+        if self.max_bytes and self.path.stat().st_size >= self.max_bytes:
+            self._rotate()
+
+    def _backup_path(self, index: int) -> Path:
+        suffix = f".{index}.gz" if self.compress else f".{index}"
+        return self.path.with_name(self.path.name + suffix)
+
+    def _rotate(self) -> None:
+        """Shift permalog.jsonl -> .1 -> .2 ..., dropping anything past `backups`."""
+        if self.backups <= 0:
+            self.path.unlink()
+            return
+        self._backup_path(self.backups).unlink(missing_ok=True)
+        for index in range(self.backups - 1, 0, -1):
+            source = self._backup_path(index)
+            if source.exists():
+                os.replace(source, self._backup_path(index + 1))
+        if self.compress:
+            with open(self.path, "rb") as source_file, gzip.open(
+                self._backup_path(1), "wb"
+            ) as backup:
+                shutil.copyfileobj(source_file, backup)
+            self.path.unlink()
+        else:
+            os.replace(self.path, self._backup_path(1))
+        logging.info(f"Rotated permalog to {self._backup_path(1)}")
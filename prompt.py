@@ -0,0 +1,62 @@
+from collections import deque
+from typing import Iterable, Optional
+
+# Rough average for English chat under BPE tokenizers; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate — no tokenizer download, no network."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class PromptBuilder:
+    """Packs the newest chat lines into a token budget as they arrive, keeping a
+    running token count so a reply never re-measures the history. The lines are
+    joined only when rendered, at most once per change."""
+
+    def __init__(self, budget: int, lines: Iterable[str] = ()):
+        self.budget = budget
+        self.lines: deque[tuple[str, int]] = deque()
+        self.tokens = 0
+        # The joined lines, or None when they changed since the last render
+        self._text: Optional[str] = None
+        self.reset(lines)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def append(self, line: str):
+        # A single paste bigger than the whole budget is clipped rather than
+        # allowed to push everything else out
+        if estimate_tokens(line) > self.budget:
+            line = line[: self.budget * CHARS_PER_TOKEN]
+        cost = estimate_tokens(line) + 1  # +1 for the joining newline
+        self.lines.append((line, cost))
+        self.tokens += cost
+        self._text = None
+        while self.tokens > self.budget and len(self.lines) > 1:
+            self.popleft()
+
+    def popleft(self):
+        _, cost = self.lines.popleft()
+        self.tokens -= cost
+        self._text = None
+
+    def reset(self, lines: Iterable[str] = ()):
+        self.lines.clear()
+        self.tokens = 0
+        self._text = None
+        for line in lines:
+            self.append(line)
+
+    def set_budget(self, budget: int, lines: Iterable[str]):
+        """Change the budget and rebuild from `lines`, oldest first. Pass the
+        whole history: a bigger budget can fit lines this builder already dropped."""
+        self.budget = budget
+        self.reset(lines)
+
+    def render(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(line for line, _ in self.lines)
+        return self._text
@@ -0,0 +1,216 @@
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from generation import GenerationError, complete
+
+
+def flatten_messages(messages: list[dict]) -> list[dict]:
+    """Join content-part lists into plain strings, dropping cache_control hints."""
+    flattened = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = "".join(part.get("text", "") for part in content)
+            message = {**message, "content": content}
+        flattened.append(message)
+    return flattened
+
+
+@dataclass
+class Backend:
+    """One OpenAI-compatible chat completions endpoint, with its health record."""
+
+    name: str
+    url: str
+    headers: dict = field(default_factory=dict)
+    # Overrides the channel's model, e.g. whatever a local KoboldCPP has loaded
+    model: Optional[str] = None
+    stream: bool = True
+    # Send system prompt content parts with cache_control hints; when False they
+    # are flattened to plain strings for servers that only accept string content
+    cache_control: bool = False
+    latencies: deque = field(default_factory=lambda: deque(maxlen=50))
+    successes: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    hedges_won: int = 0
+    open_until: float = 0.0
+
+    def available(self) -> bool:
+        """False while the circuit breaker is open."""
+        return time.monotonic() >= self.open_until
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if len(self.latencies) < 5:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ModelRouter:
+    """Sends each completion to an ordered list of backends: falls through to the
+    next backend on failure, hedges with a second backend when the primary runs
+    past its p90 latency, and skips backends whose circuit breaker is open."""
+
+    def __init__(
+        self,
+        backends: list[Backend],
+        failure_threshold: int = 3,
+        cooldown: float = 30.0,
+        hedge_delay: float = 4.0,
+        min_hedge_delay: float = 0.5,
+    ):
+        if not backends:
+            raise ValueError("ModelRouter needs at least one backend")
+        self.backends = backends
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        # Used until a backend has enough samples for a p90
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+
+    def candidates(self) -> list[Backend]:
+        """Healthy backends in priority order; if every circuit is open, try them all anyway."""
+        healthy = [backend for backend in self.backends if backend.available()]
+        return healthy or list(self.backends)
+
+    async def generate(
+        self,
+        session: aiohttp.ClientSession,
+        payload: dict,
+        soft_chars: Optional[int] = None,
+        timings: Optional[dict] = None,
+    ) -> str:
+        queue = self.candidates()
+        # With fallbacks configured, move on to the next backend instead of retrying
+        max_retries = 1 if len(queue) > 1 else 3
+        running: dict[asyncio.Task, tuple[Backend, dict]] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch(backend: Backend):
+            backend_timings: dict = {}
+            task = asyncio.create_task(
+                self._attempt(
+                    session, backend, payload, soft_chars, backend_timings, max_retries
+                )
+            )
+            running[task] = (backend, backend_timings)
+
+        launch(queue.pop(0))
+        try:
+            while running:
+                primary_backend = next(iter(running.values()))[0]
+                hedge_after = None
+                if queue and len(running) == 1:
+                    hedge_after = max(
+                        self.min_hedge_delay,
+                        primary_backend.percentile(0.9) or self.hedge_delay,
+                    )
+                done, _ = await asyncio.wait(
+                    running, timeout=hedge_after, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Primary is slower than usual: race the next backend against it
+                    logging.info(
+                        f"{primary_backend.name} slower than {hedge_after:.1f}s, hedging with {queue[0].name}"
+                    )
+                    launch(queue.pop(0))
+                    continue
+                for task in done:
+                    backend, backend_timings = running.pop(task)
+                    if task.exception() is None:
+                        if running:
+                            backend.hedges_won += 1
+                        if timings is not None:
+                            timings.update(backend_timings, backend=backend.name)
+                        return task.result()
+                    last_error = task.exception()
+                    logging.warning(f"Backend {backend.name} failed: {last_error}")
+                if not running and queue:
+                    launch(queue.pop(0))
+        finally:
+            # Cancel the loser of a hedge (or anything left after an error)
+            for task in running:
+                task.cancel()
+
+        if last_error is not None:
+            raise last_error
+        raise GenerationError("no backend produced a response")
+
+    async def _attempt(
+        self,
+        session: aiohttp.ClientSession,
+        backend: Backend,
+        payload: dict,
+        soft_chars: Optional[int],
+        timings: dict,
+        max_retries: int,
+    ) -> str:
+        request = dict(payload)
+        if not backend.cache_control:
+            request["messages"] = flatten_messages(request.get("messages", []))
+        if backend.model:
+            request["model"] = backend.model
+        if backend.stream:
+            request["stream"] = True
+        else:
+            request.pop("stream", None)
+        started = time.perf_counter()
+        try:
+            reply = await complete(
+                session,
+                url=backend.url,
+                headers=backend.headers,
+                payload=request,
+                max_retries=max_retries,
+                soft_chars=soft_chars,
+                timings=timings,
+                name=backend.name,
+            )
+        except asyncio.CancelledError:
+            raise
+        except GenerationError as e:
+            # A rejected request (bad model, bad payload) says nothing about
+            # the backend's health, so only transient failures trip the circuit
+            if e.retryable:
+                self._record_failure(backend)
+            else:
+                backend.failures += 1
+            raise
+        except Exception:
+            self._record_failure(backend)
+            raise
+        backend.latencies.append(time.perf_counter() - started)
+        backend.successes += 1
+        backend.consecutive_failures = 0
+        return reply
+
+    def _record_failure(self, backend: Backend):
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= self.failure_threshold:
+            backend.open_until = time.monotonic() + self.cooldown
+            logging.warning(
+                f"Circuit open for {backend.name} after {backend.consecutive_failures} failures, "
+                f"skipping it for {self.cooldown:.0f}s"
+            )
+
+    def metrics(self) -> list[dict]:
+        return [
+            {
+                "name": backend.name,
+                "available": backend.available(),
+                "successes": backend.successes,
+                "failures": backend.failures,
+                "hedges_won": backend.hedges_won,
+                "p50_seconds": backend.percentile(0.5),
+                "p90_seconds": backend.percentile(0.9),
+            }
+            for backend in self.backends
+        ]
@@ -0,0 +1,169 @@
+from typing import Awaitable, Callable, Optional
+import asyncio
+import itertools
+import logging
+import time
+
+# Lower runs first
+PRIORITY_MENTION = 0
+PRIORITY_CHAT = 1
+
+# A settling window can be extended by ongoing chat, but never past this many windows
+MAX_SETTLE_WINDOWS = 3
+
+
+class GenerationScheduler:
+    """Coordinates reply generation: one in-flight generation per channel (later
+    triggers fold into a single follow-up), a global concurrency cap, and
+    mention-first ordering."""
+
+    def __init__(
+        self,
+        generate: Callable[[str], Awaitable],
+        max_concurrency: int = 4,
+    ):
+        self.generate = generate
+        self.max_concurrency = max_concurrency
+        self.queue: Optional[asyncio.PriorityQueue] = None
+        self.workers: list[asyncio.Task] = []
+        # channel -> (priority, seq, enqueued_at) of its live queue entry
+        self.queued: dict[str, tuple[int, int, float]] = {}
+        self.running: set[str] = set()
+        # channel -> priority of the follow-up to run once the current one finishes
+        self.followups: dict[str, int] = {}
+        # channel -> [priority, first_trigger_at, settle, timer] while waiting for chat to settle
+        self.settling: dict[str, list] = {}
+        self._seq = itertools.count()
+        self.counters = {
+            "requested": 0,
+            "folded": 0,
+            "coalesced": 0,
+            "completed": 0,
+            "failed": 0,
+        }
+        self.wait_last = 0.0
+        self.wait_max = 0.0
+        self.wait_total = 0.0
+
+    def request(
+        self, channel_name: str, priority: int = PRIORITY_CHAT, settle: float = 0.0
+    ):
+        """Ask for a reply in a channel. Never blocks; duplicates are folded.
+        With `settle` > 0, wait for chat to go quiet that long and answer the whole burst at once.
+        """
+        self.counters["requested"] += 1
+        if settle > 0:
+            pending = self.settling.get(channel_name)
+            if pending is not None:
+                self.counters["coalesced"] += 1
+                pending[0] = min(pending[0], priority)
+            else:
+                self.settling[channel_name] = [priority, time.monotonic(), settle, None]
+            self.activity(channel_name)
+            return
+        self._request_now(channel_name, priority)
+
+    def activity(self, channel_name: str):
+        """Note chat activity: pushes back a settling reply, up to MAX_SETTLE_WINDOWS."""
+        pending = self.settling.get(channel_name)
+        if pending is None:
+            return
+        _, first_at, settle, timer = pending
+        if timer is not None:
+            timer.cancel()
+        deadline = min(
+            time.monotonic() + settle, first_at + settle * MAX_SETTLE_WINDOWS
+        )
+        delay = max(0.0, deadline - time.monotonic())
+        pending[3] = asyncio.get_running_loop().call_later(
+            delay, self._settled, channel_name
+        )
+
+    def _settled(self, channel_name: str):
+        pending = self.settling.pop(channel_name, None)
+        if pending is not None:
+            self._request_now(channel_name, pending[0])
+
+    def _request_now(self, channel_name: str, priority: int):
+        if channel_name in self.running:
+            if channel_name in self.followups:
+                self.counters["folded"] += 1
+            self.followups[channel_name] = min(
+                priority, self.followups.get(channel_name, priority)
+            )
+            return
+        entry = self.queued.get(channel_name)
+        if entry is not None:
+            self.counters["folded"] += 1
+            if priority >= entry[0]:
+                return
+            # Re-queue at the higher priority; the old heap entry goes stale
+            self._enqueue(channel_name, priority, entry[2])
+            return
+        self._enqueue(channel_name, priority, time.monotonic())
+
+    def _enqueue(self, channel_name: str, priority: int, enqueued_at: float):
+        if self.queue is None:
+            self.start()
+        assert self.queue is not None
+        seq = next(self._seq)
+        self.queued[channel_name] = (priority, seq, enqueued_at)
+        self.queue.put_nowait((priority, seq, channel_name))
+
+    def start(self):
+        self.queue = asyncio.PriorityQueue()
+        self.workers = [
+            asyncio.create_task(self._worker(), name=f"generation-{n}")
+            for n in range(self.max_concurrency)
+        ]
+
+    async def close(self):
+        for pending in self.settling.values():
+            if pending[3] is not None:
+                pending[3].cancel()
+        self.settling.clear()
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def _worker(self):
+        assert self.queue is not None
+        while True:
+            priority, seq, channel_name = await self.queue.get()
+            entry = self.queued.get(channel_name)
+            if entry is None or entry[1] != seq:
+                continue  # superseded by a higher-priority entry
+            del self.queued[channel_name]
+            waited = time.monotonic() - entry[2]
+            self.wait_last = waited
+            self.wait_max = max(self.wait_max, waited)
+            self.wait_total += waited
+
+            self.running.add(channel_name)
+            try:
+                await self.generate(channel_name)
+                self.counters["completed"] += 1
+            except Exception as e:
+                self.counters["failed"] += 1
+                logging.error(f"Generation for {channel_name} failed: {e}")
+            finally:
+                self.running.discard(channel_name)
+                followup = self.followups.pop(channel_name, None)
+                if followup is not None:
+                    self._enqueue(channel_name, followup, time.monotonic())
+
+    def metrics(self) -> dict:
+        started = (
+            self.counters["completed"] + self.counters["failed"] + len(self.running)
+        )
+        return {
+            **self.counters,
+            "queue_depth": len(self.queued),
+            "settling": len(self.settling),
+            "in_flight": len(self.running),
+            "pending_followups": len(self.followups),
+            "wait_last_seconds": round(self.wait_last, 3),
+            "wait_max_seconds": round(self.wait_max, 3),
+            "wait_avg_seconds": round(self.wait_total / started, 3) if started else 0.0,
+        }
@@ -1,18 +1,28 @@
+from contextlib import asynccontextmanager
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from fastapi import FastAPI, Request, WebSocket
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
-from silero_vad import load_silero_vad, VADIterator
-from faster_whisper import WhisperModel
 from os import getenv
+from audio import AudioRingBuffer, SegmentFilter, Segmenter
+from transcription import (
+    PROFILES,
+    FairTranscriptionScheduler,
+    LanguageLock,
+    TranscriptionEngine,
+    TranscriptionError,
+    TranscriptStitcher,
+    WhisperConfig,
+)
 import asyncio
 import json
 import logging
+import metrics
+import re
+import time
 import uvicorn
-import numpy as np
-import torch
 
 logging.basicConfig(
     format="%(asctime)s %(levelname)-8s %(message)s",
@@ -22,60 +32,175 @@ logging.basicConfig(
 
 
 WHISPER_TIMEOUT = int(getenv("WHISPER_TIMEOUT", "30"))
+# More than one worker only makes sense on many-core CPU hosts
+WHISPER_WORKERS = int(getenv("WHISPER_WORKERS", "1"))
+# Long utterances are transcribed in overlapping windows of at most this many
+# seconds instead of waiting for a pause; 0 waits for the end of speech
+WHISPER_WINDOW_SECONDS = float(getenv("WHISPER_WINDOW_SECONDS", "10"))
+WHISPER_OVERLAP_SECONDS = float(getenv("WHISPER_OVERLAP_SECONDS", "1"))
+# Decode preset: "default", "low-latency" or "accurate" (see transcription.PROFILES)
+WHISPER_PROFILE = getenv("WHISPER_PROFILE", "default")
+# Fixed language code (e.g. "en"); empty means detect it
+WHISPER_LANGUAGE = getenv("WHISPER_LANGUAGE", "")
+# Stop detecting once this many segments in a row agree; 0 detects every segment
+WHISPER_LANGUAGE_LOCK = int(getenv("WHISPER_LANGUAGE_LOCK", "3"))
+# Audio seconds each stream may send to Whisper per scheduling round
+WHISPER_STREAM_QUANTUM = float(getenv("WHISPER_STREAM_QUANTUM", "5"))
+# Segments are dropped before Whisper with less than SEGMENT_MIN_SECONDS of
+# voiced audio in the utterance, RMS below SEGMENT_MIN_RMS, or fewer than
+# SEGMENT_MIN_SPEECH_RATIO of their chunks voiced; 0 disables a check
+SEGMENT_MIN_SECONDS = float(getenv("SEGMENT_MIN_SECONDS", "0.25"))
+SEGMENT_MIN_RMS = float(getenv("SEGMENT_MIN_RMS", "0.003"))
+SEGMENT_MIN_SPEECH_RATIO = float(getenv("SEGMENT_MIN_SPEECH_RATIO", "0.3"))
+# Chunks from up to this many streams share one VAD forward pass, waiting at
+# most VAD_BATCH_WAIT seconds for other streams' chunks to arrive
+VAD_MAX_BATCH = int(getenv("VAD_MAX_BATCH", "64"))
+VAD_BATCH_WAIT = float(getenv("VAD_BATCH_WAIT", "0.005"))
+# Channel for /ws/audio connections that don't name one
+STREAMER_CHANNEL = getenv("STREAMER_CHANNEL", "transfaeries")
+# Other channels /ws/audio may feed, besides those the bot has joined
+AUDIO_CHANNELS = {
+    name.strip().lower()
+    for name in getenv("AUDIO_CHANNELS", "").split(",")
+    if name.strip()
+}
+TWITCH_LOGIN = re.compile(r"[a-z0-9_]{1,25}")
+
+
+def audio_channel_allowed(bot, channel_name: str) -> bool:
+    """Only Twitch logins faebot is in (or that are configured) can be fed
+    transcriptions; anything else would have faebot talk where it isn't."""
+    if not TWITCH_LOGIN.fullmatch(channel_name):
+        return False
+    if channel_name == STREAMER_CHANNEL or channel_name in AUDIO_CHANNELS:
+        return True
+    return bot is not None and any(
+        joined.name == channel_name for joined in bot.connected_channels
+    )
+
+
+def _load_vad():
+    # torch and silero_vad take seconds to import, so they're only imported here
+    from silero_vad import load_silero_vad
+    from vad import BatchedVAD
+
+    return BatchedVAD(
+        load_silero_vad(), max_batch=VAD_MAX_BATCH, max_wait=VAD_BATCH_WAIT
+    )
+
+
+class VoiceModels:
+    """Silero VAD and the Whisper workers, loaded in the background so the bot
+    and the dashboard don't wait for them. `state` is "loading", "ready" or
+    "failed"; /ws/audio turns connections away until it's "ready". Losing
+    every Whisper worker after loading counts as failed too."""
+
+    def __init__(self, transcriber: TranscriptionEngine):
+        self.transcriber = transcriber
+        self.vad = None
+        self._state = "loading"
+        self._error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.transcriber.error is not None:
+            return "failed"
+        return self._state
+
+    @property
+    def error(self) -> Optional[str]:
+        return self._error or self.transcriber.error
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    async def load(self):
+        started = time.perf_counter()
+        try:
+            # Whisper loads in its worker processes while VAD loads in a thread
+            whisper = asyncio.create_task(self.transcriber.start())
+            self.vad = await asyncio.to_thread(_load_vad)
+            logging.info("VAD model loaded")
+            await whisper
+        except Exception as e:
+            whisper.cancel()
+            await asyncio.gather(whisper, return_exceptions=True)
+            # Don't leave loaded (or loading) Whisper workers behind unused
+            self.transcriber.close(timeout=0)
+            self._state = "failed"
+            self._error = f"{type(e).__name__}: {e}"
+            logging.error(f"Failed to load voice models: {self.error}")
+            return
+        self.load_seconds = time.perf_counter() - started
+        self._state = "ready"
+        logging.info(f"Voice models ready in {self.load_seconds:.1f}s")
+
+    def health(self) -> dict:
+        return {
+            "status": self.state,
+            "vad": self.vad.metrics() if self.vad is not None else None,
+            "whisper": self.transcriber.metrics(),
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
 
 
 def create_app(bot=None):
-    """Create the FastAPI app, optionally with a reference to the Twitch bot."""
-    app = FastAPI()
+    """Create the FastAPI app, optionally with a reference to the Twitch bot.
+    Models load in the background once the app starts; see /healthz."""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        load_task = asyncio.create_task(models.load())
+        yield
+        load_task.cancel()
+        await scheduler.close()
+        if models.vad is not None:
+            await models.vad.close()
+
+    app = FastAPI(lifespan=lifespan)
     app.state.bot = bot
 
-    # Load models
-    vad_model = load_silero_vad()
-    logging.info("VAD model loaded")
-
-    whisper_model_name = getenv("WHISPER_MODEL_NAME", "medium")
-    whisper_device = getenv("WHISPER_DEVICE", "cuda")
-    whisper_compute = getenv("WHISPER_COMPUTE", "float16")
-
-    def _load_whisper():
-        """Load (or reload) the Whisper model."""
-        model = WhisperModel(whisper_model_name, device=whisper_device, compute_type=whisper_compute)
-        logging.getLogger("faster_whisper").setLevel(logging.WARNING)
-        logging.info("Whisper model loaded")
-        return model
-
-    whisper_model = _load_whisper()
-
-    # Single-thread executor for Whisper — keeps transcription off the event loop
-    # while ensuring only one CUDA call runs at a time
-    whisper_state = {
-        "executor_is_fresh": True,
-        "executor": ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper"),
-        "model": whisper_model,
-    }
-    app.state.whisper = whisper_state
-
-    def _transcribe_sync(audio: np.ndarray, initial_prompt: str):
-        """Run Whisper transcription synchronously (called from executor thread)."""
-        segments, info = whisper_state["model"].transcribe(audio, initial_prompt=initial_prompt)
-        text = " ".join(segment.text for segment in segments).strip()
-        return text, info
-
-    def _rebuild_executor():
-        """Abandon a stuck executor thread and create a fresh one (keeps the model)."""
-        logging.warning("Whisper executor stuck — replacing with fresh thread")
-        whisper_state["executor"].shutdown(wait=False)
-        whisper_state["executor"] = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
-
-    async def _rebuild_whisper():
-        """Full recovery: new executor + reload the Whisper model (fixes corrupted CUDA state)."""
-        logging.warning("Whisper timed out on fresh executor — reloading model")
-        whisper_state["executor"].shutdown(wait=False)
-        del whisper_state["model"]
-        new_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
-        whisper_state["executor"] = new_executor
-        loop = asyncio.get_event_loop()
-        whisper_state["model"] = await loop.run_in_executor(new_executor, _load_whisper)
+    # Whisper runs in worker processes: a stuck transcription kills and
+    # respawns its worker instead of leaking a thread holding device state
+    whisper_config = WhisperConfig(
+        model_name=getenv("WHISPER_MODEL_NAME", "medium"),
+        device=getenv("WHISPER_DEVICE", "cuda"),
+        compute_type=getenv("WHISPER_COMPUTE", "float16"),
+        cpu_threads=int(getenv("WHISPER_CPU_THREADS", "0")),
+    )
+    profile = PROFILES.get(WHISPER_PROFILE)
+    if profile is None:
+        logging.warning(
+            f"Unknown WHISPER_PROFILE {WHISPER_PROFILE!r}, using default "
+            f"(choose from {', '.join(PROFILES)})"
+        )
+        profile = PROFILES["default"]
+    transcriber = TranscriptionEngine(
+        whisper_config,
+        workers=WHISPER_WORKERS,
+        timeout=WHISPER_TIMEOUT,
+        profile=profile,
+    )
+    app.state.whisper = transcriber
+    models = VoiceModels(transcriber)
+    app.state.models = models
+    # Connections share the workers fairly, whatever their segment lengths
+    scheduler = FairTranscriptionScheduler(transcriber, quantum=WHISPER_STREAM_QUANTUM)
+    app.state.transcription_scheduler = scheduler
+    segment_filter = SegmentFilter(
+        min_seconds=SEGMENT_MIN_SECONDS,
+        min_rms=SEGMENT_MIN_RMS,
+        min_speech_ratio=SEGMENT_MIN_SPEECH_RATIO,
+    )
+    metrics.QUEUE_DEPTH.labels("transcription").set_function(
+        lambda: sum(len(stream.jobs) for stream in scheduler.streams.values())
+    )
+    metrics.QUEUE_DEPTH.labels("vad").set_function(
+        lambda: len(models.vad.waiting) if models.vad is not None else 0
+    )
 
     # Set up templates and static files
     BASE_DIR = Path(__file__).parent
@@ -85,137 +210,207 @@ def create_app(bot=None):
     @app.get("/", response_class=HTMLResponse)
     async def home(request: Request) -> HTMLResponse:
         """Render the dashboard page."""
-        return templates.TemplateResponse("dashboard.html", {"request": request})
+        return templates.TemplateResponse(
+            "dashboard.html",
+            {
+                "request": request,
+                "profile": transcriber.profile.describe(),
+                "language": WHISPER_LANGUAGE or "auto",
+            },
+        )
+
+    @app.get("/healthz")
+    async def healthz() -> JSONResponse:
+        """Readiness: 200 once the voice models are loaded, 503 until then."""
+        health = {
+            **models.health(),
+            "streams": scheduler.metrics(),
+            "segment_filter": segment_filter.metrics(transcriber.realtime_factor),
+        }
+        return JSONResponse(health, status_code=200 if models.ready else 503)
+
+    @app.get("/metrics")
+    async def metrics_endpoint() -> PlainTextResponse:
+        """Prometheus scrape target for the reply and voice pipelines."""
+        if not metrics.REGISTRY.enabled:
+            return PlainTextResponse(
+                "metrics are disabled (METRICS_ENABLED=false)\n", status_code=404
+            )
+        return PlainTextResponse(
+            metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4"
+        )
 
     @app.websocket("/ws/audio")
-    async def audio_websocket(websocket: WebSocket) -> None:
-        """WebSocket endpoint for receiving audio data and performing VAD."""
-        initial_prompt = "faebot, transfaeries"
+    @app.websocket("/ws/audio/{channel}")
+    async def audio_websocket(
+        websocket: WebSocket, channel: Optional[str] = None
+    ) -> None:
+        """WebSocket endpoint for receiving audio data and performing VAD.
+        Transcriptions go to `channel`, from the path or the ?channel= query,
+        defaulting to STREAMER_CHANNEL."""
+        if not models.ready:
+            # 1013 "try again later": the dashboard reconnects with backoff
+            await websocket.accept()
+            await websocket.close(code=1013, reason=f"voice models {models.state}")
+            logging.info(f"Audio WebSocket turned away: voice models {models.state}")
+            return
+
+        channel_name = (channel or STREAMER_CHANNEL).lower().lstrip("#")
+        if not audio_channel_allowed(app.state.bot, channel_name):
+            # 1008 "policy violation": not a channel this server transcribes for
+            await websocket.accept()
+            await websocket.close(code=1008, reason="unknown channel")
+            logging.warning(
+                f"Audio WebSocket turned away: channel {channel_name[:40]!r} not allowed"
+            )
+            return
+
+        initial_prompt = f"faebot, {channel_name}"
         # Whisper sometimes echoes back substrings of the prompt instead of real speech.
         # Substring check is intentional — catches partial echoes like "faebot" or "transfaeries".
         prompt_echo_source = initial_prompt
+        transcribe_task = None
         try:
             logging.debug("WebSocket handler entered")
             await websocket.accept()
-            logging.info("Audio WebSocket connected")
+            logging.info(f"Audio WebSocket connected for {channel_name}")
 
             sample_rate = 16000
-            vad_chunk_size = 512  # VADIterator requires 512, 1024, or 1536 samples
+            vad_chunk_size = 512  # Silero takes 512-sample chunks at 16 kHz
+            window_samples = int(WHISPER_WINDOW_SECONDS * sample_rate)
+            overlap_samples = int(WHISPER_OVERLAP_SECONDS * sample_rate)
 
-            # Create VAD iterator for this connection
-            vad_iterator = VADIterator(
-                model=vad_model,
-                sampling_rate=sample_rate,
+            # This connection's VAD state; inference is batched with other connections
+            vad_stream = models.vad.stream(
                 threshold=0.5,
                 min_silence_duration_ms=500,
                 speech_pad_ms=100,
             )
 
-            audio_buffer = bytearray()
+            ring = AudioRingBuffer()
 
             # Speech accumulation
-            is_speaking = False
-            speech_buffer: list = []  # Will hold audio tensors during speech
+            segmenter = Segmenter(
+                segment_filter,
+                window_samples=window_samples,
+                overlap_samples=overlap_samples,
+                threshold=vad_stream.threshold,
+            )
+
+            # Segments are transcribed in order by one task, so audio keeps
+            # flowing through VAD while Whisper works
+            segments: asyncio.Queue = asyncio.Queue()
+            transcribe_task = asyncio.create_task(
+                _transcribe_segments(
+                    websocket,
+                    channel_name,
+                    segments,
+                    initial_prompt,
+                    prompt_echo_source,
+                )
+            )
 
             while True:
                 data = await websocket.receive_bytes()
+                if transcribe_task.done():
+                    # Nothing would read the segments any more: drop the connection
+                    logging.error(
+                        f"Transcription for {channel_name} stopped, closing the connection: "
+                        f"{transcribe_task.exception()!r}"
+                    )
+                    await websocket.close(code=1011, reason="transcription failed")
+                    return
 
                 # Keep-alive ping (empty message)
                 if len(data) == 0:
                     logging.debug("Keep-alive ping received")
                     continue
 
-                audio_buffer.extend(data)
-
-                bytes_per_chunk = vad_chunk_size * 2  # 2 bytes per int16 sample
-
-                # Process in 512-sample chunks as required by VADIterator
-                while len(audio_buffer) >= bytes_per_chunk:
-                    chunk_bytes = bytes(audio_buffer[:bytes_per_chunk])
-                    audio_buffer = audio_buffer[bytes_per_chunk:]
-
-                    # Convert to tensor for VAD
-                    audio_array = np.frombuffer(chunk_bytes, dtype=np.int16)
-                    audio_float = audio_array.astype(np.float32) / 32768.0
-                    audio_tensor = torch.from_numpy(audio_float)
-
-                    # Feed to VAD iterator
-                    event = vad_iterator(audio_tensor, return_seconds=True)
-
-                    if event and "start" in event:
-                        logging.debug(f"Speech started at {event['start']:.2f}s")
-                        is_speaking = True
-                        speech_buffer = []
-
-                    if is_speaking:
-                        speech_buffer.append(audio_tensor)
-
-                    if event and "end" in event:
-                        logging.debug(f"Speech ended at {event['end']:.2f}s")
-                        is_speaking = False
-
-                        if speech_buffer:
-                            # Concatenate all chunks and transcribe
-                            full_audio = torch.cat(speech_buffer).numpy()
-                            duration = len(full_audio) / sample_rate
-                            logging.debug(
-                                f"Transcribing {duration:.1f}s of audio"
-                            )
-
-                            try:
-                                loop = asyncio.get_event_loop()
-                                text, info = await asyncio.wait_for(
-                                    loop.run_in_executor(
-                                        whisper_state["executor"],
-                                        _transcribe_sync,
-                                        full_audio,
-                                        initial_prompt,
-                                    ),
-                                    timeout=WHISPER_TIMEOUT,
-                                )
-                                whisper_state["executor_is_fresh"] = False
-                            except asyncio.TimeoutError:
-                                logging.error(
-                                    f"Whisper transcription timed out after {WHISPER_TIMEOUT}s "
-                                    f"on {duration:.1f}s of audio — skipping chunk"
-                                )
-                                if whisper_state["executor_is_fresh"]:
-                                    # Fresh executor timed out — CUDA/model is broken
-                                    await _rebuild_whisper()
-                                else:
-                                    # Executor was stuck from a previous timeout — just replace the thread
-                                    _rebuild_executor()
-                                whisper_state["executor_is_fresh"] = True
-                                speech_buffer = []
-                                continue
-
-                            if text and text.lower() not in prompt_echo_source:
-                                logging.debug(
-                                    f"Transcription [{info.language}]: {text}"
-                                )
-                                await websocket.send_text(
-                                    json.dumps(
-                                        {"text": text, "language": info.language}
-                                    )
-                                )
-
-                                # Feed transcription to bot if connected
-                                if app.state.bot:
-                                    streamer = getenv(
-                                        "STREAMER_CHANNEL", "transfaeries"
-                                    )
-                                    await app.state.bot.handle_transcription(
-                                        streamer, text
-                                    )
-                            else:
-                                logging.debug(f"Filtered prompt echo: {text}")
-
-                            speech_buffer = []
+                # One vectorized int16 -> float32 conversion per frame
+                ring.push(data)
+
+                # Process in 512-sample windows as required by Silero. Windows are
+                # views into the ring buffer, valid until the next push
+                windows = list(ring.windows(vad_chunk_size))
+                results = await models.vad.process(vad_stream, windows)
+                for window, (speech_prob, event) in zip(windows, results):
+                    # Segments that fail the cheap checks never reach Whisper
+                    for segment in segmenter.feed(window, speech_prob, event):
+                        segments.put_nowait(segment)
 
         except Exception as e:
             logging.warning(f"WebSocket disconnected: {e}")
         finally:
-            vad_iterator.reset_states()
+            if transcribe_task is not None:
+                transcribe_task.cancel()
+
+    async def _transcribe_segments(
+        websocket: WebSocket,
+        channel_name: str,
+        segments: asyncio.Queue,
+        initial_prompt: str,
+        prompt_echo_source: str,
+    ) -> None:
+        """Transcribe one connection's speech segments in order. Partial results
+        go to the dashboard; only finished sentences are fed to the bot."""
+        stitcher = TranscriptStitcher()
+        language_lock = LanguageLock(WHISPER_LANGUAGE, after=WHISPER_LANGUAGE_LOCK)
+        language = ""
+        while True:
+            audio, final = await segments.get()
+            added = ""
+            if audio is not None:
+                duration = len(audio) / 16000
+                logging.debug(f"Transcribing {duration:.1f}s of audio")
+                try:
+                    transcript = await scheduler.transcribe(
+                        channel_name,
+                        audio,
+                        initial_prompt,
+                        language=language_lock.language,
+                    )
+                except asyncio.TimeoutError:
+                    logging.error(
+                        f"Whisper transcription timed out after {WHISPER_TIMEOUT}s "
+                        f"on {duration:.1f}s of audio — skipping chunk"
+                    )
+                    transcript = None
+                except TranscriptionError as e:
+                    logging.error(f"Whisper transcription failed: {e}")
+                    transcript = None
+
+                if transcript is None:
+                    pass
+                elif (
+                    transcript.text
+                    and transcript.text.lower() not in prompt_echo_source
+                ):
+                    logging.debug(
+                        f"Transcription [{transcript.language}]: {transcript.text}"
+                    )
+                    added = stitcher.add(transcript.text)
+                    language = transcript.language
+                    language_lock.observe(language)
+                else:
+                    logging.debug(f"Filtered prompt echo: {transcript.text}")
+
+            text = stitcher.text
+            if text and (added or final):
+                await websocket.send_text(
+                    json.dumps(
+                        {
+                            "text": text,
+                            "language": language,
+                            "language_state": language_lock.state,
+                            "partial": not final,
+                        }
+                    )
+                )
+            finished = stitcher.flush() if final else stitcher.pop_sentences()
+
+            # Feed finished sentences to bot if connected
+            if finished and app.state.bot:
+                await app.state.bot.handle_transcription(channel_name, finished)
 
     return app
 
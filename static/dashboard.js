@@ -21,6 +21,7 @@ class AudioCapture {
 
         this.websocket = null;
         this.workletNode = null;
+        this.partialEntry = null;
     }
     
     async start() {
@@ -158,7 +159,8 @@ class AudioCapture {
         }
         
         const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-        const wsUrl = `${protocol}//${window.location.host}/ws/audio`;
+        // Pass ?channel= through, so one dashboard tab per streamer works
+        const wsUrl = `${protocol}//${window.location.host}/ws/audio${window.location.search}`;
         
         this.websocket = new WebSocket(wsUrl);
         
@@ -181,7 +183,10 @@ class AudioCapture {
         
         this.websocket.onclose = (event) => {
             console.log('WebSocket disconnected, code:', event.code);
-            document.getElementById('connectionStatus').textContent = 'Disconnected';
+            // 1013: the server is still loading its voice models;
+            // 1008: the channel isn't one faebot is in, retrying won't help
+            document.getElementById('connectionStatus').textContent =
+                event.code === 1013 ? 'Models loading' : event.code === 1008 ? 'Unknown channel' : 'Disconnected';
             document.getElementById('connectionStatus').classList.remove('connected');
             document.getElementById('connectionStatus').classList.add('disconnected');
             
@@ -191,7 +196,7 @@ class AudioCapture {
             }
             
             // Auto-reconnect if we're still recording
-            if (this.isRecording) {
+            if (this.isRecording && event.code !== 1008) {
                 this.reconnectAttempts = (this.reconnectAttempts || 0) + 1;
                 const delay = Math.min(1000 * Math.pow(2, this.reconnectAttempts - 1), 30000);
                 console.log(`Reconnecting in ${delay}ms (attempt ${this.reconnectAttempts})`);
@@ -207,20 +212,32 @@ class AudioCapture {
             const data = JSON.parse(event.data);
             const text = data.text;
             const language = data.language;
-            console.log('Transcription:', text, `[${language}]`);
+            console.log(data.partial ? 'Partial transcription:' : 'Transcription:', text, `[${language}]`);
             
             const log = document.getElementById('transcriptionLog');
             const empty = log.querySelector('.log-empty');
             if (empty) empty.remove();
             
-            const entry = document.createElement('div');
-            entry.className = 'log-entry';
+            // Long utterances arrive as partial results first; keep updating
+            // the same entry until the final one comes in
+            let entry = this.partialEntry;
+            if (!entry) {
+                entry = document.createElement('div');
+                entry.className = 'log-entry';
+                log.appendChild(entry);
+            }
+            entry.classList.toggle('partial', Boolean(data.partial));
             entry.innerHTML = `
                 <div class="time">${new Date().toLocaleTimeString()} [${language}]</div>
                 <div class="text">${text}</div>
             `;
-            log.appendChild(entry);
+            this.partialEntry = data.partial ? entry : null;
             log.scrollTop = log.scrollHeight;
+
+            if (data.language_state) {
+                document.getElementById('whisperLanguage').textContent =
+                    `${language} (${data.language_state})`;
+            }
         };
     }
 }
@@ -0,0 +1,175 @@
+from typing import Optional
+import sqlite3
+
+from writer import BatchWriter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channels (
+    name TEXT PRIMARY KEY,
+    frequency REAL,
+    voice_frequency REAL,
+    history INTEGER,
+    model TEXT,
+    silenced INTEGER,
+    burst_window REAL
+);
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    channel TEXT NOT NULL,
+    author TEXT NOT NULL,
+    text TEXT NOT NULL,
+    voice INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lines_by_channel ON lines (channel, id);
+CREATE TABLE IF NOT EXISTS summaries (
+    channel TEXT PRIMARY KEY,
+    summary TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    username TEXT PRIMARY KEY,
+    alias TEXT NOT NULL
+);
+"""
+
+# Conversation settings that are persisted, in `channels` column order. NULL
+# means "the default", so changing a default reaches every channel not set by hand
+SETTINGS = (
+    "frequency",
+    "voice_frequency",
+    "history",
+    "model",
+    "silenced",
+    "burst_window",
+)
+
+
+class ConversationStore(BatchWriter):
+    """SQLite (WAL mode) store for conversations, their settings and aliases.
+    Writes are queued and committed in batches by a background thread, so the
+    event loop never waits on disk; reads are single indexed queries, done
+    once per channel the first time it's used."""
+
+    def __init__(
+        self, path: str = "faebot.db", batch_size: int = 64, flush_interval: float = 1.0
+    ):
+        self.path = path
+        self._db = self._connect()
+        self._db.executescript(SCHEMA)
+        # Only ever used by the writer thread
+        self._writer_db = self._connect()
+        super().__init__("store", "conversation updates", batch_size, flush_interval)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        # WAL makes NORMAL safe against corruption; a crash loses at most the last batch
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # Reads, on the caller's thread
+
+    def load_conversation(
+        self, channel_name: str
+    ) -> Optional[tuple[dict, list[tuple[str, str, bool]], str]]:
+        """Settings changed from their defaults, newest chat lines (oldest
+        first) and summary of older lines of a stored channel, or None."""
+        row = self._db.execute(
+            f"SELECT {', '.join(SETTINGS)} FROM channels WHERE name = ?",
+            (channel_name,),
+        ).fetchone()
+        if row is None:
+            return None
+        settings = {
+            key: value for key, value in zip(SETTINGS, row) if value is not None
+        }
+        if "silenced" in settings:
+            settings["silenced"] = bool(settings["silenced"])
+        # Stored lines are already trimmed to the history length when written
+        lines = self._db.execute(
+            "SELECT author, text, voice FROM lines WHERE channel = ? ORDER BY id DESC LIMIT ?",
+            (channel_name, settings.get("history", -1)),
+        ).fetchall()
+        summary = self._db.execute(
+            "SELECT summary FROM summaries WHERE channel = ?", (channel_name,)
+        ).fetchone()
+        return (
+            settings,
+            [(author, text, bool(voice)) for author, text, voice in reversed(lines)],
+            summary[0] if summary else "",
+        )
+
+    def load_aliases(self) -> dict[str, str]:
+        return dict(self._db.execute("SELECT username, alias FROM aliases"))
+
+    # Writes, queued for the writer thread
+
+    def save_settings(self, channel_name: str, settings: dict) -> None:
+        """Store a channel's settings; any left out are stored as the default."""
+        self._put(
+            ("settings", channel_name, tuple(settings.get(key) for key in SETTINGS))
+        )
+
+    def add_line(
+        self, channel_name: str, author: str, text: str, voice: bool, keep: int
+    ) -> None:
+        """Store a chat line, keeping only the newest `keep` lines of the channel."""
+        self._put(("line", channel_name, author, text, voice, keep))
+
+    def save_summary(self, channel_name: str, summary: str) -> None:
+        self._put(("summary", channel_name, summary))
+
+    def clear(self, channel_name: str) -> None:
+        """Delete a channel's stored lines and summary, keeping its settings."""
+        self._put(("clear", channel_name))
+
+    def set_alias(self, username: str, alias: str) -> None:
+        self._put(("alias", username, alias))
+
+    def close(self) -> None:
+        """Commit everything queued so far and stop the writer thread."""
+        if self._thread is None:
+            return
+        super().close()
+        self._writer_db.close()
+        self._db.close()
+
+    def _flush(self, batch: list) -> None:
+        # Only the last settings per channel matter; lines are trimmed once per channel
+        db = self._writer_db
+        settings: dict[str, tuple] = {}
+        keep: dict[str, int] = {}
+        try:
+            db.execute("BEGIN")
+            for op, *args in batch:
+                if op == "settings":
+                    settings[args[0]] = args[1]
+                elif op == "line":
+                    channel_name, author, text, voice, keep_lines = args
+                    db.execute(
+                        "INSERT INTO lines (channel, author, text, voice) VALUES (?, ?, ?, ?)",
+                        (channel_name, author, text, int(voice)),
+                    )
+                    keep[channel_name] = keep_lines
+                elif op == "summary":
+                    db.execute("INSERT OR REPLACE INTO summaries VALUES (?, ?)", args)
+                elif op == "clear":
+                    db.execute("DELETE FROM lines WHERE channel = ?", (args[0],))
+                    db.execute("DELETE FROM summaries WHERE channel = ?", (args[0],))
+                    keep.pop(args[0], None)
+                elif op == "alias":
+                    db.execute("INSERT OR REPLACE INTO aliases VALUES (?, ?)", args)
+            db.executemany(
+                f"INSERT OR REPLACE INTO channels VALUES (?, {', '.join('?' * len(SETTINGS))})",
+                [(name, *values) for name, values in settings.items()],
+            )
+            for channel_name, keep_lines in keep.items():
+                db.execute(
+                    "DELETE FROM lines WHERE channel = ? AND id <= ("
+                    "SELECT id FROM lines WHERE channel = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (channel_name, channel_name, keep_lines),
+                )
+            db.execute("COMMIT")
+        except Exception:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
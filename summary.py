@@ -0,0 +1,130 @@
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+import time
+
+
+class _Channel:
+    __slots__ = ("pending", "summary", "task", "epoch", "retry_at")
+
+    def __init__(self, summary: str = ""):
+        self.pending: list[str] = []
+        self.summary = summary
+        self.task: Optional[asyncio.Task] = None
+        # Bumped by reset() so a summary started before a clear is thrown away
+        self.epoch = 0
+        self.retry_at = 0.0
+
+
+class Summarizer:
+    """Folds chat lines that fell out of a conversation's history into a
+    running per-channel summary. Lines are batched, `batch_lines` to a call of
+    `summarize(channel_name, summary, lines) -> new summary` (a cheap model),
+    run in the background with at most `concurrency` calls at once; nothing
+    here is ever awaited by the reply path. `on_summary(channel_name, summary)`
+    is told about each new summary."""
+
+    def __init__(
+        self,
+        summarize: Callable[[str, str, list[str]], Awaitable[str]],
+        on_summary: Callable[[str, str], None],
+        batch_lines: int = 20,
+        max_pending: int = 200,
+        max_chars: int = 800,
+        concurrency: int = 2,
+        retry_delay: float = 60,
+    ):
+        self.summarize = summarize
+        self.on_summary = on_summary
+        self.batch_lines = batch_lines
+        # Lines kept waiting while summarization fails; the oldest go first
+        self.max_pending = max_pending
+        self.max_chars = max_chars
+        self.retry_delay = retry_delay
+        self.channels: dict[str, _Channel] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.counters = {"summaries": 0, "lines": 0, "failed": 0, "dropped": 0}
+        self.seconds = 0.0
+
+    def load(self, channel_name: str, summary: str):
+        """Start a channel from a stored summary."""
+        self.channels[channel_name] = _Channel(summary)
+
+    def add(self, channel_name: str, line: str):
+        """Queue a line that left the history. Never blocks."""
+        channel = self.channels.get(channel_name)
+        if channel is None:
+            channel = self.channels[channel_name] = _Channel()
+        channel.pending.append(line)
+        if len(channel.pending) > self.max_pending and channel.task is None:
+            excess = len(channel.pending) - self.max_pending
+            del channel.pending[:excess]
+            self.counters["dropped"] += excess
+        if (
+            channel.task is None
+            and len(channel.pending) >= self.batch_lines
+            and time.monotonic() >= channel.retry_at
+        ):
+            channel.task = asyncio.create_task(
+                self._summarize(channel_name, channel), name=f"summarize-{channel_name}"
+            )
+
+    def reset(self, channel_name: str):
+        """Forget a channel's summary and anything waiting to go into it."""
+        channel = self.channels.pop(channel_name, None)
+        if channel is not None:
+            channel.epoch += 1
+
+    async def _summarize(self, channel_name: str, channel: _Channel):
+        lines = channel.pending[: self.batch_lines * 2]
+        epoch = channel.epoch
+        try:
+            async with self._semaphore:
+                started = time.perf_counter()
+                summary = await self.summarize(channel_name, channel.summary, lines)
+                self.seconds += time.perf_counter() - started
+        except Exception as e:
+            self.counters["failed"] += 1
+            channel.retry_at = time.monotonic() + self.retry_delay
+            logging.error(
+                f"Failed to summarize {len(lines)} lines in {channel_name}: {e}"
+            )
+            return
+        finally:
+            channel.task = None
+        if channel.epoch != epoch or self.channels.get(channel_name) is not channel:
+            return  # cleared while we were summarizing
+        del channel.pending[: len(lines)]
+        channel.summary = self._clip(summary.strip())
+        self.counters["summaries"] += 1
+        self.counters["lines"] += len(lines)
+        logging.debug(
+            f"Summarized {len(lines)} lines in {channel_name}: {channel.summary}"
+        )
+        self.on_summary(channel_name, channel.summary)
+
+    def _clip(self, summary: str) -> str:
+        """Cut an overlong summary back to its last whole sentence that fits."""
+        if len(summary) <= self.max_chars:
+            return summary
+        clipped = summary[: self.max_chars]
+        end = max(clipped.rfind(mark) for mark in (". ", "! ", "? ", ".\n"))
+        return clipped[: end + 1] if end > 0 else clipped
+
+    async def close(self):
+        tasks = [
+            channel.task
+            for channel in self.channels.values()
+            if channel.task is not None
+        ]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def metrics(self) -> dict:
+        summaries = self.counters["summaries"]
+        return {
+            **self.counters,
+            "pending": sum(len(channel.pending) for channel in self.channels.values()),
+            "avg_seconds": round(self.seconds / summaries, 2) if summaries else 0.0,
+        }
@@ -0,0 +1,20 @@
+import pytest
+
+
+class FakeClock:
+    """Stands in for the `time` module of the code under test: monotonic()
+    only moves when the test calls advance()."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
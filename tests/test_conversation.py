@@ -0,0 +1,74 @@
+import pytest
+
+import faebot
+from faebot import Conversation
+
+
+class FakeMemory:
+    def __init__(self):
+        self.remembered: list[str] = []
+
+    def remember(self, channel_name: str, author: str, text: str, voice: bool = False):
+        self.remembered.append(f"{author}: {text}")
+
+
+@pytest.fixture(autouse=True)
+def budgets(monkeypatch):
+    monkeypatch.setattr(faebot, "PROMPT_TOKEN_BUDGETS", {"small": 20, "big": 4000})
+
+
+def lines(count: int) -> list[str]:
+    return [f"amy: line number {n}" for n in range(count)]
+
+
+def fill(conversation: Conversation, count: int):
+    for line in lines(count):
+        author, text = line.split(": ")
+        conversation.add(author, text)
+
+
+def test_the_prompt_follows_the_chatlog():
+    conversation = Conversation(channel="faeb", history=3, model="big")
+    fill(conversation, 5)
+    assert [str(line) for line in conversation.chatlog] == lines(5)[2:]
+    assert conversation.prompt.render() == "\n".join(lines(5)[2:])
+
+
+def test_lines_leaving_the_history_go_to_memory():
+    memory = FakeMemory()
+    conversation = Conversation(channel="faeb", history=3, model="big", memory=memory)
+    fill(conversation, 5)
+    assert memory.remembered == lines(2)
+
+
+def test_no_history_keeps_nothing():
+    conversation = Conversation(channel="faeb", history=0, model="big")
+    fill(conversation, 3)
+    assert not conversation.chatlog and conversation.prompt.render() == ""
+
+
+def test_the_prompt_budget_drops_lines_the_chatlog_keeps():
+    conversation = Conversation(channel="faeb", history=10, model="small")
+    fill(conversation, 10)
+    assert len(conversation.chatlog) == 10
+    assert len(conversation.prompt) == 3
+
+
+def test_a_bigger_model_budget_brings_back_the_whole_chatlog():
+    conversation = Conversation(channel="faeb", history=10, model="small")
+    fill(conversation, 10)
+    conversation.set_model("big")
+    assert conversation.prompt.render() == "\n".join(lines(10))
+    assert "model" in conversation.customized
+
+
+def test_shorter_history_keeps_the_newest_lines():
+    memory = FakeMemory()
+    conversation = Conversation(channel="faeb", history=5, model="big", memory=memory)
+    fill(conversation, 5)
+    conversation.set_history(2)
+    assert [str(line) for line in conversation.chatlog] == lines(5)[3:]
+    assert conversation.prompt.render() == "\n".join(lines(5)[3:])
+    assert memory.remembered == lines(3)
+    fill(conversation, 1)
+    assert len(conversation.chatlog) == 2
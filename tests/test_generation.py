@@ -0,0 +1,160 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from generation import TWITCH_MESSAGE_LIMIT, GenerationError, complete
+
+WORDS = (
+    "faebot flutters around the stream and says hello to everyone in chat! " * 40
+).split()
+
+
+def chunk(content: str = "", finish_reason=None) -> dict:
+    delta = {"content": content} if content else {}
+    return {"choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+
+class StandIn:
+    """Local stand-in for an OpenAI-compatible completions endpoint, speaking
+    SSE. Sends `events` (dicts, or raw strings like "[DONE]") one by one and
+    records how many it got out before the client went away."""
+
+    def __init__(
+        self,
+        events: list,
+        first_delay: float = 0.0,
+        delay: float = 0.0,
+        status: int = 200,
+    ):
+        self.events = events
+        self.first_delay = first_delay
+        self.delay = delay
+        self.status = status
+        self.sent = 0
+        self.disconnected = False
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        if self.status != 200:
+            return web.json_response({"error": {"message": "nope"}}, status=self.status)
+        await asyncio.sleep(self.first_delay)
+        if not body.get("stream"):
+            text = "".join(
+                event["choices"][0]["delta"].get("content", "") for event in self.events
+            )
+            return web.json_response(
+                {"choices": [{"message": {"role": "assistant", "content": text}}]}
+            )
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b": OPENROUTER PROCESSING\n\n")
+        try:
+            for event in self.events:
+                data = event if isinstance(event, str) else json.dumps(event)
+                await response.write(f"data: {data}\n\n".encode())
+                self.sent += 1
+                await asyncio.sleep(self.delay)
+        except (ConnectionResetError, asyncio.CancelledError):
+            self.disconnected = True
+        return response
+
+
+@asynccontextmanager
+async def serve(stand_in: StandIn):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", stand_in.completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    try:
+        async with aiohttp.ClientSession() as session:
+            yield session, f"http://127.0.0.1:{port}/v1/chat/completions"
+    finally:
+        await runner.cleanup()
+
+
+def run(stand_in: StandIn, stream: bool = True, **options) -> tuple[str, dict]:
+    async def main():
+        timings: dict = {}
+        payload = {"model": "stand-in", "messages": [], "stream": stream}
+        async with serve(stand_in) as (session, url):
+            text = await complete(session, url, {}, payload, timings=timings, **options)
+            # Give the stand-in a moment to notice a dropped connection
+            await asyncio.sleep(0.05)
+        return text, timings
+
+    return asyncio.run(main())
+
+
+def test_stops_at_the_twitch_limit():
+    stand_in = StandIn([chunk(word + " ") for word in WORDS], delay=0.001)
+    text, timings = run(stand_in)
+    assert (
+        TWITCH_MESSAGE_LIMIT
+        <= len(text)
+        < TWITCH_MESSAGE_LIMIT + len(max(WORDS, key=len)) + 1
+    )
+    assert timings["cutoff"] == "limit"
+
+
+def test_stops_at_a_sentence_end_after_the_soft_limit():
+    stand_in = StandIn([chunk(word + " ") for word in WORDS], delay=0.001)
+    text, timings = run(stand_in, soft_chars=100)
+    assert text.rstrip().endswith("!")
+    assert 100 <= len(text) < 200
+    assert timings["cutoff"] == "sentence"
+
+
+def test_done_ends_the_reply():
+    stand_in = StandIn([chunk("hello "), chunk("chat"), "[DONE]", chunk(" never sent")])
+    text, timings = run(stand_in)
+    assert text == "hello chat"
+    assert "cutoff" not in timings
+
+
+def test_finish_reason_ends_the_reply():
+    stand_in = StandIn(
+        [chunk("hello "), chunk("chat", finish_reason="stop"), chunk(" ignored")]
+    )
+    text, timings = run(stand_in)
+    assert text == "hello chat"
+    assert "cutoff" not in timings
+
+
+def test_an_error_event_fails_the_request():
+    stand_in = StandIn([chunk("hello "), {"error": {"message": "model overloaded"}}])
+    with pytest.raises(GenerationError):
+        run(stand_in, max_retries=1)
+
+
+def test_a_rejected_request_isnt_retried():
+    stand_in = StandIn([], status=400)
+    with pytest.raises(GenerationError) as error:
+        run(stand_in, max_retries=3)
+    assert not error.value.retryable
+
+
+def test_time_to_first_token_is_recorded():
+    stand_in = StandIn([chunk("hello "), chunk("chat"), "[DONE]"], first_delay=0.05)
+    _, timings = run(stand_in)
+    assert 0.05 <= timings["ttft"] <= timings["total"]
+
+
+def test_the_upstream_stops_after_a_cutoff():
+    stand_in = StandIn([chunk(word + " ") for word in WORDS], delay=0.005)
+    run(stand_in, soft_chars=50)
+    assert stand_in.disconnected
+    assert stand_in.sent < len(WORDS)
+
+
+def test_unstreamed_replies_come_back_whole():
+    stand_in = StandIn([chunk("hello "), chunk("chat")])
+    text, timings = run(stand_in, stream=False)
+    assert text == "hello chat"
+    assert "ttft" not in timings
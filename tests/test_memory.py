@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from memory import Memory
+
+
+@pytest.fixture
+def memory(tmp_path):
+    memory = Memory(str(tmp_path), max_open=1, flush_interval=0.01)
+    yield memory
+    memory.close()
+
+
+def test_remembered_lines_can_be_recalled_after_a_restart(tmp_path):
+    memory = Memory(str(tmp_path))
+    memory.remember("faeb", "bob", "my cat is called Whiskers")
+    memory.remember("faeb", "amy", "speedrun of the new level tonight")
+    memory.close()
+
+    memory = Memory(str(tmp_path))
+    found = asyncio.run(memory.recall("faeb", "what is bob's cat called?", k=1))
+    memory.close()
+    assert [(r.author, r.text) for r in found] == [("bob", "my cat is called Whiskers")]
+
+
+def test_forget_deletes_a_channel(tmp_path):
+    memory = Memory(str(tmp_path))
+    memory.remember("faeb", "bob", "my cat is called Whiskers")
+    memory.forget("faeb")
+    memory.close()
+    assert not (tmp_path / "faeb").exists()
+
+
+def test_only_idle_channels_are_evicted(memory):
+    with memory._open("first") as first:
+        with memory._open("second"):
+            # Over max_open, but both are in use
+            assert list(memory._channels) == ["first", "second"]
+        with memory._open("first") as again:
+            assert again is first
+    assert list(memory._channels) == ["first"]
+
+
+def test_an_open_channel_is_never_opened_twice(memory):
+    memory.remember("first", "bob", "hello")
+    memory.remember("second", "amy", "hi")
+    deadline = time.monotonic() + 5
+    while memory.counters["remembered"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    with memory._open("first") as writing:
+        # A recall elsewhere would evict "first" if it were idle
+        asyncio.run(memory.recall("second", "hi"))
+        asyncio.run(memory.recall("first", "hello"))
+        assert memory._channels["first"] is writing
+
+
+def test_channel_names_cant_leave_the_directory(memory):
+    with pytest.raises(ValueError):
+        asyncio.run(memory.recall("../evil", "hello"))
@@ -0,0 +1,157 @@
+import asyncio
+
+import pytest
+
+import outbox
+from outbox import Outbox, PRIORITY_CHAT, PRIORITY_COMMAND, TokenBucket
+
+
+class FakeChannel:
+    """Records what was delivered, in order; messages in `broken` raise."""
+
+    def __init__(self, broken: tuple[str, ...] = ()):
+        self.sent: list[str] = []
+        self.broken = set(broken)
+
+    def deliver(self, text: str):
+        async def send():
+            if text in self.broken:
+                raise ConnectionError("twitch went away")
+            self.sent.append(text)
+
+        return send
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(outbox, "time", clock)
+
+
+async def settle():
+    """Let the outbox send everything it's allowed to right now."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_token_bucket_refills_over_the_period(clock):
+    bucket = TokenBucket(2, 10)
+    now = clock.monotonic()
+    bucket.take(now)
+    bucket.take(now)
+    assert bucket.delay(now) == pytest.approx(5)
+    assert bucket.delay(now + 5) == 0
+    # Never refills past capacity
+    assert bucket.delay(now + 100) == 0 and bucket.tokens == 2
+
+
+def test_command_replies_jump_ahead_of_chatter(clock):
+    async def main():
+        channel = FakeChannel()
+        box = Outbox(lambda channel_name: False, channel_interval=0.05)
+        assert await box.send("faeb", channel.deliver("first"))
+        chatter = asyncio.create_task(
+            box.send("faeb", channel.deliver("chatter"), PRIORITY_CHAT)
+        )
+        command = asyncio.create_task(
+            box.send("faeb", channel.deliver("command"), PRIORITY_COMMAND)
+        )
+        await settle()
+        assert channel.sent == ["first"]
+        clock.advance(0.06)
+        await asyncio.wait_for(command, 1)
+        assert not chatter.done()
+        clock.advance(0.06)
+        await asyncio.wait_for(chatter, 1)
+        await box.close()
+        return channel.sent
+
+    assert asyncio.run(main()) == ["first", "command", "chatter"]
+
+
+def test_moderated_channels_skip_the_per_channel_interval():
+    async def main():
+        channel = FakeChannel()
+        box = Outbox(
+            lambda channel_name: channel_name == "modded", channel_interval=0.05
+        )
+        sends = [box.send("modded", channel.deliver(f"line {n}")) for n in range(3)]
+        results = await asyncio.wait_for(asyncio.gather(*sends), 1)
+        await box.close()
+        return results, channel.sent
+
+    results, sent = asyncio.run(main())
+    assert results == [True, True, True]
+    assert sent == ["line 0", "line 1", "line 2"]
+
+
+def test_the_account_limit_spans_channels(clock):
+    async def main():
+        channel = FakeChannel()
+        box = Outbox(lambda channel_name: False, account_limit=2, period=0.1)
+        await asyncio.gather(
+            *(box.send(name, channel.deliver(name)) for name in ("a", "b"))
+        )
+        third = asyncio.create_task(box.send("c", channel.deliver("c")))
+        await settle()
+        assert not third.done()
+        clock.advance(0.06)
+        assert await asyncio.wait_for(third, 1)
+        await box.close()
+        return channel.sent
+
+    assert asyncio.run(main()) == ["a", "b", "c"]
+
+
+def test_messages_that_would_go_out_too_late_are_dropped(clock):
+    async def main():
+        channel = FakeChannel()
+        box = Outbox(lambda channel_name: False, channel_interval=0.05)
+        await box.send("faeb", channel.deliver("first"))
+        stale = asyncio.create_task(
+            box.send("faeb", channel.deliver("stale"), max_age=0.01)
+        )
+        await settle()
+        clock.advance(1)
+        result = await asyncio.wait_for(stale, 1)
+        await box.close()
+        return result, channel.sent, box.metrics()
+
+    result, sent, metrics = asyncio.run(main())
+    assert result is False
+    assert sent == ["first"]
+    assert metrics["dropped"] == 1
+
+
+def test_a_failed_delivery_returns_false_and_the_outbox_carries_on():
+    async def main():
+        channel = FakeChannel(broken=("broken",))
+        box = Outbox(lambda channel_name: True)
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                box.send("faeb", channel.deliver("broken")),
+                box.send("faeb", channel.deliver("fine")),
+            ),
+            1,
+        )
+        await box.close()
+        return results, channel.sent, box.metrics()
+
+    results, sent, metrics = asyncio.run(main())
+    assert results == [False, True]
+    assert sent == ["fine"]
+    assert metrics["failed"] == 1 and metrics["sent"] == 1
+
+
+def test_close_resolves_messages_still_waiting():
+    async def main():
+        channel = FakeChannel()
+        box = Outbox(lambda channel_name: False, channel_interval=60)
+        await box.send("faeb", channel.deliver("first"))
+        waiting = asyncio.create_task(box.send("faeb", channel.deliver("never")))
+        await settle()
+        await box.close()
+        return await asyncio.wait_for(waiting, 1), box.metrics()
+
+    result, metrics = asyncio.run(main())
+    assert result is False
+    assert metrics["queue_depth"] == 0
@@ -0,0 +1,48 @@
+from prompt import CHARS_PER_TOKEN, PromptBuilder, estimate_tokens
+
+
+def test_estimate_rounds_up():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a") == 1
+    assert estimate_tokens("a" * CHARS_PER_TOKEN) == 1
+    assert estimate_tokens("a" * (CHARS_PER_TOKEN + 1)) == 2
+
+
+def test_renders_the_lines_in_order():
+    prompt = PromptBuilder(100, ["amy: hi", "bob: hello"])
+    prompt.append("amy: how are you")
+    assert prompt.render() == "amy: hi\nbob: hello\namy: how are you"
+    assert len(prompt) == 3
+    # Joined once, then reused until the lines change
+    assert prompt.render() is prompt.render()
+
+
+def test_oldest_lines_leave_once_over_budget():
+    # Each of these costs 3 tokens with its newline
+    prompt = PromptBuilder(7, ["amy: one", "bob: two"])
+    prompt.append("cat: six")
+    assert prompt.render() == "bob: two\ncat: six"
+    assert prompt.tokens == 6
+
+
+def test_the_newest_line_always_stays_clipped_to_the_budget():
+    prompt = PromptBuilder(5, ["amy: hi"])
+    prompt.append("x" * 100)
+    assert prompt.render() == "x" * 5 * CHARS_PER_TOKEN
+    assert len(prompt) == 1
+
+
+def test_popleft_and_reset():
+    prompt = PromptBuilder(100, ["amy: one", "bob: two", "cat: three"])
+    prompt.popleft()
+    assert prompt.render() == "bob: two\ncat: three"
+    prompt.reset()
+    assert prompt.render() == "" and prompt.tokens == 0 and len(prompt) == 0
+
+
+def test_a_bigger_budget_brings_back_lines_from_the_history():
+    history = [f"amy: line {n}" for n in range(10)]
+    prompt = PromptBuilder(8, history)
+    assert len(prompt) == 2
+    prompt.set_budget(4000, history)
+    assert prompt.render() == "\n".join(history)
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+import router
+from generation import GenerationError
+from router import Backend, ModelRouter
+
+
+class FakeComplete:
+    """Stands in for generation.complete: raises `error` if set, else replies."""
+
+    def __init__(self, error: Exception | None = None):
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self, session, url, headers, payload, **options) -> str:
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return "hi chat"
+
+
+def generate_times(models: ModelRouter, times: int):
+    async def main():
+        for _ in range(times):
+            try:
+                await models.generate(None, {"messages": []})
+            except GenerationError:
+                pass
+
+    asyncio.run(main())
+
+
+def test_transient_failures_open_the_circuit(monkeypatch):
+    monkeypatch.setattr(router, "complete", FakeComplete(GenerationError("503")))
+    backend = Backend("primary", "http://primary")
+    generate_times(ModelRouter([backend], failure_threshold=3), 3)
+    assert not backend.available()
+    assert backend.failures == 3
+
+
+def test_rejected_requests_dont_open_the_circuit(monkeypatch):
+    rejected = GenerationError("primary returned 400", retryable=False)
+    monkeypatch.setattr(router, "complete", FakeComplete(rejected))
+    backend = Backend("primary", "http://primary")
+    generate_times(ModelRouter([backend], failure_threshold=3), 5)
+    assert backend.available()
+    assert backend.failures == 5 and backend.consecutive_failures == 0
+
+
+def test_a_success_closes_the_count_again(monkeypatch):
+    fake = FakeComplete(GenerationError("503"))
+    monkeypatch.setattr(router, "complete", fake)
+    backend = Backend("primary", "http://primary")
+    models = ModelRouter([backend], failure_threshold=3)
+    generate_times(models, 2)
+    fake.error = None
+    generate_times(models, 1)
+    assert backend.consecutive_failures == 0 and backend.successes == 1
+
+
+@pytest.mark.parametrize("retryable", [True, False])
+def test_falls_through_to_the_next_backend(monkeypatch, retryable):
+    async def complete(session, url, headers, payload, **options):
+        if url == "http://primary":
+            raise GenerationError("failed", retryable=retryable)
+        return "from fallback"
+
+    monkeypatch.setattr(router, "complete", complete)
+    models = ModelRouter(
+        [Backend("primary", "http://primary"), Backend("fallback", "http://fallback")]
+    )
+    assert asyncio.run(models.generate(None, {"messages": []})) == "from fallback"
@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+
+import scheduler
+from scheduler import (
+    GenerationScheduler,
+    MAX_SETTLE_WINDOWS,
+    PRIORITY_CHAT,
+    PRIORITY_MENTION,
+)
+
+
+class FakeGenerate:
+    """Records the channels it's called for. Channels in `blocked` wait until
+    released, so a test can hold a generation in flight."""
+
+    def __init__(self, fail: tuple[str, ...] = ()):
+        self.calls: list[str] = []
+        self.blocked: dict[str, asyncio.Event] = {}
+        self.fail = set(fail)
+
+    def block(self, channel_name: str):
+        self.blocked[channel_name] = asyncio.Event()
+
+    def release(self, channel_name: str):
+        self.blocked.pop(channel_name).set()
+
+    async def __call__(self, channel_name: str):
+        self.calls.append(channel_name)
+        if channel_name in self.blocked:
+            await self.blocked[channel_name].wait()
+        if channel_name in self.fail:
+            raise RuntimeError("generation failed")
+
+
+@pytest.fixture(autouse=True)
+def fake_time(monkeypatch, clock):
+    monkeypatch.setattr(scheduler, "time", clock)
+
+
+async def settle():
+    """Let the workers pick up everything that's ready."""
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_requests_during_a_generation_fold_into_one_followup():
+    async def main():
+        generate = FakeGenerate()
+        generate.block("faeb")
+        jobs = GenerationScheduler(generate)
+        jobs.request("faeb")
+        await settle()
+        for _ in range(3):
+            jobs.request("faeb")
+        generate.release("faeb")
+        await settle()
+        await jobs.close()
+        return generate.calls, jobs.metrics()
+
+    calls, metrics = asyncio.run(main())
+    assert calls == ["faeb", "faeb"]
+    assert metrics["folded"] == 2
+    assert metrics["completed"] == 2
+
+
+def test_mentions_go_first():
+    async def main():
+        generate = FakeGenerate()
+        generate.block("busy")
+        jobs = GenerationScheduler(generate, max_concurrency=1)
+        jobs.request("busy")
+        await settle()
+        jobs.request("chatty", PRIORITY_CHAT)
+        jobs.request("mentioned", PRIORITY_MENTION)
+        generate.release("busy")
+        await settle()
+        await jobs.close()
+        return generate.calls
+
+    assert asyncio.run(main()) == ["busy", "mentioned", "chatty"]
+
+
+def test_a_mention_moves_a_queued_channel_up():
+    async def main():
+        generate = FakeGenerate()
+        generate.block("busy")
+        jobs = GenerationScheduler(generate, max_concurrency=1)
+        jobs.request("busy")
+        await settle()
+        jobs.request("first", PRIORITY_CHAT)
+        jobs.request("second", PRIORITY_CHAT)
+        jobs.request("second", PRIORITY_MENTION)
+        generate.release("busy")
+        await settle()
+        await jobs.close()
+        return generate.calls, jobs.metrics()
+
+    calls, metrics = asyncio.run(main())
+    # Requeued at the higher priority, and still run only once
+    assert calls == ["busy", "second", "first"]
+    assert metrics["folded"] == 1
+
+
+def test_a_failed_generation_is_counted_and_the_worker_carries_on():
+    async def main():
+        generate = FakeGenerate(fail=("broken",))
+        jobs = GenerationScheduler(generate, max_concurrency=1)
+        jobs.request("broken")
+        jobs.request("fine")
+        await settle()
+        await jobs.close()
+        return generate.calls, jobs.metrics()
+
+    calls, metrics = asyncio.run(main())
+    assert calls == ["broken", "fine"]
+    assert metrics["failed"] == 1
+    assert metrics["completed"] == 1
+    assert metrics["in_flight"] == 0
+
+
+def test_wait_times_are_measured_from_the_request(clock):
+    async def main():
+        generate = FakeGenerate()
+        generate.block("busy")
+        jobs = GenerationScheduler(generate, max_concurrency=1)
+        jobs.request("busy")
+        await settle()
+        jobs.request("waiting")
+        clock.advance(2.5)
+        generate.release("busy")
+        await settle()
+        await jobs.close()
+        return jobs.metrics()
+
+    metrics = asyncio.run(main())
+    assert metrics["wait_last_seconds"] == 2.5
+    assert metrics["wait_max_seconds"] == 2.5
+
+
+def test_a_burst_is_answered_once_after_chat_settles():
+    async def main():
+        generate = FakeGenerate()
+        jobs = GenerationScheduler(generate)
+        for _ in range(3):
+            jobs.request("faeb", settle=0.05)
+        await settle()
+        assert generate.calls == []
+        await asyncio.sleep(0.1)
+        await settle()
+        await jobs.close()
+        return generate.calls, jobs.metrics()
+
+    calls, metrics = asyncio.run(main())
+    assert calls == ["faeb"]
+    assert metrics["coalesced"] == 2
+
+
+def test_ongoing_chat_cant_push_a_reply_back_forever(clock):
+    async def main():
+        generate = FakeGenerate()
+        jobs = GenerationScheduler(generate)
+        jobs.request("faeb", settle=60)
+        # Chat kept going for the longest allowed settling time
+        clock.advance(60 * MAX_SETTLE_WINDOWS)
+        jobs.activity("faeb")
+        await asyncio.sleep(0.01)
+        await settle()
+        await jobs.close()
+        return generate.calls
+
+    assert asyncio.run(main()) == ["faeb"]
@@ -0,0 +1,53 @@
+from transcription import TranscriptStitcher
+
+
+def test_words_repeated_at_the_overlap_are_dropped():
+    stitcher = TranscriptStitcher()
+    assert stitcher.add("so I was thinking about") == "so I was thinking about"
+    assert stitcher.add("thinking about the garden today") == "the garden today"
+    assert stitcher.text == "so I was thinking about the garden today"
+
+
+def test_overlap_matching_ignores_case_and_punctuation():
+    stitcher = TranscriptStitcher()
+    stitcher.add("We should go outside,")
+    assert stitcher.add("Outside! It's sunny") == "It's sunny"
+
+
+def test_windows_without_an_overlap_are_joined_whole():
+    stitcher = TranscriptStitcher()
+    stitcher.add("hello chat")
+    assert stitcher.add("welcome back") == "welcome back"
+    assert stitcher.text == "hello chat welcome back"
+
+
+def test_the_overlap_search_is_bounded():
+    stitcher = TranscriptStitcher(max_overlap_words=2)
+    stitcher.add("one two three")
+    # Only the last two words are compared, so a longer repeat isn't found
+    assert stitcher.add("one two three four") == "one two three four"
+
+
+def test_only_finished_sentences_are_handed_out_once():
+    stitcher = TranscriptStitcher()
+    stitcher.add("Hello there. How are")
+    assert stitcher.pop_sentences() == "Hello there."
+    assert stitcher.pop_sentences() == ""
+    stitcher.add("how are you doing? I")
+    assert stitcher.pop_sentences() == "How are you doing?"
+
+
+def test_a_sentence_at_the_very_end_waits_for_more_speech():
+    stitcher = TranscriptStitcher()
+    stitcher.add("That's all.")
+    assert stitcher.pop_sentences() == ""
+    assert stitcher.flush() == "That's all."
+
+
+def test_flush_hands_out_the_rest_and_starts_over():
+    stitcher = TranscriptStitcher()
+    stitcher.add("First one. And then")
+    stitcher.pop_sentences()
+    assert stitcher.flush() == "And then"
+    assert stitcher.text == ""
+    assert stitcher.add("and then") == "and then"
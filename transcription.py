@@ -0,0 +1,652 @@
+from dataclasses import dataclass
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+from collections import deque
+import asyncio
+import logging
+import multiprocessing
+import re
+import time
+import numpy as np
+
+import metrics
+
+WHISPER_SECONDS = metrics.histogram(
+    "faebot_whisper_seconds", "Time a worker spent transcribing one segment"
+)
+WHISPER_AUDIO_SECONDS = metrics.histogram(
+    "faebot_whisper_audio_seconds",
+    "Length of each transcribed segment",
+    buckets=(0.5, 1, 2, 5, 10, 20, 30),
+)
+WHISPER_REALTIME_FACTOR = metrics.histogram(
+    "faebot_whisper_realtime_factor",
+    "Seconds spent transcribing per second of audio, per segment",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 5),
+)
+WHISPER_FAILURES = metrics.counter(
+    "faebot_whisper_failures_total", "Transcriptions that failed, by reason", ["reason"]
+)
+WHISPER_RESPAWNS = metrics.counter(
+    "faebot_whisper_respawns_total",
+    "Whisper worker processes replaced after a timeout or crash",
+)
+
+
+@dataclass
+class Transcript:
+    text: str
+    language: str
+
+
+@dataclass
+class WhisperConfig:
+    model_name: str = "medium"
+    device: str = "cuda"
+    compute_type: str = "float16"
+    cpu_threads: int = 0
+
+
+@dataclass(frozen=True)
+class TranscriptionProfile:
+    """Decode options passed to every `model.transcribe` call."""
+
+    name: str
+    beam_size: int = 5
+    best_of: int = 5
+    # Retried in order when a decode looks like a hallucination (compression/logprob checks)
+    temperature: tuple[float, ...] = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+    vad_filter: bool = False
+    without_timestamps: bool = False
+    condition_on_previous_text: bool = True
+
+    def decode_options(self) -> dict:
+        return {
+            "beam_size": self.beam_size,
+            "best_of": self.best_of,
+            "temperature": list(self.temperature),
+            "vad_filter": self.vad_filter,
+            "without_timestamps": self.without_timestamps,
+            "condition_on_previous_text": self.condition_on_previous_text,
+        }
+
+    def describe(self) -> str:
+        fallback = "fallback" if len(self.temperature) > 1 else "no fallback"
+        return f"{self.name} (beam {self.beam_size}, {fallback})"
+
+
+PROFILES = {
+    # faster-whisper's own defaults
+    "default": TranscriptionProfile("default"),
+    # Greedy, single pass: the audio is already VAD-trimmed and we never use timestamps
+    "low-latency": TranscriptionProfile(
+        "low-latency",
+        beam_size=1,
+        best_of=1,
+        temperature=(0.0,),
+        without_timestamps=True,
+        condition_on_previous_text=False,
+    ),
+    "accurate": TranscriptionProfile("accurate", vad_filter=True),
+}
+
+
+class LanguageLock:
+    """Fixed or sticky transcription language. Until `after` consecutive
+    detections agree, Whisper detects the language on every segment; after
+    that the detected language is passed in and detection is skipped."""
+
+    def __init__(self, fixed: Optional[str] = None, after: int = 3):
+        self.fixed = fixed or None
+        self.after = after
+        self.locked: Optional[str] = None
+        self._candidate: Optional[str] = None
+        self._streak = 0
+
+    @property
+    def language(self) -> Optional[str]:
+        """Language to pass to Whisper, or None to detect it."""
+        return self.fixed or self.locked
+
+    @property
+    def state(self) -> str:
+        if self.fixed:
+            return "fixed"
+        return "locked" if self.locked else "detecting"
+
+    def observe(self, language: str):
+        if self.language or not self.after or not language:
+            return
+        if language == self._candidate:
+            self._streak += 1
+        else:
+            self._candidate, self._streak = language, 1
+        if self._streak >= self.after:
+            self.locked = language
+            logging.info(f"Transcription language locked to {language!r}")
+
+
+SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*\s+")
+
+
+def _normalise(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+class TranscriptStitcher:
+    """Joins transcripts of overlapping windows from one utterance, dropping the
+    words repeated at each overlap, and hands out sentences as they finish."""
+
+    def __init__(self, max_overlap_words: int = 12):
+        self.max_overlap_words = max_overlap_words
+        self.words: list[str] = []
+        self.emitted = 0  # characters of `text` already handed out as sentences
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.words)
+
+    def add(self, text: str) -> str:
+        """Append a window's transcript; returns the words that were new."""
+        new_words = text.split()
+        previous = [_normalise(word) for word in self.words[-self.max_overlap_words :]]
+        incoming = [_normalise(word) for word in new_words[: self.max_overlap_words]]
+        for size in range(min(len(previous), len(incoming)), 0, -1):
+            if previous[-size:] == incoming[:size]:
+                new_words = new_words[size:]
+                break
+        self.words.extend(new_words)
+        return " ".join(new_words)
+
+    def pop_sentences(self) -> str:
+        """Sentences that have finished (more speech follows them) and haven't been handed out."""
+        text = self.text
+        end = self.emitted
+        for match in SENTENCE_END.finditer(text, self.emitted):
+            end = match.end()
+        sentences = text[self.emitted : end].strip()
+        self.emitted = end
+        return sentences
+
+    def flush(self) -> str:
+        """Everything not yet handed out; call when the utterance ends."""
+        rest = self.text[self.emitted :].strip()
+        self.words = []
+        self.emitted = 0
+        return rest
+
+
+class TranscriptionError(Exception):
+    """A worker failed to transcribe (crashed, or raised inside Whisper)."""
+
+
+def _worker_main(jobs: Connection, results: Connection, config: WhisperConfig):
+    """Worker process: load Whisper once, then transcribe jobs from shared memory."""
+    logging.basicConfig(
+        format="%(asctime)s %(levelname)-8s %(message)s",
+        level=logging.INFO,
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    try:
+        from faster_whisper import WhisperModel
+
+        model = WhisperModel(
+            config.model_name,
+            device=config.device,
+            compute_type=config.compute_type,
+            cpu_threads=config.cpu_threads,
+        )
+        logging.getLogger("faster_whisper").setLevel(logging.WARNING)
+    except Exception as e:
+        results.send(("error", f"{type(e).__name__}: {e}"))
+        return
+    results.send(("ready",))
+
+    while True:
+        try:
+            job = jobs.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        shm_name, n_samples, initial_prompt, options = job
+        try:
+            shm = SharedMemory(name=shm_name)
+        except FileNotFoundError:
+            results.send(("error", "audio was released before transcription"))
+            continue
+        try:
+            audio = np.ndarray((n_samples,), dtype=np.float32, buffer=shm.buf)
+            segments, info = model.transcribe(
+                audio, initial_prompt=initial_prompt, **options
+            )
+            text = " ".join(segment.text for segment in segments).strip()
+            del audio  # release the view before closing the mapping
+            results.send(("ok", text, info.language))
+        except Exception as e:
+            results.send(("error", f"{type(e).__name__}: {e}"))
+        finally:
+            shm.close()
+
+
+async def _recv(conn: Connection):
+    """Await one message from a pipe without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def _readable():
+        loop.remove_reader(conn.fileno())
+        if future.done():
+            return
+        try:
+            future.set_result(conn.recv())
+        except Exception as e:  # EOFError when the worker died
+            future.set_exception(e)
+
+    loop.add_reader(conn.fileno(), _readable)
+    try:
+        return await future
+    finally:
+        loop.remove_reader(conn.fileno())
+
+
+class _Worker:
+    def __init__(self, ctx, index: int, config: WhisperConfig):
+        self.index = index
+        jobs_recv, self.jobs = ctx.Pipe(duplex=False)
+        self.results, results_send = ctx.Pipe(duplex=False)
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(jobs_recv, results_send, config),
+            name=f"whisper-{index}",
+            daemon=True,
+        )
+        self.process.start()
+        # The child owns these ends now
+        jobs_recv.close()
+        results_send.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.jobs.close()
+        self.results.close()
+
+
+class TranscriptionEngine:
+    """Pool of Whisper worker processes. A request that times out kills its
+    worker and spawns a fresh one, instead of leaking a stuck thread. A worker
+    that fails to reload is retried `respawn_attempts` times with backoff, then
+    given up on; once every worker is gone `error` says why."""
+
+    def __init__(
+        self,
+        config: WhisperConfig,
+        workers: int = 1,
+        timeout: float = 30,
+        profile: TranscriptionProfile = PROFILES["default"],
+        respawn_attempts: int = 5,
+    ):
+        self.config = config
+        self.profile = profile
+        self.size = workers
+        self.timeout = timeout
+        self.respawn_attempts = respawn_attempts
+        # spawn, not fork: CUDA can't be initialised in a forked child
+        self._ctx = multiprocessing.get_context("spawn")
+        self.workers: dict[int, _Worker] = {}
+        self.idle: asyncio.Queue = asyncio.Queue()
+        self.timeouts = 0
+        self.respawns = 0
+        self.error: Optional[str] = None
+        # Successful transcriptions, for the real-time factor
+        self.audio_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    async def start(self):
+        """Spawn every worker and wait until their models are loaded. The
+        models load in the worker processes, so the event loop keeps running."""
+        for index in range(self.size):
+            self.workers[index] = _Worker(self._ctx, index, self.config)
+        replies = await asyncio.gather(
+            *(_recv(worker.results) for worker in self.workers.values()),
+            return_exceptions=True,
+        )
+        for reply in replies:
+            if isinstance(reply, BaseException) or reply[0] != "ready":
+                error = reply if isinstance(reply, BaseException) else reply[1]
+                self.close(timeout=0)
+                raise TranscriptionError(f"Whisper worker failed to load: {error}")
+        for worker in self.workers.values():
+            self.idle.put_nowait(worker)
+        logging.info(
+            f"Whisper model loaded in {self.size} worker process(es) "
+            f"({self.config.model_name}, {self.config.device}, {self.config.compute_type}, "
+            f"profile {self.profile.describe()})"
+        )
+
+    async def transcribe(
+        self, audio: np.ndarray, initial_prompt: str, language: Optional[str] = None
+    ) -> Transcript:
+        """Transcribe float32 mono 16 kHz audio on the next free worker, in
+        `language` if given (skipping detection). Raises asyncio.TimeoutError
+        if it takes longer than `timeout`."""
+        if self.error is not None:
+            raise TranscriptionError(self.error)
+        options = dict(self.profile.decode_options(), language=language)
+        try:
+            # Only waits while a worker is being respawned
+            worker = await asyncio.wait_for(self.idle.get(), self.timeout)
+        except asyncio.TimeoutError:
+            raise TranscriptionError(
+                f"no Whisper worker free after {self.timeout}s"
+            ) from None
+        started = time.monotonic()
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
+        shm = SharedMemory(create=True, size=max(audio.nbytes, 1))
+        try:
+            np.ndarray(audio.shape, dtype=np.float32, buffer=shm.buf)[:] = audio
+            try:
+                # A worker that died while idle shows up here as a broken pipe
+                worker.jobs.send((shm.name, len(audio), initial_prompt, options))
+                reply = await asyncio.wait_for(_recv(worker.results), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                WHISPER_FAILURES.labels(reason="timeout").inc()
+                logging.warning(
+                    f"Whisper worker {worker.index} stuck — killing and respawning it"
+                )
+                self._replace(worker)
+                raise
+            except (EOFError, OSError) as e:
+                logging.error(f"Whisper worker {worker.index} died: {e}")
+                WHISPER_FAILURES.labels(reason="died").inc()
+                self._replace(worker)
+                raise TranscriptionError(f"worker {worker.index} died") from e
+            except asyncio.CancelledError:
+                # The worker is still busy: collect its result before reusing it
+                asyncio.create_task(self._drain(worker))
+                raise
+        finally:
+            shm.close()
+            shm.unlink()
+
+        self.idle.put_nowait(worker)
+        if reply[0] != "ok":
+            WHISPER_FAILURES.labels(reason="error").inc()
+            raise TranscriptionError(reply[1])
+        busy = time.monotonic() - started
+        seconds = len(audio) / 16000
+        self.busy_seconds += busy
+        self.audio_seconds += seconds
+        WHISPER_SECONDS.observe(busy)
+        WHISPER_AUDIO_SECONDS.observe(seconds)
+        if seconds:
+            WHISPER_REALTIME_FACTOR.observe(busy / seconds)
+        return Transcript(text=reply[1], language=reply[2])
+
+    async def _drain(self, worker: _Worker):
+        try:
+            await asyncio.wait_for(_recv(worker.results), self.timeout)
+        except (asyncio.TimeoutError, EOFError, OSError):
+            self._replace(worker)
+            return
+        self.idle.put_nowait(worker)
+
+    def _replace(self, worker: _Worker):
+        worker.kill()
+        asyncio.create_task(self._respawn(worker.index))
+
+    async def _respawn(self, index: int):
+        for attempt in range(self.respawn_attempts):
+            if attempt:
+                await asyncio.sleep(min(2**attempt, 30))
+            worker = _Worker(self._ctx, index, self.config)
+            self.workers[index] = worker
+            try:
+                reply = await _recv(worker.results)
+            except (EOFError, OSError) as e:
+                reply = ("error", str(e))
+            if reply[0] == "ready":
+                break
+            logging.error(
+                f"Whisper worker {index} failed to reload "
+                f"(attempt {attempt + 1}/{self.respawn_attempts}): {reply[1]}"
+            )
+            worker.kill()
+        else:
+            del self.workers[index]
+            if not self.workers:
+                self.error = f"every Whisper worker failed to reload: {reply[1]}"
+                logging.error(self.error)
+            return
+        self.respawns += 1
+        WHISPER_RESPAWNS.inc()
+        self.idle.put_nowait(worker)
+        logging.info(f"Whisper worker {index} respawned")
+
+    def close(self, timeout: float = 5):
+        """Stop all workers, killing any that don't exit within `timeout`."""
+        for worker in self.workers.values():
+            try:
+                worker.jobs.send(None)
+            except OSError:
+                pass
+        for worker in self.workers.values():
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                logging.warning(
+                    f"Whisper worker {worker.index} didn't exit, killing it"
+                )
+            worker.kill()
+        self.workers.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.size,
+            "profile": self.profile.name,
+            "idle": self.idle.qsize(),
+            "timeouts": self.timeouts,
+            "respawns": self.respawns,
+            "alive": len(self.workers),
+            "realtime_factor": round(self.realtime_factor, 3),
+        }
+
+    @property
+    def realtime_factor(self) -> float:
+        """Seconds spent transcribing per second of audio, so far."""
+        return self.busy_seconds / self.audio_seconds if self.audio_seconds else 0.0
+
+
+class _Job:
+    __slots__ = (
+        "audio",
+        "initial_prompt",
+        "language",
+        "seconds",
+        "future",
+        "task",
+        "enqueued_at",
+    )
+
+    def __init__(self, audio, initial_prompt, language, sample_rate):
+        self.audio = audio
+        self.initial_prompt = initial_prompt
+        self.language = language
+        self.seconds = len(audio) / sample_rate
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+        self.enqueued_at = time.monotonic()
+
+
+class _Stream:
+    def __init__(self, name: str):
+        self.name = name
+        self.jobs: deque[_Job] = deque()
+        # Audio seconds this stream may still spend in the current round
+        self.deficit = 0.0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.audio_seconds = 0.0
+        self.wait_last = 0.0
+        self.wait_max = 0.0
+        self.wait_total = 0.0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+        self.latency_total = 0.0
+
+    def metrics(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            "queue_depth": len(self.jobs),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "audio_seconds": round(self.audio_seconds, 1),
+            "wait_last_seconds": round(self.wait_last, 3),
+            "wait_max_seconds": round(self.wait_max, 3),
+            "wait_avg_seconds": round(self.wait_total / finished, 3)
+            if finished
+            else 0.0,
+            "latency_last_seconds": round(self.latency_last, 3),
+            "latency_max_seconds": round(self.latency_max, 3),
+            "latency_avg_seconds": round(self.latency_total / finished, 3)
+            if finished
+            else 0.0,
+        }
+
+
+class FairTranscriptionScheduler:
+    """Shares the engine's workers between audio streams by deficit round robin
+    over audio seconds: each round a stream may send `quantum` seconds of audio,
+    so one streamer talking in long windows can't starve the others. Jobs from
+    one stream start in the order they were submitted."""
+
+    def __init__(
+        self,
+        engine: TranscriptionEngine,
+        quantum: float = 5.0,
+        sample_rate: int = 16000,
+    ):
+        self.engine = engine
+        self.quantum = quantum
+        self.sample_rate = sample_rate
+        self.streams: dict[str, _Stream] = {}
+        # Streams with queued jobs, in round-robin order
+        self.active: deque[_Stream] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        # One job per worker in flight; the rest wait here, where they can be reordered
+        self._slots = asyncio.Semaphore(self.engine.size)
+        self._dispatcher = asyncio.create_task(
+            self._dispatch(), name="transcription-dispatch"
+        )
+
+    async def close(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            await asyncio.gather(self._dispatcher, return_exceptions=True)
+            self._dispatcher = None
+
+    async def transcribe(
+        self,
+        stream_name: str,
+        audio: np.ndarray,
+        initial_prompt: str,
+        language: Optional[str] = None,
+    ) -> Transcript:
+        """Queue audio from one stream and wait for its transcript. Raises
+        whatever TranscriptionEngine.transcribe raises."""
+        if self._dispatcher is None:
+            self.start()
+        assert self._wakeup is not None
+        stream = self.streams.get(stream_name)
+        if stream is None:
+            stream = self.streams[stream_name] = _Stream(stream_name)
+        job = _Job(audio, initial_prompt, language, self.sample_rate)
+        stream.jobs.append(job)
+        if len(stream.jobs) == 1:
+            self.active.append(stream)
+        self._wakeup.set()
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            # Connection closed: skip the job, or stop it if it already started
+            if job.task is not None:
+                job.task.cancel()
+            raise
+
+    def _next_job(self) -> Optional[tuple[_Stream, _Job]]:
+        while self.active:
+            stream = self.active[0]
+            while stream.jobs and stream.jobs[0].future.done():
+                stream.jobs.popleft()  # cancelled while queued
+            if not stream.jobs:
+                stream.deficit = 0.0
+                self.active.popleft()
+                continue
+            job = stream.jobs[0]
+            if stream.deficit < job.seconds:
+                # Top up and move to the back; long jobs wait a few rounds
+                stream.deficit += self.quantum
+                self.active.rotate(-1)
+                continue
+            stream.deficit -= job.seconds
+            stream.jobs.popleft()
+            if not stream.jobs:
+                stream.deficit = 0.0
+                self.active.popleft()
+            return stream, job
+        return None
+
+    async def _dispatch(self):
+        assert self._wakeup is not None and self._slots is not None
+        while True:
+            await self._slots.acquire()
+            picked = self._next_job()
+            while picked is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                picked = self._next_job()
+            stream, job = picked
+            job.task = asyncio.create_task(self._run(stream, job))
+
+    async def _run(self, stream: _Stream, job: _Job):
+        assert self._slots is not None
+        waited = time.monotonic() - job.enqueued_at
+        stream.wait_last = waited
+        stream.wait_max = max(stream.wait_max, waited)
+        stream.wait_total += waited
+        stream.in_flight += 1
+        try:
+            transcript = await self.engine.transcribe(
+                job.audio, job.initial_prompt, language=job.language
+            )
+        except asyncio.CancelledError:
+            stream.failed += 1
+            return
+        except Exception as e:
+            stream.failed += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            stream.completed += 1
+            stream.audio_seconds += job.seconds
+            if not job.future.done():
+                job.future.set_result(transcript)
+        finally:
+            stream.in_flight -= 1
+            self._slots.release()
+            latency = time.monotonic() - job.enqueued_at
+            stream.latency_last = latency
+            stream.latency_max = max(stream.latency_max, latency)
+            stream.latency_total += latency
+
+    def metrics(self) -> dict:
+        return {name: stream.metrics() for name, stream in self.streams.items()}
@@ -0,0 +1,200 @@
+from typing import Optional
+import asyncio
+import logging
+import time
+
+import numpy as np
+import torch
+
+import metrics
+
+SAMPLE_RATE = 16000
+# Silero only accepts 512-sample chunks at 16 kHz
+CHUNK_SAMPLES = 512
+
+VAD_CHUNKS = metrics.counter(
+    "faebot_vad_chunks_total", "512-sample chunks run through VAD"
+)
+VAD_BATCH_SIZE = metrics.histogram(
+    "faebot_vad_batch_size",
+    "Streams per VAD forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+VAD_FORWARD_SECONDS = metrics.histogram(
+    "faebot_vad_forward_seconds",
+    "Time per batched VAD forward pass",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+
+class VADStream:
+    """One connection's voice activity state: Silero's recurrent state and
+    audio context, plus silero_vad.VADIterator's start/end logic."""
+
+    def __init__(
+        self,
+        context_samples: int,
+        threshold: float = 0.5,
+        min_silence_duration_ms: int = 500,
+        speech_pad_ms: int = 100,
+    ):
+        self.threshold = threshold
+        self.min_silence_samples = SAMPLE_RATE * min_silence_duration_ms / 1000
+        self.speech_pad_samples = SAMPLE_RATE * speech_pad_ms / 1000
+        self.context = np.zeros(context_samples, dtype=np.float32)
+        self.state = torch.zeros(2, 128)
+        self.triggered = False
+        self.temp_end = 0
+        self.current_sample = 0
+        # The chunks of the current process() call, and (probability, event) for each so far
+        self.windows: list[np.ndarray] = []
+        self.events: list[tuple[float, Optional[dict]]] = []
+        self.future: Optional[asyncio.Future] = None
+
+    def advance(self, speech_prob: float) -> Optional[dict]:
+        """Feed the probability for the next chunk; returns a start/end event
+        in seconds, exactly as VADIterator(return_seconds=True) would."""
+        self.current_sample += CHUNK_SAMPLES
+        if speech_prob >= self.threshold and self.temp_end:
+            self.temp_end = 0
+        if speech_prob >= self.threshold and not self.triggered:
+            self.triggered = True
+            start = max(
+                0, self.current_sample - self.speech_pad_samples - CHUNK_SAMPLES
+            )
+            return {"start": round(start / SAMPLE_RATE, 1)}
+        if speech_prob < self.threshold - 0.15 and self.triggered:
+            if not self.temp_end:
+                self.temp_end = self.current_sample
+            if self.current_sample - self.temp_end < self.min_silence_samples:
+                return None
+            end = self.temp_end + self.speech_pad_samples - CHUNK_SAMPLES
+            self.temp_end = 0
+            self.triggered = False
+            return {"end": round(end / SAMPLE_RATE, 1)}
+        return None
+
+
+class BatchedVAD:
+    """Silero VAD shared by every audio connection. Chunks waiting from all
+    streams go through one batched forward pass, one chunk per stream per
+    pass, with each stream's recurrent state stacked into the batch.
+
+    Calls the model's inner 16 kHz network directly (`model._model`), which
+    takes the state explicitly, instead of the wrapper that keeps one
+    stream's state inside the model."""
+
+    def __init__(self, model, max_batch: int = 64, max_wait: float = 0.005):
+        self.network = model._model
+        self.context_samples = int(self.network.context_size_samples)
+        self.max_batch = max_batch
+        # How long to wait for other streams' chunks before running a pass
+        self.max_wait = max_wait
+        self.waiting: list[VADStream] = []
+        self._batch = np.zeros(
+            (max_batch, self.context_samples + CHUNK_SAMPLES), dtype=np.float32
+        )
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.passes = 0
+        self.chunks = 0
+
+    def stream(self, **options) -> VADStream:
+        return VADStream(self.context_samples, **options)
+
+    async def process(
+        self, stream: VADStream, windows: list[np.ndarray]
+    ) -> list[tuple[float, Optional[dict]]]:
+        """Run VAD over one stream's consecutive 512-sample chunks; returns the
+        speech probability and start/end event (or None) of each chunk. The
+        windows must stay valid until this returns."""
+        if not windows:
+            return []
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="vad-batcher")
+        assert self._wakeup is not None
+        stream.windows = windows
+        stream.events = []
+        stream.future = asyncio.get_running_loop().create_future()
+        self.waiting.append(stream)
+        self._wakeup.set()
+        try:
+            return await stream.future
+        finally:
+            stream.windows = []
+            stream.future = None
+            if stream in self.waiting:  # cancelled: the connection closed
+                self.waiting.remove(stream)
+
+    async def _run(self):
+        assert self._wakeup is not None
+        while True:
+            await self._wakeup.wait()
+            if self.max_wait:
+                await asyncio.sleep(self.max_wait)
+            self._wakeup.clear()
+            while self.waiting:
+                # Streams whose connection closed mid-call have a cancelled future
+                self.waiting = [
+                    s
+                    for s in self.waiting
+                    if s.future is not None and not s.future.done()
+                ]
+                batch = self.waiting[: self.max_batch]
+                if not batch:
+                    break
+                started = time.perf_counter()
+                try:
+                    probs = self._forward(batch)
+                except Exception as e:
+                    # Fail just this batch's callers; the batcher keeps serving the rest
+                    logging.error(
+                        f"VAD forward pass failed for {len(batch)} stream(s): {e}"
+                    )
+                    for stream in batch:
+                        stream.future.set_exception(e)
+                    self.waiting = self.waiting[len(batch) :]
+                    continue
+                VAD_FORWARD_SECONDS.observe(time.perf_counter() - started)
+                VAD_BATCH_SIZE.observe(len(batch))
+                VAD_CHUNKS.inc(len(batch))
+                for stream, prob in zip(batch, probs):
+                    stream.events.append((prob, stream.advance(prob)))
+                # Finished streams leave; the rest rotate behind any that didn't fit
+                remaining = [s for s in batch if len(s.events) < len(s.windows)]
+                for stream in batch:
+                    if len(stream.events) == len(stream.windows):
+                        stream.future.set_result(stream.events)
+                self.waiting = self.waiting[len(batch) :] + remaining
+
+    @torch.no_grad()
+    def _forward(self, batch: list[VADStream]) -> list[float]:
+        size = len(batch)
+        rows = self._batch[:size]
+        for row, stream in zip(rows, batch):
+            chunk = stream.windows[len(stream.events)]
+            row[: self.context_samples] = stream.context
+            row[self.context_samples :] = chunk
+            stream.context[:] = chunk[-self.context_samples :]
+        state = torch.stack([stream.state for stream in batch], dim=1)
+        out, state = self.network(torch.from_numpy(rows), state)
+        for stream, stream_state in zip(batch, state.unbind(1)):
+            stream.state = stream_state
+        self.passes += 1
+        self.chunks += size
+        return out[:, 0].tolist()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {
+            "passes": self.passes,
+            "chunks": self.chunks,
+            "avg_batch": round(self.chunks / self.passes, 2) if self.passes else 0.0,
+            "waiting": len(self.waiting),
+        }
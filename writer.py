@@ -0,0 +1,72 @@
+from abc import ABC, abstractmethod
+from typing import Any, Optional
+import logging
+import queue
+import threading
+import time
+
+_CLOSE = object()
+
+
+class BatchWriter(ABC):
+    """Base for anything whose writes are queued and flushed in batches by a
+    background thread, so slow disks never stall the event loop. A batch is
+    flushed once it holds `batch_size` items or `flush_interval` seconds have
+    passed; subclasses queue items with `_put` and write them in `_flush`."""
+
+    def __init__(
+        self, name: str, description: str, batch_size: int, flush_interval: float
+    ):
+        # `description` names a batch's items in errors, e.g. "permalog records"
+        self.description = description
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = threading.Thread(
+            target=self._run, name=name, daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item: Any) -> None:
+        self._queue.put(item)
+
+    def close(self) -> None:
+        """Flush everything queued so far and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        batch: list = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is not None and item is not _CLOSE:
+                batch.append(item)
+            if (
+                item is _CLOSE
+                or len(batch) >= self.batch_size
+                or time.monotonic() >= deadline
+            ):
+                if batch:
+                    try:
+                        self._flush(batch)
+                    except Exception as e:
+                        # Never let a failed write take the writer thread down
+                        logging.error(
+                            f"Failed to write {len(batch)} {self.description}: {e}"
+                        )
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+            if item is _CLOSE:
+                return
+
+    @abstractmethod
+    def _flush(self, batch: list) -> None:
+        """Write one batch, on the writer thread. Exceptions are logged."""